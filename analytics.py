@@ -0,0 +1,244 @@
+# analytics.py
+"""
+Columnar analytics for the dataset catalog.
+Exports ai_projects and datasets into chunked Parquet or Arrow IPC files and
+computes catalog statistics on them with vectorized pyarrow compute kernels.
+"""
+
+import json
+import os
+
+from catalog_index import dataset_fingerprint
+
+# Optional dependency, imported on first use (it is heavy and only the analytics commands need it)
+pa = pc = ds = pq = None
+
+FORMATS = ('parquet', 'arrow')
+HYPERPARAMETER_PREFIX = 'hp_'
+
+PROJECT_COLUMNS = ['id', 'name', 'description', 'model_type', 'created_at']
+DATASET_COLUMNS = ['id', 'name', 'description', 'size_mb', 'format', 'source_url', 'ai_project_id', 'created_at']
+
+
+def require_pyarrow():
+    """Import pyarrow, failing with installation guidance when it is missing"""
+    global pa, pc, ds, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.dataset
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for analytics: pip install pyarrow numpy") from None
+        pa, pc, ds, pq = pyarrow, pyarrow.compute, pyarrow.dataset, pyarrow.parquet
+
+
+def dataset_schema():
+    return pa.schema([
+        ('id', pa.string()),
+        ('name', pa.string()),
+        ('description', pa.string()),
+        ('size_mb', pa.int64()),
+        ('format', pa.string()),
+        ('source_url', pa.string()),
+        ('ai_project_id', pa.string()),
+        ('created_at', pa.string()),
+        ('fingerprint', pa.string()),
+    ])
+
+
+def flatten_hyperparameters(hyperparameters, prefix=HYPERPARAMETER_PREFIX):
+    """Flatten nested hyperparameters into {'hp_optimizer.lr': 0.001, ...}"""
+    flat = {}
+    for name, value in (hyperparameters or {}).items():
+        column = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(flatten_hyperparameters(value, prefix=f"{column}."))
+        else:
+            flat[column] = value
+    return flat
+
+
+def _column_type(values):
+    """Arrow type for a flattened hyperparameter column"""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present):
+        return pa.bool_()
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return pa.float64()
+    return pa.string()
+
+
+def _as_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def projects_table(projects):
+    """Arrow table of projects with one column per (flattened) hyperparameter"""
+    flat_rows = [flatten_hyperparameters(p.get('hyperparameters')) for p in projects]
+    hp_columns = sorted({column for row in flat_rows for column in row})
+
+    arrays = {column: pa.array([p.get(column) for p in projects], pa.string()) for column in PROJECT_COLUMNS}
+    for column in hp_columns:
+        values = [row.get(column) for row in flat_rows]
+        column_type = _column_type(values)
+        if column_type == pa.string():
+            values = [_as_string(v) for v in values]
+        arrays[column] = pa.array(values, column_type)
+    return pa.table(arrays)
+
+
+class _ChunkedWriter:
+    """Write record batches into part files of at most rows_per_file rows"""
+
+    def __init__(self, directory, schema, file_format, rows_per_file):
+        self.directory = directory
+        self.schema = schema
+        self.file_format = file_format
+        self.rows_per_file = rows_per_file
+        self.files = []
+        self._writer = None
+        self._rows = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        path = os.path.join(self.directory, f"part-{len(self.files):05d}.{self.file_format}")
+        self.files.append(path)
+        if self.file_format == 'parquet':
+            self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema)
+        self._rows = 0
+
+    def write(self, batch):
+        if self._writer is not None and self._rows >= self.rows_per_file:
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            self._open()
+        if self.file_format == 'parquet':
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write(batch)
+        self._rows += batch.num_rows
+
+    def close(self):
+        """Finish the last part; an empty table still gets one part, so readers know its schema"""
+        if self._writer is None and not self.files:
+            self._open()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _clear_parts(directory):
+    """Remove part files left by a previous export"""
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.startswith('part-'):
+                os.remove(os.path.join(directory, name))
+
+
+def export_catalog(projects_repo, datasets_repo, output_dir, file_format='parquet', page_size=1000, rows_per_file=100000):
+    """
+    Export both tables to output_dir/ai_projects and output_dir/datasets.
+    Datasets are streamed page by page from the repository, so memory stays bounded by page_size.
+    Returns the number of rows written per table.
+    """
+    require_pyarrow()
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format '{file_format}', expected one of {FORMATS}")
+
+    # Projects: hyperparameter columns are only known once every project has been seen
+    projects = [row for page in projects_repo.iter_rows("*", page_size) for row in page]
+    projects_dir = os.path.join(output_dir, 'ai_projects')
+    _clear_parts(projects_dir)
+    table = projects_table(projects)
+    writer = _ChunkedWriter(projects_dir, table.schema, file_format, rows_per_file)
+    for batch in table.to_batches(max_chunksize=page_size):
+        writer.write(batch)
+    writer.close()
+
+    datasets_dir = os.path.join(output_dir, 'datasets')
+    _clear_parts(datasets_dir)
+    schema = dataset_schema()
+    writer = _ChunkedWriter(datasets_dir, schema, file_format, rows_per_file)
+    dataset_count = 0
+    try:
+        for page in datasets_repo.iter_rows(', '.join(DATASET_COLUMNS), page_size):
+            for row in page:
+                row['fingerprint'] = dataset_fingerprint(row)
+            writer.write(pa.RecordBatch.from_pylist(page, schema=schema))
+            dataset_count += len(page)
+    finally:
+        writer.close()
+
+    return {'ai_projects': len(projects), 'datasets': dataset_count}
+
+
+def _histogram(column):
+    """{value: count} from a vectorized value_counts, largest first"""
+    counts = pc.value_counts(pc.fill_null(column, 'Unknown')).to_pylist()
+    return dict(sorted(((c['values'], c['counts']) for c in counts), key=lambda item: -item[1]))
+
+
+def _dedup_totals(datasets):
+    """Datasets and size counting each fingerprint once (rows without one are unique)"""
+    keyed = pc.is_valid(datasets['fingerprint'])
+    unique = datasets.filter(keyed).group_by('fingerprint').aggregate([('size_mb', 'min')])
+    unkeyed_sizes = pc.filter(datasets['size_mb'], pc.invert(keyed))
+    size_mb = (pc.sum(unique['size_mb_min']).as_py() or 0) + (pc.sum(unkeyed_sizes).as_py() or 0)
+    count = unique.num_rows + len(unkeyed_sizes)
+    return {
+        'deduplicated_datasets': count,
+        'deduplicated_size_mb': size_mb,
+        'deduplicated_size_gb': round(size_mb / 1024, 1),
+        'duplicate_datasets': datasets.num_rows - count,
+    }
+
+
+def catalog_stats(output_dir, file_format='parquet'):
+    """
+    Catalog statistics computed on exported files: size totals (logical and
+    deduplicated), format and model type histograms, and per-project dataset rollups
+    """
+    require_pyarrow()
+    source = ds.dataset(os.path.join(output_dir, 'datasets'), format=file_format)
+    columns = ['ai_project_id', 'size_mb', 'format']
+    if 'fingerprint' in source.schema.names:  # Exports made before fingerprints have no such column
+        columns.append('fingerprint')
+    datasets = source.to_table(columns=columns)
+    projects = ds.dataset(os.path.join(output_dir, 'ai_projects'), format=file_format).to_table(
+        columns=['id', 'name', 'model_type'])
+
+    total_size_mb = pc.sum(datasets['size_mb']).as_py() or 0
+
+    rollup = datasets.group_by('ai_project_id').aggregate([('size_mb', 'sum'), ('size_mb', 'count')])
+    rollup = rollup.join(projects, keys='ai_project_id', right_keys='id', join_type='left outer')
+    rollup = rollup.sort_by([('size_mb_sum', 'descending')])
+
+    report = {
+        'total_projects': projects.num_rows,
+        'total_datasets': datasets.num_rows,
+        'total_size_mb': total_size_mb,
+        'total_size_gb': round(total_size_mb / 1024, 1),
+        'mean_size_mb': round(pc.mean(datasets['size_mb']).as_py() or 0, 1),
+        'dataset_formats': _histogram(datasets['format']),
+        'project_types': _histogram(projects['model_type']),
+        'projects': [
+            {
+                'id': row['ai_project_id'],
+                'name': row['name'] or 'Deleted project',
+                'model_type': row['model_type'],
+                'datasets': row['size_mb_count'],
+                'size_mb': row['size_mb_sum'],
+            }
+            for row in rollup.to_pylist()
+        ],
+    }
+    if 'fingerprint' in columns:
+        report.update(_dedup_totals(datasets))
+    return report
@@ -4,24 +4,271 @@ Flask web application for Supabase-Experiments
 Provides web interface for AI projects and datasets with GitHub authentication
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
-from supabase import create_client
-from dotenv import load_dotenv
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, g, make_response
 import os
-import json
-from datetime import datetime
+import jwt
+import atexit
+import time
 from functools import wraps
-from config import ANSI
+from config import ANSI, load_env
+from clients import LazyClient
+from auth_tokens import TokenVerifier, UserClientCache, VerificationUnavailable, refresh_session, seconds_until_expiry
+from rate_limit import RateLimiter, MemoryBucketStore, SQLiteBucketStore, parse_costs, retry_after_header
+from singleflight import SingleFlight
+from mirror import LocalMirror
+from repository import ProjectRepository, DatasetRepository, DuplicateContentError, NullCache, TTLCache
+from repository.cache import MISSING
+from resilience import ResiliencePolicy, CircuitBreaker, CircuitOpenError
+from write_buffer import WriteBehindBuffer
+from assets import init_assets
+from templating import init_templates
+from response_cache import ResponseCache, DataVersion, SQLiteDataVersion
+from catalog_index import dedup_totals
 
-# Load environment variables
-load_dotenv()
+# Load environment variables (the Supabase client itself is only built on first use)
+load_env()
 url = os.getenv("SUPABASE_URL")
 key = os.getenv("SUPABASE_KEY")
 app_secret = os.getenv("FLASK_SECRET_KEY", "your-secret-key-change-this")
+jwt_secret = os.getenv("SUPABASE_JWT_SECRET")  # Legacy HS256 secret; without it HS256 tokens are checked by Supabase Auth
+jwks_timeout = float(os.getenv("JWKS_TIMEOUT", "3"))  # Seconds a signing key fetch may take before answering 503
+token_refresh_margin = int(os.getenv("TOKEN_REFRESH_MARGIN", "300"))  # Seconds before expiry to rotate tokens
+user_client_cache_size = int(os.getenv("USER_CLIENT_CACHE_SIZE", "256"))
+rate_limit_enabled = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+rate_limit_capacity = int(os.getenv("RATE_LIMIT_CAPACITY", "60"))  # Burst size in tokens
+rate_limit_refill = float(os.getenv("RATE_LIMIT_REFILL_PER_SEC", "1"))
+rate_limit_store = os.getenv("RATE_LIMIT_STORE")  # SQLite file shared by workers; in-process when unset
+
+# Token cost per endpoint; heavy full-table reads cost more than simple lookups
+rate_limit_costs = {
+    'index': 5,
+    'api_get_stats': 5,
+    'api_get_projects': 2,
+    'api_get_datasets': 2,
+}
+rate_limit_costs.update(parse_costs(os.getenv("RATE_LIMIT_COSTS")))
+# 'shared': every signed-in user may read the same rows (the schema in docs/database_creation.sql has no per-user
+# policies); 'per_user': RLS policies filter rows by user, so results are never shared between users
+rls_mode = os.getenv("RLS_MODE", "shared")
+# Identical reads share one upstream query across users ('global') or per user ('user'); follows RLS_MODE by default
+singleflight_scope = os.getenv("SINGLEFLIGHT_SCOPE", "global" if rls_mode == 'shared' else "user")
+if rls_mode not in ('shared', 'per_user'):
+    raise RuntimeError(f"RLS_MODE must be 'shared' or 'per_user', got {rls_mode!r}")
+if rls_mode == 'per_user' and singleflight_scope == 'global':
+    raise RuntimeError("SINGLEFLIGHT_SCOPE=global would hand one user's rows to another under RLS_MODE=per_user")
+mirror_path = os.getenv("MIRROR_PATH")  # Local SQLite read replica; disabled when unset
+mirror_max_staleness = float(os.getenv("MIRROR_MAX_STALENESS", "60"))  # Seconds before reads go back to Supabase
+mirror_sync_interval = float(os.getenv("MIRROR_SYNC_INTERVAL", "15"))
+repository_cache_ttl = float(os.getenv("REPOSITORY_CACHE_TTL", "0"))  # Seconds; 0 disables the read cache
+upstream_read_timeout = float(os.getenv("UPSTREAM_READ_TIMEOUT", "5"))  # Seconds per Supabase read
+upstream_write_timeout = float(os.getenv("UPSTREAM_WRITE_TIMEOUT", "10"))
+upstream_retries = int(os.getenv("UPSTREAM_RETRIES", "2"))  # Extra attempts for reads; writes are never retried
+circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # Consecutive failures that open the breaker
+circuit_reset_timeout = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))  # Seconds before a trial call is let through
+serve_stale = os.getenv("SERVE_STALE_ON_OUTAGE", "True").lower() == "true"
+# Buffer size_mb-only dataset updates and write them in batches (PUT answers 202 Accepted)
+write_buffer_enabled = os.getenv("WRITE_BUFFER_ENABLED", "False").lower() == "true"
+write_buffer_window = float(os.getenv("WRITE_BUFFER_WINDOW", "2"))  # Seconds between flushes
+write_buffer_journal = os.getenv("WRITE_BUFFER_JOURNAL")  # Journal file making accepted updates durable
+# Service-role key replaying journaled updates after a restart (their users' tokens are gone); required with a journal
+write_buffer_replay_key = os.getenv("WRITE_BUFFER_REPLAY_KEY")
+write_buffer_access_ttl = float(os.getenv("WRITE_BUFFER_ACCESS_TTL", "60"))  # Seconds a checked (user, dataset) is trusted
+readiness_timeout = float(os.getenv("READINESS_TIMEOUT", "2"))  # Seconds the /readyz upstream probe may take
+readiness_cache_seconds = float(os.getenv("READINESS_CACHE_SECONDS", "5"))  # Reuse a probe result this long
+fragment_cache_ttl = float(os.getenv("FRAGMENT_CACHE_TTL", "30"))  # Seconds to reuse rendered navigation/stats; 0 disables
+template_cache_dir = os.getenv("TEMPLATE_CACHE_DIR")  # Compiled template bytecode shared by workers
+response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "300"))  # Seconds a rendered page is reused at most; 0 disables
+data_version_store = os.getenv("DATA_VERSION_STORE")  # SQLite file sharing the data version between workers
+web_concurrency = int(os.getenv("WEB_CONCURRENCY", "1"))  # Worker processes serving the app (set by gunicorn.conf.py)
+# Link projects to an already catalogued dataset instead of storing a duplicate (needs the dataset_projects migration)
+catalog_dedupe = os.getenv("CATALOG_DEDUPE_ENABLED", "False").lower() == "true"
 
 app = Flask(__name__)
 app.secret_key = app_secret
-supabase = create_client(url, key)
+init_assets(app)
+if web_concurrency > 1 and not data_version_store and (fragment_cache_ttl > 0 or response_cache_ttl > 0):
+    # A write bumps the version of one worker only: the others would keep serving stale pages, fragments and 304s
+    print(f"{ANSI['Y']}Page and fragment caches disabled: {web_concurrency} workers need DATA_VERSION_STORE "
+          f"to share the data version{ANSI['W']}")
+    fragment_cache_ttl = response_cache_ttl = 0
+fragment_cache = TTLCache(ttl=fragment_cache_ttl) if fragment_cache_ttl > 0 else NullCache()
+data_version = SQLiteDataVersion(data_version_store) if data_version_store else DataVersion()
+response_cache = ResponseCache(data_version, ttl=response_cache_ttl)
+response_cache.init_app(app)
+supabase = LazyClient()
+token_verifier = TokenVerifier(url, jwt_secret=jwt_secret, remote=lambda token: supabase.auth.get_user(token),
+                               jwks_timeout=jwks_timeout)
+user_clients = UserClientCache(url, key, maxsize=user_client_cache_size)
+rate_limiter = None
+if rate_limit_enabled:
+    if web_concurrency > 1 and not rate_limit_store:
+        print(f"{ANSI['Y']}Rate limits are per worker: without RATE_LIMIT_STORE, clients get up to "
+              f"{web_concurrency}x RATE_LIMIT_CAPACITY{ANSI['W']}")
+    bucket_store = SQLiteBucketStore(rate_limit_store) if rate_limit_store else MemoryBucketStore()
+    rate_limiter = RateLimiter(rate_limit_capacity, rate_limit_refill, bucket_store, costs=rate_limit_costs)
+flights = SingleFlight()
+resilience = ResiliencePolicy(
+    timeouts={'read': upstream_read_timeout, 'count': upstream_read_timeout, 'write': upstream_write_timeout},
+    retries=upstream_retries,
+    breaker=CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout),
+    serve_stale=serve_stale
+)
+mirror = None
+if mirror_path and rls_mode == 'per_user':
+    # The mirror is filled with one client and served to every user, which would bypass per-user policies
+    raise RuntimeError("MIRROR_PATH cannot be used with RLS_MODE=per_user: the mirror would serve every user the same rows")
+if mirror_path:
+    mirror = LocalMirror(mirror_path, supabase, max_staleness=mirror_max_staleness, sync_interval=mirror_sync_interval)
+
+def get_db():
+    """Supabase client for the current request (authenticated as the user when logged in)"""
+    return g.get('db', supabase)
+
+def request_scope():
+    """Scope for cached and coalesced reads: the user, unless reads are shared globally"""
+    if singleflight_scope == 'global':
+        return 'global'
+    return session.get('user', {}).get('id', 'anonymous')
+
+# One cache for both tables, so deleting a project also drops cached dataset reads
+read_cache = TTLCache(ttl=repository_cache_ttl) if repository_cache_ttl > 0 else NullCache()
+repository_options = dict(cache=read_cache, flights=flights, scope=request_scope, mirror=mirror, resilience=resilience)
+projects_repo = ProjectRepository(get_db, **repository_options)
+datasets_repo = DatasetRepository(get_db, dedupe=catalog_dedupe, **repository_options)
+# Rendered pages and fragments are stale as soon as a write is confirmed
+for repo in (projects_repo, datasets_repo):
+    repo.write_hooks.append(lambda table, op, payload: fragment_cache.clear())
+    repo.write_hooks.append(lambda table, op, payload: data_version.bump())
+init_templates(app, fragment_cache=fragment_cache, bytecode_cache_dir=template_cache_dir, version=data_version)
+write_buffer = None
+buffered_access = TTLCache(ttl=write_buffer_access_ttl, maxsize=10000)
+if write_buffer_enabled and web_concurrency > 1:
+    # Each worker flushes its own buffer on its own timer: updates to one row made through different
+    # workers would be written out of order, and the older one could win
+    print(f"{ANSI['Y']}Write buffer disabled: {web_concurrency} workers would write updates to the same "
+          f"dataset out of order (run one worker to buffer writes){ANSI['W']}")
+    write_buffer_enabled = False
+if write_buffer_enabled:
+    if write_buffer_journal and not write_buffer_replay_key:
+        raise RuntimeError("WRITE_BUFFER_JOURNAL needs WRITE_BUFFER_REPLAY_KEY (a service-role key): journaled "
+                           "updates are replayed after a restart, when their users' tokens are gone")
+    replay_client = LazyClient(url, write_buffer_replay_key) if write_buffer_replay_key else supabase
+    write_buffer = WriteBehindBuffer(datasets_repo, window=write_buffer_window,
+                                     journal_path=write_buffer_journal, client=replay_client)
+    # A deleted dataset must not keep accepting buffered updates
+    datasets_repo.write_hooks.append(lambda table, op, payload: buffered_access.clear() if op.startswith('delete') else None)
+
+def start_background_work():
+    """
+    Start this process's mirror sync and write buffer threads.
+    Threads do not survive fork(), so servers that preload the app call this in
+    each worker after forking (see gunicorn.conf.py), never in the master.
+    """
+    if mirror is not None:
+        mirror.start()
+    if write_buffer is not None:
+        write_buffer.start()
+        atexit.register(write_buffer.close)  # Flush what is left when the process exits
+
+def stop_background_work():
+    """Flush buffered writes and stop syncing (graceful worker shutdown)"""
+    if write_buffer is not None:
+        write_buffer.close()
+    if mirror is not None:
+        mirror.stop()
+
+def authenticate_request():
+    """
+    Verify the session's access token locally and attach the user's client to g.
+    Tokens close to expiry are rotated with the refresh token; no other network call is made.
+    Returns False when the session can no longer be used; raises VerificationUnavailable
+    when the token cannot be checked right now (the session must then be kept).
+    """
+    access_token = session.get('access_token')
+    user_id = session.get('user', {}).get('id')
+    if not access_token or not user_id:
+        return False
+
+    try:
+        claims = token_verifier.verify(access_token)
+    except jwt.ExpiredSignatureError:
+        claims = None
+    except jwt.PyJWTError as e:
+        print(f"{ANSI['R']}Invalid access token: {e}{ANSI['W']}")
+        return False
+
+    if claims is not None and claims.get('sub') != user_id:
+        return False
+
+    if claims is None or seconds_until_expiry(claims) < token_refresh_margin:
+        refresh_token = session.get('refresh_token')
+        if not refresh_token:
+            return claims is not None
+        try:
+            new_session = refresh_session(url, key, refresh_token)
+        except Exception as e:
+            print(f"{ANSI['R']}Token refresh error: {e}{ANSI['W']}")
+            new_session = None
+        if new_session is None:
+            # Keep using a still-valid token; an expired one ends the session
+            return claims is not None
+        user_clients.discard(user_id)
+        session['access_token'] = access_token = new_session.access_token
+        session['refresh_token'] = new_session.refresh_token
+
+    g.db = user_clients.get(user_id, access_token)
+    return True
+
+@app.before_request
+def apply_rate_limit():
+    """Throttle callers per user (or client address) and per route"""
+    if rate_limiter is None or request.endpoint in (None, 'static', 'healthz', 'readyz'):
+        return None
+
+    identity = session.get('user', {}).get('id') or request.remote_addr
+    cost = rate_limit_costs.get(request.endpoint, 1)
+    try:
+        allowed, retry_after = rate_limiter.consume(f"{identity}:{request.endpoint}", cost)
+    except Exception as e:
+        # Never turn a rate limiter failure into an outage
+        print(f"{ANSI['R']}Rate limiter error: {e}{ANSI['W']}")
+        return None
+
+    if allowed:
+        return None
+    if request.path.startswith('/api/'):
+        response = jsonify({'success': False, 'error': 'Rate limit exceeded, please retry later'})
+    else:
+        response = make_response(render_template(
+            'error.html', title='Too many requests',
+            message=f"Please wait {retry_after_header(retry_after)} seconds before trying again.",
+            user=session.get('user')))
+    response.status_code = 429
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response
+
+def api_error(e):
+    """JSON error response; an open circuit breaker is reported as 503 with Retry-After"""
+    if isinstance(e, CircuitOpenError):
+        response = jsonify({'success': False, 'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = retry_after_header(circuit_reset_timeout)
+        return response
+    return jsonify({'success': False, 'error': str(e)}), 500
+
+def auth_unavailable(e):
+    """503 while tokens cannot be checked (JWKS or Supabase Auth unreachable); the session is kept"""
+    print(f"{ANSI['R']}Token verification unavailable: {e}{ANSI['W']}")
+    if request.path.startswith('/api/'):
+        response = jsonify({'success': False, 'error': 'Authentication is temporarily unavailable, please retry'})
+    else:
+        response = make_response(render_template(
+            'error.html', title='Service unavailable',
+            message="Sign-in could not be checked right now. Please try again in a few seconds.",
+            user=session.get('user')))
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
 
 def login_required(f):
     """Decorator to require authentication for routes"""
@@ -30,47 +277,68 @@ def login_required(f):
         if 'user' not in session:
             flash('Please log in to access this page.', 'warning')
             return redirect(url_for('login'))
+        try:
+            authenticated = authenticate_request()
+        except VerificationUnavailable as e:
+            return auth_unavailable(e)
+        if not authenticated:
+            session.clear()
+            flash('Your session has expired. Please log in again.', 'warning')
+            return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
 
+def build_stats(projects, datasets, linked_ids=()):
+    """
+    Dashboard statistics from Project and Dataset models.
+    Totals count every registration, project links included; the
+    deduplicated_* figures count each distinct content (see catalog_index) once.
+    """
+    totals = dedup_totals(datasets, linked_ids)
+    total_size_mb = totals['logical_size_mb']
+
+    # Project types breakdown
+    project_types = {}
+    for project in projects:
+        ptype = project.model_type or 'Unknown'
+        project_types[ptype] = project_types.get(ptype, 0) + 1
+
+    # Dataset formats breakdown
+    dataset_formats = {}
+    for dataset in datasets:
+        fmt = dataset.format or 'Unknown'
+        dataset_formats[fmt] = dataset_formats.get(fmt, 0) + 1
+
+    return {
+        'total_projects': len(projects),
+        'total_datasets': totals['logical_datasets'],
+        'total_size_mb': total_size_mb,
+        'total_size_gb': round(total_size_mb / 1024, 1),
+        'deduplicated_datasets': totals['deduplicated_datasets'],
+        'deduplicated_size_mb': totals['deduplicated_size_mb'],
+        'deduplicated_size_gb': round(totals['deduplicated_size_mb'] / 1024, 1),
+        'duplicate_datasets': totals['duplicate_datasets'],
+        'project_types': project_types,
+        'dataset_formats': dataset_formats
+    }
+
 @app.route('/')
 def index():
     """Dashboard - Home page with statistics"""
     try:
+        try:
+            authenticated = 'user' not in session or authenticate_request()
+        except VerificationUnavailable as e:
+            return auth_unavailable(e)
+        if not authenticated:
+            session.clear()
+            flash('Your session has expired. Please log in again.', 'warning')
+
         if 'user' in session:
             # Get statistics for logged-in users
-            projects_result = supabase.table("ai_projects").select("*").execute()
-            datasets_result = supabase.table("datasets").select("*").execute()
-            
-            projects = projects_result.data if projects_result.data else []
-            datasets = datasets_result.data if datasets_result.data else []
-            
-            # Calculate statistics
-            total_projects = len(projects)
-            total_datasets = len(datasets)
-            total_size_mb = sum(d.get('size_mb', 0) for d in datasets)
-            
-            # Get project types
-            project_types = {}
-            for project in projects:
-                ptype = project.get('model_type', 'Unknown')
-                project_types[ptype] = project_types.get(ptype, 0) + 1
-            
-            # Get dataset formats
-            dataset_formats = {}
-            for dataset in datasets:
-                fmt = dataset.get('format', 'Unknown')
-                dataset_formats[fmt] = dataset_formats.get(fmt, 0) + 1
-            
-            stats = {
-                'total_projects': total_projects,
-                'total_datasets': total_datasets,
-                'total_size_mb': total_size_mb,
-                'total_size_gb': round(total_size_mb / 1024, 1),
-                'project_types': project_types,
-                'dataset_formats': dataset_formats,
-                'recent_projects': projects[-5:] if projects else []
-            }
+            projects = projects_repo.list()
+            stats = build_stats(projects, datasets_repo.list(), datasets_repo.linked_ids())
+            stats['recent_projects'] = projects[:5]
             
             return render_template('index.html', stats=stats, user=session['user'])
         else:
@@ -124,9 +392,20 @@ def handle_auth_signin():
         user_data = data.get('user')
         
         if access_token and user_data:
+            # Verify the token locally before trusting the user data sent by the browser
+            try:
+                claims = token_verifier.verify(access_token)
+            except jwt.PyJWTError as e:
+                print(f"{ANSI['R']}Rejected access token: {e}{ANSI['W']}")
+                return jsonify({'success': False, 'error': 'Invalid access token'}), 401
+            except VerificationUnavailable as e:
+                return auth_unavailable(e)
+            if claims['sub'] != user_data.get('id'):
+                return jsonify({'success': False, 'error': 'Token does not match user'}), 401
+
             # Store user info in Flask session
             session['user'] = {
-                'id': user_data.get('id'),
+                'id': claims['sub'],
                 'email': user_data.get('email'),
                 'name': user_data.get('user_metadata', {}).get('full_name') or user_data.get('user_metadata', {}).get('name', 'User'),
                 'avatar_url': user_data.get('user_metadata', {}).get('avatar_url', ''),
@@ -151,6 +430,8 @@ def logout():
         if 'access_token' in session:
             # Sign out from Supabase
             supabase.auth.sign_out()
+        if 'user' in session:
+            user_clients.discard(session['user'].get('id'))
         
         # Clear Flask session
         session.clear()
@@ -165,11 +446,11 @@ def logout():
 
 @app.route('/projects')
 @login_required
+@response_cache.cached
 def projects():
     """AI Projects listing page"""
     try:
-        result = supabase.table("ai_projects").select("*").order("created_at", desc=True).execute()
-        projects_list = result.data if result.data else []
+        projects_list = projects_repo.list()
         return render_template('projects.html', projects=projects_list, user=session['user'])
     except Exception as e:
         print(f"{ANSI['R']}Error loading projects: {e}{ANSI['W']}")
@@ -178,20 +459,15 @@ def projects():
 
 @app.route('/datasets')
 @login_required
+@response_cache.cached
 def datasets():
     """Datasets listing page"""
     try:
         # Get datasets with project information
-        result = supabase.table("datasets").select("""
-            id, name, description, size_mb, format, source_url, created_at,
-            ai_projects(id, name, model_type)
-        """).order("created_at", desc=True).execute()
-        
-        datasets_list = result.data if result.data else []
+        datasets_list = datasets_repo.list()
         
-        # Also get all projects for the create form
-        projects_result = supabase.table("ai_projects").select("id, name").execute()
-        projects_list = projects_result.data if projects_result.data else []
+        # Also get all projects for the create form (shares the projects page query)
+        projects_list = projects_repo.list()
         
         return render_template('datasets.html', 
                              datasets=datasets_list, 
@@ -204,20 +480,18 @@ def datasets():
 
 @app.route('/project/<project_id>')
 @login_required
+@response_cache.cached
 def project_detail(project_id):
     """Individual project detail page"""
     try:
         # Get project details
-        project_result = supabase.table("ai_projects").select("*").eq("id", project_id).execute()
-        if not project_result.data:
+        project = projects_repo.get(project_id)
+        if not project:
             flash('Project not found.', 'error')
             return redirect(url_for('projects'))
         
-        project = project_result.data[0]
-        
         # Get associated datasets
-        datasets_result = supabase.table("datasets").select("*").eq("ai_project_id", project_id).execute()
-        datasets_list = datasets_result.data if datasets_result.data else []
+        datasets_list = datasets_repo.by_project(project_id)
         
         return render_template('project_detail.html', 
                              project=project, 
@@ -228,6 +502,33 @@ def project_detail(project_id):
         flash('Error loading project details.', 'error')
         return redirect(url_for('projects'))
 
+# ============================================================================
+# HEALTH CHECKS
+# ============================================================================
+
+readiness = {'checked_at': 0.0, 'body': None, 'status': 503}
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests (no upstream calls)"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: Supabase answers a one-row HEAD query; the result is reused for a few seconds"""
+    now = time.monotonic()
+    if readiness['body'] is None or now - readiness['checked_at'] >= readiness_cache_seconds:
+        try:
+            latency = projects_repo.ping(client=supabase, timeout=readiness_timeout)
+            readiness['body'] = {'status': 'ready', 'supabase_ms': round(latency * 1000, 1)}
+            readiness['status'] = 200
+        except Exception as e:
+            readiness['body'] = {'status': 'unavailable', 'error': str(e)}
+            readiness['status'] = 503
+        readiness['checked_at'] = now
+    body = dict(readiness['body'], circuit=resilience.breaker.state)
+    return jsonify(body), readiness['status']
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
@@ -250,17 +551,13 @@ def api_get_projects():
         limit = int(request.args.get('limit', 10))
         offset = (page - 1) * limit
         
-        # Get total count
-        count_result = supabase.table("ai_projects").select("id", count="exact").execute()
-        total = len(count_result.data) if count_result.data else 0
-        
-        # Get paginated projects
-        result = supabase.table("ai_projects").select("*").order("created_at", desc=True).range(offset, offset + limit - 1).execute()
-        projects = result.data if result.data else []
+        # Get paginated projects and total count
+        projects = projects_repo.list(offset, limit)
+        total = projects_repo.count()
         
         return jsonify({
             'success': True,
-            'data': projects,
+            'data': [project.to_dict() for project in projects],
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -270,7 +567,7 @@ def api_get_projects():
         })
     except Exception as e:
         print(f"{ANSI['R']}API Error getting projects: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/projects', methods=['POST'])
 @login_required
@@ -282,31 +579,31 @@ def api_create_project():
         if not data.get('name') or not data.get('model_type'):
             return jsonify({'success': False, 'error': 'Name and model_type are required'}), 400
         
-        result = supabase.table("ai_projects").insert({
-            "name": data['name'],
-            "description": data.get('description', ''),
-            "model_type": data['model_type'],
-            "hyperparameters": data.get('hyperparameters', {})
-        }).execute()
+        project = projects_repo.create(
+            name=data['name'],
+            description=data.get('description', ''),
+            model_type=data['model_type'],
+            hyperparameters=data.get('hyperparameters', {})
+        )
         
-        return jsonify({'success': True, 'data': result.data[0] if result.data else None})
+        return jsonify({'success': True, 'data': project.to_dict() if project else None})
     except Exception as e:
         print(f"{ANSI['R']}API Error creating project: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/projects/<project_id>', methods=['GET'])
 @login_required
 def api_get_project(project_id):
     """API: Get specific project"""
     try:
-        result = supabase.table("ai_projects").select("*").eq("id", project_id).execute()
-        if not result.data:
+        project = projects_repo.get(project_id)
+        if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
         
-        return jsonify({'success': True, 'data': result.data[0]})
+        return jsonify({'success': True, 'data': project.to_dict()})
     except Exception as e:
         print(f"{ANSI['R']}API Error getting project: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/projects/<project_id>', methods=['PUT'])
 @login_required
@@ -325,30 +622,28 @@ def api_update_project(project_id):
         if 'hyperparameters' in data:
             update_data['hyperparameters'] = data['hyperparameters']
         
-        result = supabase.table("ai_projects").update(update_data).eq("id", project_id).execute()
+        project = projects_repo.update(project_id, update_data)
         
-        if not result.data:
+        if not project:
             return jsonify({'success': False, 'error': 'Project not found'}), 404
         
-        return jsonify({'success': True, 'data': result.data[0]})
+        return jsonify({'success': True, 'data': project.to_dict()})
     except Exception as e:
         print(f"{ANSI['R']}API Error updating project: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/projects/<project_id>', methods=['DELETE'])
 @login_required
 def api_delete_project(project_id):
     """API: Delete specific project"""
     try:
-        result = supabase.table("ai_projects").delete().eq("id", project_id).execute()
-        
-        if not result.data:
+        if not projects_repo.delete(project_id):
             return jsonify({'success': False, 'error': 'Project not found'}), 404
         
         return jsonify({'success': True, 'message': 'Project deleted successfully'})
     except Exception as e:
         print(f"{ANSI['R']}API Error deleting project: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/datasets', methods=['GET'])
 @login_required
@@ -359,21 +654,13 @@ def api_get_datasets():
         limit = int(request.args.get('limit', 10))
         offset = (page - 1) * limit
         
-        # Get total count
-        count_result = supabase.table("datasets").select("id", count="exact").execute()
-        total = len(count_result.data) if count_result.data else 0
-        
-        # Get paginated datasets with project info
-        result = supabase.table("datasets").select("""
-            id, name, description, size_mb, format, source_url, created_at,
-            ai_projects(id, name, model_type)
-        """).order("created_at", desc=True).range(offset, offset + limit - 1).execute()
-        
-        datasets = result.data if result.data else []
+        # Get paginated datasets with project info and total count
+        datasets = datasets_repo.list(offset, limit)
+        total = datasets_repo.count()
         
         return jsonify({
             'success': True,
-            'data': datasets,
+            'data': [dataset.to_dict() for dataset in datasets],
             'pagination': {
                 'page': page,
                 'limit': limit,
@@ -383,7 +670,7 @@ def api_get_datasets():
         })
     except Exception as e:
         print(f"{ANSI['R']}API Error getting datasets: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/datasets', methods=['POST'])
 @login_required
@@ -395,37 +682,35 @@ def api_create_dataset():
         if not data.get('name') or not data.get('size_mb') or not data.get('ai_project_id'):
             return jsonify({'success': False, 'error': 'Name, size_mb, and ai_project_id are required'}), 400
         
-        result = supabase.table("datasets").insert({
-            "name": data['name'],
-            "description": data.get('description', ''),
-            "size_mb": int(data['size_mb']),
-            "format": data.get('format', ''),
-            "source_url": data.get('source_url', ''),
-            "ai_project_id": data['ai_project_id']
-        }).execute()
-        
-        return jsonify({'success': True, 'data': result.data[0] if result.data else None})
+        dataset, created = datasets_repo.create_or_link(
+            name=data['name'],
+            description=data.get('description', ''),
+            size_mb=int(data['size_mb']),
+            format=data.get('format', ''),
+            source_url=data.get('source_url', ''),
+            ai_project_id=data['ai_project_id']
+        )
+        
+        # duplicate: the project was linked to an existing dataset with the same content
+        return jsonify({'success': True, 'data': dataset.to_dict() if dataset else None, 'duplicate': not created})
     except Exception as e:
         print(f"{ANSI['R']}API Error creating dataset: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/datasets/<dataset_id>', methods=['GET'])
 @login_required
 def api_get_dataset(dataset_id):
     """API: Get specific dataset"""
     try:
-        result = supabase.table("datasets").select("""
-            id, name, description, size_mb, format, source_url, created_at,
-            ai_projects(id, name, model_type)
-        """).eq("id", dataset_id).execute()
+        dataset = datasets_repo.get(dataset_id)
         
-        if not result.data:
+        if not dataset:
             return jsonify({'success': False, 'error': 'Dataset not found'}), 404
         
-        return jsonify({'success': True, 'data': result.data[0]})
+        return jsonify({'success': True, 'data': dataset.to_dict()})
     except Exception as e:
         print(f"{ANSI['R']}API Error getting dataset: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/datasets/<dataset_id>', methods=['PUT'])
 @login_required
@@ -448,89 +733,91 @@ def api_update_dataset(dataset_id):
         if 'ai_project_id' in data:
             update_data['ai_project_id'] = data['ai_project_id']
         
-        result = supabase.table("datasets").update(update_data).eq("id", dataset_id).execute()
+        access_key = (session['user']['id'], dataset_id)
+        if write_buffer is not None:
+            if set(update_data) == {'size_mb'} and buffered_access.get(access_key) is not MISSING:
+                # High-frequency size updates are coalesced and written in the next flush
+                write_buffer.submit(dataset_id, update_data, client=get_db(), user=session['user']['id'])
+                return jsonify({'success': True, 'queued': True, 'data': dict(update_data, id=dataset_id)}), 202
+            # Write buffered changes first, so they cannot overwrite this update later
+            write_buffer.flush([dataset_id])
         
-        if not result.data:
-            return jsonify({'success': False, 'error': 'Dataset not found'}), 404
+        dataset = datasets_repo.update(dataset_id, update_data)
         
-        return jsonify({'success': True, 'data': result.data[0]})
+        if not dataset:
+            return jsonify({'success': False, 'error': 'Dataset not found'}), 404
+        if write_buffer is not None:
+            # The user's own client (and RLS update policy) just wrote this row: buffer their next updates,
+            # which may be replayed with the service-role key after a restart
+            buffered_access.set(access_key, True)
+        
+        return jsonify({'success': True, 'data': dataset.to_dict()})
+    except DuplicateContentError as e:
+        # Link the project to e.existing instead (POST /api/datasets does that) or delete this copy
+        return jsonify({'success': False, 'error': str(e), 'duplicate_of': e.existing.id}), 409
     except Exception as e:
         print(f"{ANSI['R']}API Error updating dataset: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/datasets/<dataset_id>', methods=['DELETE'])
 @login_required
 def api_delete_dataset(dataset_id):
     """API: Delete specific dataset"""
     try:
-        result = supabase.table("datasets").delete().eq("id", dataset_id).execute()
-        
-        if not result.data:
+        if write_buffer is not None:
+            write_buffer.flush([dataset_id])
+        if not datasets_repo.delete(dataset_id):
             return jsonify({'success': False, 'error': 'Dataset not found'}), 404
         
         return jsonify({'success': True, 'message': 'Dataset deleted successfully'})
     except Exception as e:
         print(f"{ANSI['R']}API Error deleting dataset: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/projects/<project_id>/datasets', methods=['GET'])
 @login_required
 def api_get_project_datasets(project_id):
     """API: Get datasets for specific project"""
     try:
-        result = supabase.table("datasets").select("*").eq("ai_project_id", project_id).order("created_at", desc=True).execute()
-        datasets = result.data if result.data else []
+        datasets = datasets_repo.by_project(project_id)
         
-        return jsonify({'success': True, 'data': datasets})
+        return jsonify({'success': True, 'data': [dataset.to_dict() for dataset in datasets]})
     except Exception as e:
         print(f"{ANSI['R']}API Error getting project datasets: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
 
 @app.route('/api/stats', methods=['GET'])
 @login_required
 def api_get_stats():
     """API: Get dashboard statistics"""
     try:
-        # Get projects
-        projects_result = supabase.table("ai_projects").select("*").execute()
-        projects = projects_result.data if projects_result.data else []
-        
-        # Get datasets
-        datasets_result = supabase.table("datasets").select("*").execute()
-        datasets = datasets_result.data if datasets_result.data else []
-        
-        # Calculate statistics
-        total_projects = len(projects)
-        total_datasets = len(datasets)
-        total_size_mb = sum(d.get('size_mb', 0) for d in datasets)
-        
-        # Project types breakdown
-        project_types = {}
-        for project in projects:
-            ptype = project.get('model_type', 'Unknown')
-            project_types[ptype] = project_types.get(ptype, 0) + 1
-        
-        # Dataset formats breakdown
-        dataset_formats = {}
-        for dataset in datasets:
-            fmt = dataset.get('format', 'Unknown')
-            dataset_formats[fmt] = dataset_formats.get(fmt, 0) + 1
-        
-        stats = {
-            'total_projects': total_projects,
-            'total_datasets': total_datasets,
-            'total_size_mb': total_size_mb,
-            'total_size_gb': round(total_size_mb / 1024, 1),
-            'project_types': project_types,
-            'dataset_formats': dataset_formats
-        }
+        stats = build_stats(projects_repo.list(), datasets_repo.list(), datasets_repo.linked_ids())
         
         return jsonify({'success': True, 'data': stats})
     except Exception as e:
         print(f"{ANSI['R']}API Error getting stats: {e}{ANSI['W']}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+        return api_error(e)
+
+@app.route('/api/metrics', methods=['GET'])
+@login_required
+def api_get_metrics():
+    """API: Get internal performance counters"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'singleflight': flights.stats(),
+            'read_cache': read_cache.stats(),
+            'mirror': mirror.stats() if mirror else {'enabled': False},
+            'resilience': resilience.stats(),
+            'write_buffer': write_buffer.stats() if write_buffer else {'enabled': False},
+            'fragment_cache': fragment_cache.stats(),
+            'response_cache': response_cache.stats()
+        }
+    })
 
 if __name__ == '__main__':
+    # Development server; use gunicorn in production: gunicorn -c gunicorn.conf.py wsgi:app
+    start_background_work()
     print(f"🌐 {ANSI['G']}Starting Supabase-Experiments Web Application{ANSI['W']}")
     print(f"{ANSI['B']}Visit: http://localhost:5000{ANSI['W']}")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,116 @@
+# assets.py
+"""
+Static asset pipeline: minified, content-hashed copies of the CSS/JS files
+are written to static/dist with a manifest, templates link them through
+asset_url(), and hashed files are served with an immutable Cache-Control.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+# Source files, relative to the static folder
+ASSETS = ('css/style.css', 'js/main.js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE_MAX_AGE = 31536000  # One year: a changed file gets a new name
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace"""
+    css = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_js(source):
+    """
+    Conservative minification: drop comment-only lines, blank lines and
+    indentation. Lines inside template literals are kept verbatim.
+    """
+    source = re.sub(r'^\s*/\*.*?\*/\s*$', '', source, flags=re.S | re.M)
+    lines = []
+    in_template = False
+    for line in source.splitlines():
+        stripped = line if in_template else line.strip()
+        if not in_template and (not stripped or stripped.startswith('//')):
+            continue
+        lines.append(stripped)
+        # An odd number of unescaped backticks opens or closes a template literal
+        if len(re.findall(r'(?<!\\)`', line)) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build_assets(static_folder, assets=ASSETS):
+    """
+    Write minified, content-hashed copies of assets to static/dist and the
+    manifest mapping each source to its hashed file. Returns the manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for asset in assets:
+        root, extension = os.path.splitext(asset)
+        with open(os.path.join(static_folder, asset), encoding='utf-8') as f:
+            content = MINIFIERS.get(extension, lambda s: s)(f.read())
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+        hashed = f"{DIST_DIR}/{root}.{digest}{extension}"
+        path = os.path.join(static_folder, hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        manifest[asset] = hashed
+
+    # Drop hashed files from previous builds
+    current = {os.path.normpath(os.path.join(static_folder, hashed)) for hashed in manifest.values()}
+    for directory, _, files in os.walk(dist):
+        for name in files:
+            path = os.path.normpath(os.path.join(directory, name))
+            if name != MANIFEST and path not in current:
+                os.remove(path)
+
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """The build manifest, or {} when assets have not been built"""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_assets(app):
+    """
+    Register asset_url() for templates and long-lived caching of hashed files.
+    Without a build, asset_url() falls back to the source files.
+    """
+    from flask import request, url_for
+
+    manifest = load_manifest(app.static_folder)
+
+    def asset_url(filename):
+        return url_for('static', filename=manifest.get(filename, filename))
+
+    @app.after_request
+    def cache_hashed_assets(response):
+        filename = (request.view_args or {}).get('filename', '')
+        if request.endpoint == 'static' and filename.startswith(f"{DIST_DIR}/") and response.status_code in (200, 304):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
+
+    app.jinja_env.globals['asset_url'] = asset_url
+    return manifest
@@ -0,0 +1,180 @@
+# auth_tokens.py
+"""
+Local verification of Supabase access tokens and per-user client caching.
+Tokens are checked offline against the project JWT secret or a cached JWKS,
+so authenticated requests do not need a round trip to Supabase Auth.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+from config import ANSI
+from resilience import TRANSIENT_STATUSES, is_transient
+
+# Algorithms Supabase uses for asymmetric signing keys published in the JWKS
+ASYMMETRIC_ALGORITHMS = ['RS256', 'ES256']
+
+
+class VerificationUnavailable(Exception):
+    """
+    A token could not be checked because the JWKS or Supabase Auth is unreachable.
+    Not a jwt.PyJWTError: it says nothing about the token, so sessions must survive it.
+    """
+
+
+def _auth_unavailable(error):
+    """Network failures, throttling and 5xx answers from Supabase Auth (compared by class name, see resilience)"""
+    return (is_transient(error) or type(error).__name__ == 'AuthRetryableError'
+            or getattr(error, 'status', None) in TRANSIENT_STATUSES)
+
+
+class TokenVerifier:
+    """
+    Verify Supabase access tokens without calling the Auth server.
+    The scheme follows each token's header: asymmetric tokens (RS256/ES256) are
+    checked against the project's JWKS, fetched once and cached for
+    jwks_lifespan seconds; legacy HS256 tokens against the JWT secret.
+
+    remote        callable(access_token) that raises unless Supabase Auth accepts
+                  the token; used for HS256 tokens when no secret is configured, at
+                  the cost of one round trip per token (accepted tokens are cached)
+    jwks_timeout  seconds a JWKS fetch may take before VerificationUnavailable
+    """
+
+    def __init__(self, supabase_url, jwt_secret=None, audience='authenticated', leeway=10, jwks_lifespan=3600,
+                 remote=None, remote_cache_size=1024, jwks_timeout=3):
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.leeway = leeway
+        self.remote = remote
+        self.remote_cache_size = remote_cache_size
+        self._remote_verified = OrderedDict()
+        self._lock = threading.Lock()
+        self._warned = False
+        self._jwks_client = jwt.PyJWKClient(
+            f"{supabase_url}/auth/v1/.well-known/jwks.json",
+            cache_jwk_set=True,
+            lifespan=jwks_lifespan,
+            timeout=jwks_timeout
+        )
+
+    def _decode(self, access_token, key, algorithms, verify_signature=True):
+        return jwt.decode(
+            access_token,
+            key,
+            algorithms=algorithms,
+            audience=self.audience,
+            leeway=self.leeway,
+            # Expiry and audience are checked even when the signature is vouched for remotely
+            options={'require': ['exp', 'sub'], 'verify_signature': verify_signature, 'verify_exp': True, 'verify_aud': True}
+        )
+
+    def verify(self, access_token):
+        """
+        Return the claims of a valid token.
+        Raises jwt.ExpiredSignatureError for expired tokens, jwt.PyJWTError for other
+        invalid ones, and VerificationUnavailable when the token could not be checked.
+        """
+        algorithm = jwt.get_unverified_header(access_token).get('alg')
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            try:
+                signing_key = self._jwks_client.get_signing_key_from_jwt(access_token).key
+            except jwt.PyJWKClientConnectionError as e:
+                raise VerificationUnavailable(f"JWKS unreachable: {e}") from e
+            return self._decode(access_token, signing_key, ASYMMETRIC_ALGORITHMS)
+        if algorithm != 'HS256':
+            raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm {algorithm!r}")
+        if self.jwt_secret:
+            return self._decode(access_token, self.jwt_secret, ['HS256'])
+        if self.remote is None:
+            raise jwt.InvalidAlgorithmError(
+                "HS256 token received but SUPABASE_JWT_SECRET is not set: "
+                "set it to the project's legacy JWT secret to verify these tokens")
+        return self._verify_remotely(access_token)
+
+    def _verify_remotely(self, access_token):
+        """HS256 token without the secret: claims are read locally, the signature is vouched for by Supabase Auth"""
+        claims = self._decode(access_token, None, ['HS256'], verify_signature=False)  # Expiry first, offline
+        with self._lock:
+            if access_token in self._remote_verified:
+                self._remote_verified.move_to_end(access_token)
+                return claims
+        if not self._warned:
+            self._warned = True
+            print(f"{ANSI['Y']}HS256 tokens are verified through Supabase Auth; "
+                  f"set SUPABASE_JWT_SECRET to verify them locally{ANSI['W']}")
+        try:
+            self.remote(access_token)
+        except Exception as e:
+            if _auth_unavailable(e):
+                raise VerificationUnavailable(f"Supabase Auth unreachable: {e}") from e
+            raise jwt.InvalidSignatureError(f"Supabase Auth rejected the token: {e}") from e
+        with self._lock:
+            self._remote_verified[access_token] = True
+            while len(self._remote_verified) > self.remote_cache_size:
+                self._remote_verified.popitem(last=False)
+        return claims
+
+
+def seconds_until_expiry(claims):
+    """Seconds left before the token described by claims expires"""
+    return claims['exp'] - time.time()
+
+
+def refresh_session(url, key, refresh_token):
+    """
+    Exchange a refresh token for a new session.
+    A throwaway client is used so the shared client's auth state is never touched.
+    """
+    from supabase import create_client, ClientOptions  # Deferred: heavy, and only needed on refresh
+    client = create_client(url, key, options=ClientOptions(auto_refresh_token=False, persist_session=False))
+    response = client.auth.refresh_session(refresh_token)
+    return response.session
+
+
+class UserClientCache:
+    """
+    Bounded LRU of Supabase clients authenticated as individual users.
+    Queries made through these clients carry the user's JWT, so RLS policies apply.
+    """
+
+    def __init__(self, url, key, maxsize=256):
+        self.url = url
+        self.key = key
+        self.maxsize = maxsize
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, access_token):
+        """Return the cached client for this user and token, creating it if needed"""
+        with self._lock:
+            entry = self._clients.get(user_id)
+            if entry and entry[0] == access_token:
+                self._clients.move_to_end(user_id)
+                return entry[1]
+
+        # Building a client does no network I/O, but keep it outside the lock anyway
+        from supabase import create_client, ClientOptions
+        client = create_client(self.url, self.key, options=ClientOptions(
+            headers={'Authorization': f"Bearer {access_token}"},
+            auto_refresh_token=False,
+            persist_session=False
+        ))
+
+        with self._lock:
+            self._clients[user_id] = (access_token, client)
+            self._clients.move_to_end(user_id)
+            while len(self._clients) > self.maxsize:
+                self._clients.popitem(last=False)
+        return client
+
+    def discard(self, user_id):
+        """Drop the cached client for a user (logout, token rotation)"""
+        with self._lock:
+            self._clients.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._clients)
@@ -0,0 +1,89 @@
+# bench_import.py
+"""
+Startup cost of the application and CLI entry points.
+
+    python benchmarks/bench_import.py [--runs 5] [--top 10] [module ...]
+
+Imports each module in a fresh interpreter with `-X importtime` and without
+Supabase credentials, then reports the wall-clock start time and where the
+import time goes, summed per top-level package.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ['app', 'main_exercice', 'repository', 'analytics']
+
+def import_once(module):
+    """Import module in a fresh interpreter; returns (wall seconds, -X importtime lines)"""
+    env = {k: v for k, v in os.environ.items() if k not in ('SUPABASE_URL', 'SUPABASE_KEY')}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, result.stderr.splitlines()
+
+def parse_importtime(lines):
+    """[(module, self µs, cumulative µs)] from -X importtime output"""
+    entries = []
+    for line in lines:
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line.split(':', 1)[1].split('|')
+        entries.append((name.strip(), int(self_us), int(cumulative)))
+    return entries
+
+def by_package(entries):
+    """Self time summed per top-level package, so nothing is counted twice"""
+    totals = {}
+    for name, self_us, _ in entries:
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+def report(module, runs, top):
+    walls = []
+    entries = []
+    for _ in range(runs):
+        wall, lines = import_once(module)
+        walls.append(wall)
+        entries = parse_importtime(lines)  # Keep the last (warm) run
+
+    total_ms = sum(self_us for _, self_us, _ in entries) / 1000
+    print(f"\n📦 {ANSI['G']}{module}{ANSI['W']}: start {statistics.median(walls) * 1000:.0f} ms median "
+          f"(min {min(walls) * 1000:.0f} ms), imports {total_ms:.0f} ms, {len(entries)} modules")
+    for package, self_us in by_package(entries)[:top]:
+        share = self_us / 1000 / total_ms * 100 if total_ms else 0
+        print(f"  {ANSI['B']}{package:<24}{ANSI['W']} {self_us / 1000:7.1f} ms  {share:4.1f}%")
+    heavy = [name for name in ('supabase', 'pyarrow', 'numpy') if any(e[0] == name for e in entries)]
+    if heavy:
+        print(f"  {ANSI['Y']}Imported at startup: {', '.join(heavy)}{ANSI['W']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument('--top', type=int, default=10, help="Packages listed per module")
+    args = parser.parse_args()
+
+    print(f"⏱️  {ANSI['G']}Import time ({args.runs} runs each, no Supabase credentials){ANSI['W']}")
+    print("=" * 60)
+    for module in args.modules:
+        try:
+            report(module, args.runs, args.top)
+        except RuntimeError as e:
+            print(f"\n{ANSI['R']}❌ {module}: {e}{ANSI['W']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_models.py
+"""
+Memory and throughput of raw PostgREST dicts versus the slotted models.
+
+    python benchmarks/bench_models.py [--rows 100000]
+
+Builds a synthetic datasets response (with the embedded ai_projects join),
+then decodes it both ways and reports decode time, retained memory and the
+time of a stats-style pass over the result.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSI
+from models import decode_datasets
+
+FORMATS = ['CSV', 'JSON', 'PARQUET', 'JPG']
+MODEL_TYPES = ['NLP', 'Computer Vision', 'Time Series']
+
+def make_response(rows, projects=200):
+    """Synthetic JSON body shaped like the /datasets query"""
+    data = []
+    for i in range(rows):
+        p = i % projects
+        data.append({
+            'id': f"00000000-0000-0000-0000-{i:012d}",
+            'name': f"Dataset {i}",
+            'description': "Synthetic dataset used for benchmarking",
+            'size_mb': i % 5000,
+            'format': FORMATS[i % len(FORMATS)],
+            'source_url': f"https://example.com/datasets/{i}",
+            'created_at': "2025-01-01T00:00:00.000000",
+            'ai_projects': {
+                'id': f"11111111-0000-0000-0000-{p:012d}",
+                'name': f"Project {p}",
+                'model_type': MODEL_TYPES[p % len(MODEL_TYPES)],
+            },
+        })
+    return json.dumps(data).encode()
+
+def postgrest_decode(raw):
+    """What execute() does: validate the body into an APIResponse, then use .data"""
+    import httpx
+    from postgrest.base_request_builder import APIResponse
+    response = httpx.Response(200, content=raw, request=httpx.Request('GET', 'http://localhost'))
+    return APIResponse.from_http_request_response(response).data
+
+def measure(label, decode, raw):
+    """Decode raw, returning (result, seconds, retained bytes)"""
+    gc.collect()
+    started = time.perf_counter()
+    decode(raw)
+    elapsed = time.perf_counter() - started
+
+    # Separate run for memory: tracing slows decoding down considerably
+    gc.collect()
+    tracemalloc.start()
+    result = decode(raw)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{ANSI['B']}{label:<10}{ANSI['W']} decode {elapsed:.3f}s ({len(result) / elapsed:,.0f} rows/s) | retained {retained / 1024 / 1024:.1f} MB")
+    return result, elapsed, retained
+
+def stats_pass(label, datasets, size, fmt):
+    started = time.perf_counter()
+    total = 0
+    formats = {}
+    for dataset in datasets:
+        total += size(dataset)
+        key = fmt(dataset)
+        formats[key] = formats.get(key, 0) + 1
+    print(f"{ANSI['B']}{label:<10}{ANSI['W']} stats pass {time.perf_counter() - started:.3f}s (total {total} MB)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    raw = make_response(args.rows)
+    print(f"📦 {ANSI['G']}{args.rows} rows, {len(raw) / 1024 / 1024:.1f} MB of JSON{ANSI['W']}")
+    print("=" * 60)
+
+    try:
+        measure('postgrest', postgrest_decode, raw)
+    except ImportError:
+        print(f"{ANSI['Y']}postgrest not installed, skipping execute() baseline{ANSI['W']}")
+    dicts, dict_time, dict_mem = measure('dicts', json.loads, raw)
+    models, model_time, model_mem = measure('models', decode_datasets, raw)
+    print("-" * 60)
+    stats_pass('dicts', dicts, lambda d: d.get('size_mb', 0), lambda d: d.get('format', 'Unknown'))
+    stats_pass('models', models, lambda d: d.size_mb, lambda d: d.format)
+    print("-" * 60)
+    print(f"📉 {ANSI['G']}Memory: {dict_mem / model_mem:.2f}x smaller with models "
+          f"({(dict_mem - model_mem) / 1024 / 1024:.1f} MB saved){ANSI['W']}")
+
+if __name__ == "__main__":
+    main()
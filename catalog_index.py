@@ -0,0 +1,116 @@
+# catalog_index.py
+"""
+Content-addressed index of the dataset catalog.
+A dataset's fingerprint is derived from its normalized source_url, size and
+format, so the same data registered under several projects (or several
+times) maps to one fingerprint. Datasets without a source_url are never
+considered duplicates.
+"""
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Tracking parameters that change the URL but not the data behind it: any utm_* key, plus these exact
+# keys. Everything else (e.g. ref, which selects a git revision on many hosts) is kept
+IGNORED_PARAM_PREFIXES = ('utm_',)
+IGNORED_PARAMS = {'fbclid', 'gclid'}
+
+
+def _ignored(param):
+    param = param.lower()
+    return param in IGNORED_PARAMS or param.startswith(IGNORED_PARAM_PREFIXES)
+
+
+def normalize_source_url(url):
+    """
+    Canonical form of a source URL: lowercase scheme and host, no default
+    port, fragment, tracking parameters or trailing slash, sorted query.
+    Returns None for empty URLs.
+    """
+    url = (url or '').strip()
+    if not url:
+        return None
+    parts = urlsplit(url if '://' in url else f"https://{url}")
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _ignored(k))
+    return urlunsplit((scheme, host, parts.path.rstrip('/') or '/', urlencode(query), ''))
+
+
+def fingerprint(source_url, size_mb, format):
+    """Fingerprint of a dataset's content, or None when it has no source_url"""
+    url = normalize_source_url(source_url)
+    if url is None:
+        return None
+    key = f"{url}|{int(size_mb or 0)}|{(format or '').strip().lower()}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def dataset_fingerprint(dataset):
+    """fingerprint() of a Dataset model or a raw row"""
+    if isinstance(dataset, dict):
+        return fingerprint(dataset.get('source_url'), dataset.get('size_mb'), dataset.get('format'))
+    return fingerprint(dataset.source_url, dataset.size_mb, dataset.format)
+
+
+def _field(dataset, name):
+    return dataset.get(name) if isinstance(dataset, dict) else getattr(dataset, name)
+
+
+def plan_dedupe(datasets):
+    """
+    Group duplicate datasets: [(canonical, [duplicates...]), ...].
+    The oldest registration of each fingerprint is kept as the canonical record.
+    """
+    groups = {}
+    for dataset in datasets:
+        fp = dataset_fingerprint(dataset)
+        if fp is not None:
+            groups.setdefault(fp, []).append(dataset)
+    plan = []
+    for members in groups.values():
+        if len(members) > 1:
+            members.sort(key=lambda d: (_field(d, 'created_at') or '', _field(d, 'id')))
+            plan.append((members[0], members[1:]))
+    return plan
+
+
+def dedup_totals(datasets, linked_ids=()):
+    """
+    Logical totals (every registration: each dataset row, plus each extra
+    project linked to a dataset) next to deduplicated totals (each
+    fingerprint counted once; datasets without one are counted as unique).
+    linked_ids holds the dataset_id of every dataset_projects link.
+    """
+    logical_count = 0
+    logical_size = 0
+    unique_count = 0
+    unique_size = 0
+    sizes = {}
+    seen = set()
+    for dataset in datasets:
+        size = _field(dataset, 'size_mb') or 0
+        sizes[_field(dataset, 'id')] = size
+        logical_count += 1
+        logical_size += size
+        fp = dataset_fingerprint(dataset)
+        if fp is None or fp not in seen:
+            unique_count += 1
+            unique_size += size
+            if fp is not None:
+                seen.add(fp)
+    for dataset_id in linked_ids:
+        if dataset_id in sizes:
+            logical_count += 1
+            logical_size += sizes[dataset_id]
+    return {
+        'logical_datasets': logical_count,
+        'logical_size_mb': logical_size,
+        'deduplicated_datasets': unique_count,
+        'deduplicated_size_mb': unique_size,
+        'duplicate_datasets': logical_count - unique_count,
+    }
@@ -0,0 +1,46 @@
+# clients.py
+"""
+Lazily constructed, cached Supabase clients.
+The supabase package is imported and the client built on first use, so
+processes that never reach Supabase (tests, --help, asset builds, health
+checks) start fast and do not need credentials.
+"""
+
+import os
+import threading
+
+from config import load_env
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(url=None, key=None):
+    """The shared client for url/key, SUPABASE_URL/SUPABASE_KEY by default"""
+    load_env()
+    url = url or os.getenv("SUPABASE_URL")
+    key = key or os.getenv("SUPABASE_KEY")
+    client = _clients.get((url, key))
+    if client is None:
+        with _lock:
+            client = _clients.get((url, key))
+            if client is None:
+                if not url or not key:
+                    raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set (see .env)")
+                from supabase import create_client
+                client = _clients[(url, key)] = create_client(url, key)
+    return client
+
+
+class LazyClient:
+    """Stands in for the default client and builds it on first use"""
+
+    def __init__(self, url=None, key=None):
+        self._url = url
+        self._key = key
+
+    def __getattr__(self, name):
+        return getattr(get_client(self._url, self._key), name)
+
+    def __repr__(self):
+        return f"LazyClient({self._url or 'SUPABASE_URL'})"
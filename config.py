@@ -5,4 +5,14 @@ ANSI = {
     'B' : '\033[94m',  # Blue
     'Y' : '\033[93m',  # Yellow
     'W' : '\033[0m',  # White
-}
\ No newline at end of file
+}
+
+_env_loaded = False
+
+def load_env():
+    """Load .env into os.environ once; variables already set take precedence"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
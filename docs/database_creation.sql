@@ -26,4 +26,124 @@ CREATE INDEX idx_datasets_ai_project_id ON datasets(ai_project_id);
 
 -- Example insertions (optional)
 -- INSERT INTO datasets (name, description, size_mb, format, ai_project_id) 
--- VALUES ('Spam emails dataset', 'Collection of labeled spam/non-spam emails', 150, 'CSV', 'PROJECT_UUID');
\ No newline at end of file
+-- VALUES ('Spam emails dataset', 'Collection of labeled spam/non-spam emails', 150, 'CSV', 'PROJECT_UUID');
+
+-- Optional: updated_at columns so the local read replica (MIRROR_PATH) can pull
+-- edits incrementally instead of waiting for its periodic full refresh
+ALTER TABLE ai_projects ADD COLUMN updated_at TIMESTAMP DEFAULT NOW();
+ALTER TABLE datasets ADD COLUMN updated_at TIMESTAMP DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER ai_projects_updated_at BEFORE UPDATE ON ai_projects
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+CREATE TRIGGER datasets_updated_at BEFORE UPDATE ON datasets
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE INDEX idx_ai_projects_updated_at ON ai_projects(updated_at);
+CREATE INDEX idx_datasets_updated_at ON datasets(updated_at);
+
+-- Optional: batched partial updates, used by the write-behind buffer (WRITE_BUFFER_ENABLED).
+-- A plain upsert cannot carry partial rows (name and size_mb are NOT NULL), so updates are
+-- sent as a JSON array and applied in one statement; only the keys present are changed.
+-- SECURITY INVOKER keeps Row Level Security in force for the calling user.
+CREATE OR REPLACE FUNCTION apply_dataset_updates(updates JSONB)
+RETURNS SETOF datasets
+LANGUAGE sql SECURITY INVOKER AS $$
+  UPDATE datasets d SET
+    name        = CASE WHEN u ? 'name'        THEN u->>'name'                    ELSE d.name END,
+    description = CASE WHEN u ? 'description' THEN u->>'description'             ELSE d.description END,
+    size_mb     = CASE WHEN u ? 'size_mb'     THEN (u->>'size_mb')::INTEGER      ELSE d.size_mb END,
+    format      = CASE WHEN u ? 'format'      THEN u->>'format'                  ELSE d.format END,
+    source_url  = CASE WHEN u ? 'source_url'  THEN u->>'source_url'              ELSE d.source_url END
+  FROM jsonb_array_elements(updates) AS u
+  WHERE d.id = (u->>'id')::UUID
+  RETURNING d.*;
+$$;
+
+-- Optional: content-addressed catalog (CATALOG_DEDUPE_ENABLED).
+-- fingerprint identifies a dataset's content (normalized source_url, size and format,
+-- see catalog_index.py); a project registering content that is already catalogued is
+-- linked to the existing dataset through dataset_projects instead of duplicating it.
+-- Existing rows start without a fingerprint: run `python scripts/dedupe_datasets.py --apply`
+-- to merge their duplicates and backfill it.
+ALTER TABLE datasets ADD COLUMN fingerprint VARCHAR(32);
+CREATE UNIQUE INDEX idx_datasets_fingerprint ON datasets(fingerprint) WHERE fingerprint IS NOT NULL;
+
+-- Projects using a dataset besides the one in datasets.ai_project_id.
+-- Deleting the owning project hands the dataset over to a linked project (see below),
+-- so it is only deleted once no project uses it.
+CREATE TABLE dataset_projects (
+  dataset_id UUID REFERENCES datasets(id) ON DELETE CASCADE,
+  ai_project_id UUID REFERENCES ai_projects(id) ON DELETE CASCADE,
+  created_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (dataset_id, ai_project_id)
+);
+
+CREATE INDEX idx_dataset_projects_ai_project_id ON dataset_projects(ai_project_id);
+
+-- Before a project is deleted, each dataset it owns that other projects are linked to
+-- becomes owned by the earliest of them (whose link it replaces), so the
+-- ON DELETE CASCADE on datasets.ai_project_id never removes data another project uses.
+-- SECURITY DEFINER: the hand-over must happen whatever the deleting user may update.
+CREATE OR REPLACE FUNCTION hand_over_linked_datasets() RETURNS TRIGGER
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+  WITH heirs AS (
+    SELECT DISTINCT ON (l.dataset_id) l.dataset_id, l.ai_project_id
+    FROM dataset_projects l JOIN datasets d ON d.id = l.dataset_id
+    WHERE d.ai_project_id = OLD.id AND l.ai_project_id <> OLD.id
+    ORDER BY l.dataset_id, l.created_at, l.ai_project_id
+  ), moved AS (
+    UPDATE datasets d SET ai_project_id = h.ai_project_id
+    FROM heirs h
+    WHERE d.id = h.dataset_id
+    RETURNING d.id, d.ai_project_id
+  )
+  DELETE FROM dataset_projects l
+  USING moved m
+  WHERE l.dataset_id = m.id AND l.ai_project_id = m.ai_project_id;
+  RETURN OLD;
+END;
+$$;
+
+CREATE TRIGGER ai_projects_hand_over_linked_datasets BEFORE DELETE ON ai_projects
+  FOR EACH ROW EXECUTE FUNCTION hand_over_linked_datasets();
+
+-- Edits that change the content (e.g. batched size_mb updates) drop a fingerprint that
+-- the writer did not recompute, so a stale one can never match new registrations
+CREATE OR REPLACE FUNCTION clear_stale_fingerprint() RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.fingerprint IS NOT DISTINCT FROM OLD.fingerprint AND (
+     NEW.source_url IS DISTINCT FROM OLD.source_url OR
+     NEW.size_mb IS DISTINCT FROM OLD.size_mb OR
+     NEW.format IS DISTINCT FROM OLD.format) THEN
+    NEW.fingerprint = NULL;
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER datasets_clear_stale_fingerprint BEFORE UPDATE ON datasets
+  FOR EACH ROW EXECUTE FUNCTION clear_stale_fingerprint();
+
+-- apply_dataset_updates (above) extended with fingerprint, used by the dedupe job to backfill it
+CREATE OR REPLACE FUNCTION apply_dataset_updates(updates JSONB)
+RETURNS SETOF datasets
+LANGUAGE sql SECURITY INVOKER AS $$
+  UPDATE datasets d SET
+    name        = CASE WHEN u ? 'name'        THEN u->>'name'                    ELSE d.name END,
+    description = CASE WHEN u ? 'description' THEN u->>'description'             ELSE d.description END,
+    size_mb     = CASE WHEN u ? 'size_mb'     THEN (u->>'size_mb')::INTEGER      ELSE d.size_mb END,
+    format      = CASE WHEN u ? 'format'      THEN u->>'format'                  ELSE d.format END,
+    source_url  = CASE WHEN u ? 'source_url'  THEN u->>'source_url'              ELSE d.source_url END,
+    fingerprint = CASE WHEN u ? 'fingerprint' THEN u->>'fingerprint'             ELSE d.fingerprint END
+  FROM jsonb_array_elements(updates) AS u
+  WHERE d.id = (u->>'id')::UUID
+  RETURNING d.*;
+$$;
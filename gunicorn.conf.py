@@ -0,0 +1,75 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings for production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Requests mostly wait on Supabase, so each worker runs several threads (gthread)
+and the worker count follows the CPU count. The app, its Supabase clients and
+compiled templates are loaded once in the master and shared copy-on-write
+by the workers; per-process threads are started after the fork. With several
+workers, DATA_VERSION_STORE and RATE_LIMIT_STORE default to SQLite files in
+GUNICORN_STATE_DIR, so every worker invalidates pages and counts requests alike.
+
+Graceful operations:
+    kill -HUP  <master>   restart workers (settings and environment are re-read;
+                          with preload_app, deploy new code with USR2 + WINCH + QUIT)
+    kill -TERM <master>   stop accepting, let requests finish for graceful_timeout,
+                          flush buffered writes, exit
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from config import load_env
+
+load_env()  # .env first, so the defaults below never override it
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+
+# Worker model: CPU-bound work is small next to upstream waits, so threads carry the concurrency
+cores = multiprocessing.cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY", min(cores * 2 + 1, 12)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# The app checks it: caches and stores kept in one process are wrong once there are several
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# State every worker must see the same way (page invalidation, rate limits) lives in SQLite files on this host
+if workers > 1:
+    state_dir = os.getenv("GUNICORN_STATE_DIR", os.path.join(tempfile.gettempdir(), "supabase-experiments"))
+    os.makedirs(state_dir, exist_ok=True)
+    os.environ.setdefault("DATA_VERSION_STORE", os.path.join(state_dir, "version.db"))
+    os.environ.setdefault("RATE_LIMIT_STORE", os.path.join(state_dir, "ratelimit.db"))
+worker_class = "gthread"
+
+# Load app.py once before forking
+preload_app = os.getenv("GUNICORN_PRELOAD", "True").lower() == "true"
+
+# Upstream calls are bounded by UPSTREAM_*_TIMEOUT (retries included), well below the worker timeout
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers now and then so slow leaks cannot accumulate; jitter avoids restarting all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Heartbeat files in memory rather than on a possibly slow disk (Docker)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    """Threads do not survive fork(): start the mirror sync and write buffer in each worker"""
+    from app import start_background_work
+    start_background_work()
+
+
+def worker_exit(server, worker):
+    """Flush buffered writes before the worker goes away"""
+    from app import stop_background_work
+    stop_background_work()
@@ -0,0 +1,32 @@
+# local_sqlite.py
+"""
+Connections to the host-local SQLite files shared by workers (mirror,
+rate-limit buckets, data version stamp).
+Each thread of each process gets its own autocommit WAL connection.
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class LocalSQLite:
+    """Callable returning this thread's connection to path, opened on first use"""
+
+    def __init__(self, path, timeout=5, row_factory=None):
+        self.path = path
+        self.timeout = timeout
+        self.row_factory = row_factory
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Never reuse a connection inherited from the parent of a forked worker
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -1,29 +1,29 @@
 # main_exercice.py
-from supabase import create_client
-from dotenv import load_dotenv
 import os
-from config import ANSI
+from config import ANSI, load_env
+from clients import LazyClient
+from mirror import LocalMirror
+from repository import ProjectRepository, DatasetRepository
 
 # Load environment variables
-load_dotenv()
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
+load_env()
+mirror_path = os.getenv("MIRROR_PATH")  # Optional local SQLite read replica shared with the web app
 
-supabase = create_client(url, key)
+supabase = LazyClient()  # Built on the first query
+mirror = LocalMirror(mirror_path, supabase, max_staleness=float(os.getenv("MIRROR_MAX_STALENESS", "60"))) if mirror_path else None
+
+# The CLI has no background sync: a stale mirror is synced on demand before reads
+projects_repo = ProjectRepository(supabase, mirror=mirror, sync_mirror_on_read=True)
+datasets_repo = DatasetRepository(supabase, mirror=mirror, sync_mirror_on_read=True)
 
 def create_ai_project(name: str, description: str, model_type: str, hyperparameters: dict):
     """
-    Insert an AI project into the ai_projects table
+    Insert an AI project into the ai_projects table; returns the created Project, or None on error
     """
     try:
-        result = supabase.table("ai_projects").insert({
-            "name": name,
-            "description": description,
-            "model_type": model_type,
-            "hyperparameters": hyperparameters
-        }).execute()
+        project = projects_repo.create(name, description, model_type, hyperparameters)
         print(f"✅ AI Project '{ANSI['G']}{name}{ANSI['W']}' created successfully!")
-        return result.data
+        return project
     except Exception as e:
         print(f"{ANSI['R']}❌ Error creating project: {e}{ANSI['W']}")
         return None
@@ -33,8 +33,7 @@ def list_projects():
     Retrieve all AI projects and display them
     """
     try:
-        result = supabase.table("ai_projects").select("id, name, model_type, hyperparameters, created_at").execute()
-        projects = result.data
+        projects = projects_repo.list()
         
         print(f"\n📊 {ANSI['G']}AI Projects List:{ANSI['W']}")
         print("=" * 50)
@@ -44,7 +43,7 @@ def list_projects():
             return []
             
         for project in projects:
-            print(f"{ANSI['B']}Name:{ANSI['W']} {project['name']} | {ANSI['B']}Type:{ANSI['W']} {project['model_type']}")
+            print(f"{ANSI['B']}Name:{ANSI['W']} {project.name} | {ANSI['B']}Type:{ANSI['W']} {project.model_type}")
             
         print("-" * 50)
         print(f"{ANSI['B']}Total number of projects:{ANSI['W']} {len(projects)}")
@@ -60,16 +59,9 @@ def create_dataset(name: str, description: str, size_mb: int, format: str, ai_pr
     Create a dataset linked to an AI project
     """
     try:
-        result = supabase.table("datasets").insert({
-            "name": name,
-            "description": description,
-            "size_mb": size_mb,
-            "format": format,
-            "source_url": source_url,
-            "ai_project_id": ai_project_id
-        }).execute()
+        dataset = datasets_repo.create(name, description, size_mb, format, ai_project_id, source_url)
         print(f"✅ Dataset '{ANSI['G']}{name}{ANSI['W']}' created successfully!")
-        return result.data
+        return dataset
     except Exception as e:
         print(f"{ANSI['R']}❌ Error creating dataset: {e}{ANSI['W']}")
         return None
@@ -79,8 +71,7 @@ def list_datasets_by_project(ai_project_id: str):
     List all datasets for a specific project
     """
     try:
-        result = supabase.table("datasets").select("*").eq("ai_project_id", ai_project_id).execute()
-        return result.data
+        return datasets_repo.by_project(ai_project_id)
     except Exception as e:
         print(f"{ANSI['R']}❌ Error retrieving datasets: {e}{ANSI['W']}")
         return []
@@ -91,12 +82,7 @@ def datasets_statistics():
     """
     try:
         # Get all datasets with project information
-        result = supabase.table("datasets").select("""
-            id, name, size_mb, format,
-            ai_projects(name, model_type)
-        """).execute()
-        
-        datasets = result.data
+        datasets = datasets_repo.list()
         
         if not datasets:
             print("\n📊 No datasets found.")
@@ -109,12 +95,12 @@ def datasets_statistics():
         datasets_by_format = {}
         
         for dataset in datasets:
-            total_size += dataset['size_mb']
-            format_ds = dataset['format']
+            total_size += dataset.size_mb
+            format_ds = dataset.format
             datasets_by_format[format_ds] = datasets_by_format.get(format_ds, 0) + 1
             
-            project_name = dataset['ai_projects']['name'] if dataset['ai_projects'] else "Deleted project"
-            print(f"• {dataset['name']} ({dataset['size_mb']} MB) - {ANSI['B']}Format:{ANSI['W']} {dataset['format']}")
+            project_name = dataset.project.name if dataset.project else "Deleted project"
+            print(f"• {dataset.name} ({dataset.size_mb} MB) - {ANSI['B']}Format:{ANSI['W']} {dataset.format}")
             print(f"  ↳ {ANSI['B']}Project:{ANSI['W']} {project_name}")
             
         print("-" * 60)
@@ -156,20 +142,22 @@ def main():
     
     # Create projects
     print(f"\n📝 {ANSI['Y']}Creating AI projects...{ANSI['W']}")
-    for project in example_projects:
+    created_projects = [
         create_ai_project(
             name=project["name"],
             description=project["description"], 
             model_type=project["model_type"],
             hyperparameters=project["hyperparameters"]
         )
+        for project in example_projects
+    ]
     
     # List all projects
     print("\n")
-    projects = list_projects()
+    list_projects()
     
     # BONUS: Datasets demonstration
-    if projects and len(projects) > 0:
+    if any(created_projects):
         print(f"\n🎁 {ANSI['G']}BONUS: Dataset Management{ANSI['W']}")
         print("=" * 60)
         
@@ -198,20 +186,18 @@ def main():
             }
         ]
         
-        # Create datasets by linking them to projects
+        # Link each dataset to the project created for it (listings are newest first, so not by position)
         print(f"\n📋 {ANSI['Y']}Creating datasets...{ANSI['W']}")
-        for i, dataset in enumerate(example_datasets):
-            if i < len(projects):
-                project_id = projects[i]['id'] if 'id' in projects[i] else None
-                if project_id:
-                    create_dataset(
-                        name=dataset["name"],
-                        description=dataset["description"],
-                        size_mb=dataset["size_mb"],
-                        format=dataset["format"],
-                        ai_project_id=project_id,
-                        source_url=dataset["source_url"]
-                    )
+        for dataset, project in zip(example_datasets, created_projects):
+            if project is not None:
+                create_dataset(
+                    name=dataset["name"],
+                    description=dataset["description"],
+                    size_mb=dataset["size_mb"],
+                    format=dataset["format"],
+                    ai_project_id=project.id,
+                    source_url=dataset["source_url"]
+                )
         
         # Display dataset statistics
         datasets_statistics()
@@ -0,0 +1,318 @@
+# mirror.py
+"""
+Optional local read replica of the ai_projects and datasets tables.
+A SQLite file is kept in sync with incremental pulls on updated_at plus a
+sweep of upstream ids that catches deletions. Tables without updated_at are
+refreshed in full on every sync, since edits would otherwise go unseen.
+Writes made through the application are applied locally as soon as Supabase
+confirms them, so readers see their own writes immediately.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from config import ANSI
+from local_sqlite import LocalSQLite
+
+TABLE_COLUMNS = {
+    'ai_projects': ['id', 'name', 'description', 'model_type', 'hyperparameters', 'created_at', 'updated_at'],
+    'datasets': ['id', 'name', 'description', 'size_mb', 'format', 'source_url', 'ai_project_id', 'created_at', 'updated_at'],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_projects (
+    id TEXT PRIMARY KEY, name TEXT, description TEXT, model_type TEXT,
+    hyperparameters TEXT, created_at TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY, name TEXT, description TEXT, size_mb INTEGER, format TEXT,
+    source_url TEXT, ai_project_id TEXT, created_at TEXT, updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_ai_project_id ON datasets(ai_project_id);
+CREATE INDEX IF NOT EXISTS idx_ai_projects_created_at ON ai_projects(created_at);
+CREATE INDEX IF NOT EXISTS idx_datasets_created_at ON datasets(created_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    table_name TEXT PRIMARY KEY, cursor_column TEXT, cursor TEXT,
+    last_sync REAL, last_full_sync REAL
+);
+"""
+
+# PostgREST/Postgres codes for a column that does not exist (undefined_column, schema cache miss)
+MISSING_COLUMN_CODES = ('42703', 'PGRST204')
+
+DATASET_SELECT = """
+    SELECT d.id, d.name, d.description, d.size_mb, d.format, d.source_url, d.created_at,
+           p.id AS project_id, p.name AS project_name, p.model_type AS project_model_type
+    FROM datasets d LEFT JOIN ai_projects p ON p.id = d.ai_project_id
+"""
+
+
+class LocalMirror:
+    """
+    SQLite copy of both tables, shared by every process using the same file.
+    Reads are only trusted while the last successful sync is younger than
+    max_staleness; every sync brings inserts, edits and deletions, so that is
+    the bound on how stale a served row can be.
+    """
+
+    def __init__(self, path, client, max_staleness=60, sync_interval=15, full_sync_interval=600, page_size=1000):
+        self.path = path
+        self.client = client
+        self.max_staleness = max_staleness
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.page_size = page_size
+        self.syncs = 0
+        self.reads_served = 0
+        self.last_error = None
+        self._connect = LocalSQLite(path, timeout=10, row_factory=sqlite3.Row)
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._connect().executescript(SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Synchronisation
+    # ------------------------------------------------------------------
+
+    def _state(self, table):
+        row = self._connect().execute("SELECT * FROM sync_state WHERE table_name = ?", (table,)).fetchone()
+        if row is None:
+            return {'cursor_column': 'updated_at', 'cursor': None, 'last_sync': 0, 'last_full_sync': 0}
+        return dict(row)
+
+    def _pull(self, table, cursor_column, cursor):
+        """Fetch upstream rows changed at or after cursor, page by page"""
+        rows = []
+        offset = 0
+        while True:
+            query = self.client.table(table).select("*").order(cursor_column).order("id")
+            if cursor:
+                query = query.gte(cursor_column, cursor)
+            page = query.range(offset, offset + self.page_size - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            offset += self.page_size
+
+    def _upstream_ids(self, table):
+        """Every id currently upstream (ids only, keyset pages)"""
+        ids = []
+        while True:
+            query = self.client.table(table).select("id").order("id").limit(self.page_size)
+            if ids:
+                query = query.gt("id", ids[-1])
+            page = [row['id'] for row in query.execute().data or []]
+            ids.extend(page)
+            if len(page) < self.page_size:
+                return ids
+
+    def sync_table(self, table, full=False):
+        """
+        Bring one table up to date. An incremental sync pulls rows changed since
+        the cursor and drops rows no longer upstream; a full sync replaces the table.
+        Tables without updated_at are always synced in full, and every full sync
+        tries updated_at first, so the mirror turns incremental once it is added.
+        """
+        state = self._state(table)
+        cursor_column = 'updated_at'
+        full = full or state['cursor_column'] != 'updated_at'
+        cursor = None if full else state['cursor']
+
+        try:
+            rows = self._pull(table, cursor_column, cursor)
+        except Exception as e:
+            # Only a missing column changes the cursor; timeouts and outages go to the caller's retry
+            if getattr(e, 'code', None) not in MISSING_COLUMN_CODES:
+                raise
+            print(f"{ANSI['Y']}Mirror: {table}.updated_at does not exist, syncing it in full{ANSI['W']}")
+            cursor_column, cursor, full = 'created_at', None, True
+            rows = self._pull(table, cursor_column, cursor)
+        upstream_ids = None if full else self._upstream_ids(table)
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if full:
+                conn.execute(f"DELETE FROM {table}")
+            self._upsert(conn, table, rows)
+            if rows:
+                cursor = max((row.get(cursor_column) or '' for row in rows), default=cursor) or cursor
+            if upstream_ids is not None:
+                # Rows newer than the cursor were written locally after the sweep started: keep them
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS upstream_ids (id TEXT PRIMARY KEY)")
+                conn.execute("DELETE FROM upstream_ids")
+                conn.executemany("INSERT OR IGNORE INTO upstream_ids VALUES (?)", [(i,) for i in upstream_ids])
+                conn.execute(
+                    f"DELETE FROM {table} WHERE id NOT IN (SELECT id FROM upstream_ids) "
+                    f"AND ({cursor_column} IS NULL OR {cursor_column} <= ?)", (cursor or '',))
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                (table, cursor_column, cursor, now, now if full else state['last_full_sync'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def sync(self, force=False):
+        """
+        Sync both tables unless another process did so within sync_interval.
+        Returns True when the mirror is fresh afterwards.
+        """
+        with self._sync_lock:
+            states = [self._state(table) for table in TABLE_COLUMNS]
+            now = time.time()
+            if not force and all(now - s['last_sync'] < self.sync_interval for s in states):
+                return True
+            try:
+                for table, state in zip(TABLE_COLUMNS, states):
+                    full = now - state['last_full_sync'] >= self.full_sync_interval
+                    self.sync_table(table, full=full)
+                self.syncs += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"{ANSI['R']}Mirror sync error: {e}{ANSI['W']}")
+        return self.is_fresh()
+
+    def start(self):
+        """Keep the mirror in sync from a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='mirror-sync', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync()
+            self._stop.wait(self.sync_interval)
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+
+    def staleness(self):
+        """
+        Seconds since the least recently synced table was synced, i.e. since
+        it last caught up with upstream inserts, edits and deletions
+        """
+        oldest = min(self._state(table)['last_sync'] for table in TABLE_COLUMNS)
+        return time.time() - oldest if oldest else float('inf')
+
+    def is_fresh(self):
+        return self.staleness() <= self.max_staleness
+
+    def ensure_fresh(self):
+        """Sync now if the mirror is too stale to serve reads"""
+        return self.is_fresh() or self.sync(force=True)
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        conn = self._connect()
+        staleness = self.staleness()
+        return {
+            'path': self.path,
+            'fresh': staleness <= self.max_staleness,
+            'staleness_seconds': round(staleness, 1) if staleness != float('inf') else None,
+            'max_staleness_seconds': self.max_staleness,
+            'rows': {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLE_COLUMNS},
+            'syncs': self.syncs,
+            'reads_served': self.reads_served,
+            'last_error': self.last_error,
+        }
+
+    # ------------------------------------------------------------------
+    # Read-your-writes
+    # ------------------------------------------------------------------
+
+    def _upsert(self, conn, table, rows):
+        columns = TABLE_COLUMNS[table]
+        placeholders = ', '.join('?' for _ in columns)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [tuple(self._encode(column, row.get(column)) for column in columns) for row in rows]
+        )
+
+    @staticmethod
+    def _encode(column, value):
+        if column == 'hyperparameters' and value is not None:
+            return json.dumps(value)
+        return value
+
+    def apply_upsert(self, table, row):
+        """Record a row Supabase just returned from an insert or update"""
+        if row:
+            self._upsert(self._connect(), table, [row])
+
+    def apply_delete(self, table, row_id):
+        """
+        Record a deletion confirmed by Supabase (project deletions cascade to datasets;
+        datasets handed over to a linked project upstream come back with the next sync)
+        """
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        if table == 'ai_projects':
+            conn.execute("DELETE FROM datasets WHERE ai_project_id = ?", (row_id,))
+
+    def clear(self, table):
+        """Record that every row of a table was deleted upstream"""
+        self._connect().execute(f"DELETE FROM {table}")
+
+    # ------------------------------------------------------------------
+    # Reads, shaped like the PostgREST responses used by the application
+    # ------------------------------------------------------------------
+
+    def _query(self, sql, params=()):
+        self.reads_served += 1
+        return self._connect().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _project(row):
+        project = dict(row)
+        project.pop('updated_at', None)
+        if project.get('hyperparameters') is not None:
+            project['hyperparameters'] = json.loads(project['hyperparameters'])
+        return project
+
+    @staticmethod
+    def _dataset(row):
+        dataset = dict(row)
+        project_id = dataset.pop('project_id')
+        project_name = dataset.pop('project_name')
+        project_model_type = dataset.pop('project_model_type')
+        dataset['ai_projects'] = None if project_id is None else {
+            'id': project_id, 'name': project_name, 'model_type': project_model_type
+        }
+        return dataset
+
+    def count(self, table):
+        return self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+    def list_projects(self, offset=0, limit=-1):
+        rows = self._query("SELECT * FROM ai_projects ORDER BY created_at DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [self._project(row) for row in rows]
+
+    def get_project(self, project_id):
+        rows = self._query("SELECT * FROM ai_projects WHERE id = ?", (project_id,))
+        return self._project(rows[0]) if rows else None
+
+    def list_datasets(self, offset=0, limit=-1):
+        rows = self._query(DATASET_SELECT + " ORDER BY d.created_at DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [self._dataset(row) for row in rows]
+
+    def get_dataset(self, dataset_id):
+        rows = self._query(DATASET_SELECT + " WHERE d.id = ?", (dataset_id,))
+        return self._dataset(rows[0]) if rows else None
+
+    def project_datasets(self, project_id):
+        rows = self._query(
+            "SELECT * FROM datasets WHERE ai_project_id = ? ORDER BY created_at DESC", (project_id,)
+        )
+        return [{k: row[k] for k in row.keys() if k != 'updated_at'} for row in rows]
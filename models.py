@@ -0,0 +1,170 @@
+# models.py
+"""
+Compact domain models for ai_projects and datasets rows.
+Instances use __slots__ instead of a per-row dict, repeated strings (model
+types, formats, project ids) are interned, and the ai_projects(...) embedded
+in dataset rows is decoded once per project rather than once per row.
+"""
+
+import gc
+import json
+import sys
+from contextlib import contextmanager
+
+try:
+    from msgspec.json import decode as decode_json
+except ImportError:  # Optional dependency: msgspec parses JSON bytes faster than the stdlib
+    decode_json = json.loads
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Decoding creates many acyclic objects at once, which would otherwise
+    trigger repeated collections of the cyclic garbage collector
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# Project columns embedded in dataset rows (ai_projects(id, name, model_type), see repository.datasets)
+EMBEDDED_PROJECT_FIELDS = ('id', 'name', 'model_type')
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Project:
+    """A row of ai_projects (or the subset of it embedded in dataset rows)"""
+
+    __slots__ = ('id', 'name', 'description', 'model_type', 'hyperparameters', 'created_at')
+
+    def __init__(self, id, name, description=None, model_type=None, hyperparameters=None, created_at=None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.model_type = _intern(model_type)
+        self.hyperparameters = hyperparameters
+        self.created_at = created_at
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            row.get('id'),
+            row.get('name'),
+            row.get('description'),
+            row.get('model_type'),
+            row.get('hyperparameters'),
+            row.get('created_at')
+        )
+
+    def to_dict(self, fields=None):
+        """JSON-ready dict in the PostgREST shape, limited to fields when given"""
+        return {field: getattr(self, field) for field in fields or self.__slots__}
+
+    def __repr__(self):
+        return f"Project(id={self.id!r}, name={self.name!r})"
+
+
+class Dataset:
+    """A row of datasets, optionally with its embedded project"""
+
+    __slots__ = ('id', 'name', 'description', 'size_mb', 'format', 'source_url', 'ai_project_id', 'created_at', 'project')
+
+    def __init__(self, id, name, description=None, size_mb=0, format=None, source_url=None,
+                 ai_project_id=None, created_at=None, project=None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.size_mb = size_mb or 0
+        self.format = _intern(format)
+        self.source_url = source_url
+        self.ai_project_id = _intern(ai_project_id)
+        self.created_at = created_at
+        self.project = project
+
+    @classmethod
+    def from_row(cls, row, projects=None):
+        """
+        Build a dataset from a PostgREST row. `projects` caches embedded
+        projects by id so rows sharing a project share one Project instance.
+        """
+        embedded = row.get('ai_projects')
+        project = None
+        if embedded:
+            project_id = embedded.get('id')
+            if projects is not None and project_id is not None:
+                project = projects.get(project_id)
+                if project is None:
+                    project = projects[project_id] = Project.from_row(embedded)
+            else:
+                project = Project.from_row(embedded)
+
+        return cls(
+            row.get('id'),
+            row.get('name'),
+            row.get('description'),
+            row.get('size_mb'),
+            row.get('format'),
+            row.get('source_url'),
+            row.get('ai_project_id') or (project.id if project else None),
+            row.get('created_at'),
+            project
+        )
+
+    def to_dict(self):
+        """
+        JSON-ready dict in the PostgREST shape. 'ai_projects' holds only the embedded
+        columns: the other Project fields were never selected, and null would misstate them.
+        """
+        data = {field: getattr(self, field) for field in self.__slots__[:-1]}
+        data['ai_projects'] = self.project.to_dict(EMBEDDED_PROJECT_FIELDS) if self.project else None
+        return data
+
+    def __repr__(self):
+        return f"Dataset(id={self.id!r}, name={self.name!r}, size_mb={self.size_mb!r})"
+
+
+def projects_from_rows(rows):
+    return [Project.from_row(row) for row in rows or []]
+
+
+def datasets_from_rows(rows):
+    """Build datasets, decoding each embedded project only once"""
+    projects = {}
+    datasets = []
+    append = datasets.append
+    for row in rows or []:
+        get = row.get
+        project = None
+        embedded = get('ai_projects')
+        if embedded:
+            project_id = embedded.get('id')
+            project = projects.get(project_id)
+            if project is None:
+                project = Project.from_row(embedded)
+                if project_id is not None:
+                    projects[project_id] = project
+        append(Dataset(
+            get('id'), get('name'), get('description'), get('size_mb'), get('format'), get('source_url'),
+            get('ai_project_id') or (project.id if project else None), get('created_at'), project
+        ))
+    return datasets
+
+
+def decode_projects(raw):
+    """Decode a PostgREST JSON response body (bytes) straight into projects"""
+    with _gc_paused():
+        return projects_from_rows(decode_json(raw))
+
+
+def decode_datasets(raw):
+    """Decode a PostgREST JSON response body (bytes) straight into datasets"""
+    with _gc_paused():
+        return datasets_from_rows(decode_json(raw))
@@ -0,0 +1,115 @@
+# rate_limit.py
+"""
+Token-bucket rate limiting for the web application.
+Bucket state lives in process memory, or in a local SQLite file so that
+every worker on the host shares the same budget.
+"""
+
+import math
+import threading
+import time
+
+from local_sqlite import LocalSQLite
+
+
+class MemoryBucketStore:
+    """Bucket state kept in this process only"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def update(self, key, apply):
+        """Atomically replace the state of key with apply(state) and return its result"""
+        with self._lock:
+            state, result = apply(self._buckets.get(key))
+            self._buckets[key] = state
+            if len(self._buckets) > self.max_keys:
+                # Forget the least recently touched half; a forgotten bucket simply starts full again
+                oldest = sorted(self._buckets, key=lambda k: self._buckets[k][1])
+                for stale_key in oldest[:len(oldest) // 2]:
+                    del self._buckets[stale_key]
+            return result
+
+
+class SQLiteBucketStore:
+    """Bucket state shared by all processes using the same SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connect = LocalSQLite(path)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def update(self, key, apply):
+        """Atomically replace the state of key with apply(state) and return its result"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            state, result = apply(tuple(row) if row else None)
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, *state))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+class RateLimiter:
+    """
+    Token bucket: each key holds up to `capacity` tokens, refilled at
+    `refill_rate` tokens per second. A request spends `cost` tokens.
+    `costs` lists the weights callers will use, validated up front: a cost
+    above capacity could never be paid.
+    """
+
+    def __init__(self, capacity=60, refill_rate=1.0, store=None, costs=None):
+        if capacity <= 0:
+            raise ValueError(f"Rate limit capacity must be positive, got {capacity}")
+        if refill_rate <= 0:
+            raise ValueError(f"Rate limit refill rate must be positive, got {refill_rate} "
+                             "(disable rate limiting instead of stopping the refill)")
+        for name, cost in (costs or {}).items():
+            if not 0 < cost <= capacity:
+                raise ValueError(f"Rate limit cost of {name} must be between 1 and the capacity ({capacity}), got {cost}")
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.store = store or MemoryBucketStore()
+
+    def consume(self, key, cost=1):
+        """
+        Try to spend cost tokens from the bucket of key.
+        Returns (allowed, retry_after_seconds).
+        """
+        cost = min(cost, self.capacity)
+
+        def apply(state):
+            now = time.time()
+            if state is None:
+                tokens = self.capacity
+            else:
+                tokens, updated = state
+                tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+            if tokens >= cost:
+                return (tokens - cost, now), (True, 0.0)
+            return (tokens, now), (False, (cost - tokens) / self.refill_rate)
+
+        return self.store.update(key, apply)
+
+
+def parse_costs(value):
+    """Parse 'endpoint=cost,endpoint=cost' into a dict"""
+    costs = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            endpoint, cost = item.split('=', 1)
+            costs[endpoint.strip()] = int(cost)
+    return costs
+
+
+def retry_after_header(seconds):
+    """Retry-After value in whole seconds, never less than one"""
+    return str(max(1, math.ceil(seconds)))
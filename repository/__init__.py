@@ -0,0 +1,22 @@
+"""
+Data access shared by the web application and the CLI scripts.
+Batching, caching, request coalescing, the local mirror and upstream
+timeouts, retries and circuit breaking live here, so every entry point gets
+them by going through the repositories.
+"""
+
+from repository.base import BaseRepository, execute_raw
+from repository.cache import NullCache, TTLCache
+from repository.projects import ProjectRepository
+from repository.datasets import DatasetRepository, DuplicateContentError, DATASET_COLUMNS
+
+__all__ = [
+    'BaseRepository',
+    'execute_raw',
+    'NullCache',
+    'TTLCache',
+    'ProjectRepository',
+    'DatasetRepository',
+    'DuplicateContentError',
+    'DATASET_COLUMNS',
+]
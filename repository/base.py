@@ -0,0 +1,251 @@
+# base.py
+"""
+Shared plumbing for the table repositories: raw query execution, cached and
+coalesced reads, the optional local mirror, batching and keyset streaming.
+"""
+
+import time
+
+from config import ANSI
+from models import decode_json
+from repository.cache import NullCache, MISSING
+from resilience import transient_api_error_class, TRANSIENT_STATUSES
+
+# Matches no real row; PostgREST refuses unfiltered deletes
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+def send(query, timeout=None):
+    """
+    Send a PostgREST query and return the HTTP response.
+    Error responses raise APIError, or TransientAPIError when worth retrying.
+    """
+    request_options = {} if timeout is None else {'timeout': timeout}
+    response = query.session.request(
+        query.http_method, query.path, json=query.json, params=query.params, headers=query.headers,
+        **request_options
+    )
+    if not response.is_success:
+        try:
+            error = response.json()
+        except ValueError:
+            error = {'message': response.text, 'code': str(response.status_code)}
+        if response.status_code in TRANSIENT_STATUSES:
+            raise transient_api_error_class()(error)
+        from postgrest.exceptions import APIError  # Already loaded: query came from a postgrest client
+        raise APIError(error)
+    return response
+
+
+def execute_raw(query, timeout=None):
+    """
+    Send a PostgREST query and return the raw JSON body.
+    Skips the per-row validation done by execute(); models decode the bytes directly.
+    """
+    return send(query, timeout).content
+
+
+def response_count(response):
+    """Total from a Content-Range header such as '0-24/311' or '*/311'"""
+    total = response.headers.get('content-range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else 0
+
+
+def chunked(items, size):
+    """Split a list into lists of at most size items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class BaseRepository:
+    """
+    Data access for one table.
+
+    client      a Supabase client, or a callable returning the client for the current call
+    cache       read cache (see repository.cache), keyed by scope and query
+    flights     SingleFlight coalescing identical concurrent reads
+    scope       callable returning the cache/coalescing scope (e.g. the user id)
+    mirror      LocalMirror serving reads while fresh (or whenever the breaker is open)
+    resilience  ResiliencePolicy applying timeouts, retries and the circuit breaker
+    """
+
+    table = None
+
+    def __init__(self, client, cache=None, flights=None, scope=None, mirror=None,
+                 sync_mirror_on_read=False, page_size=1000, batch_size=500, resilience=None):
+        self._client = client
+        self.cache = cache or NullCache()
+        self.flights = flights
+        self.scope = scope or (lambda: 'global')
+        self.mirror = mirror
+        self.sync_mirror_on_read = sync_mirror_on_read
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.resilience = resilience
+        self.write_hooks = []
+
+    @property
+    def client(self):
+        return self._client() if callable(self._client) else self._client
+
+    def query(self, client=None):
+        return (client or self.client).table(self.table)
+
+    def _timeout(self, operation):
+        return self.resilience.timeout(operation) if self.resilience else None
+
+    def fetch(self, query, operation='read'):
+        """Raw JSON body of a query, sent with the operation's timeout"""
+        return execute_raw(query, self._timeout(operation))
+
+    def _guarded(self, fn, idempotent=True, key=None):
+        """Run an upstream call through the resilience policy, when there is one"""
+        if self.resilience is None:
+            return fn()
+        return self.resilience.call(fn, idempotent=idempotent, key=key)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def local(self):
+        """The mirror when it may serve reads, else None"""
+        if self.mirror is None:
+            return None
+        if self.resilience is not None and self.resilience.breaker.is_open:
+            # Supabase is down: a stale replica beats failing the request
+            return self.mirror
+        fresh = self.mirror.ensure_fresh() if self.sync_mirror_on_read else self.mirror.is_fresh()
+        return self.mirror if fresh else None
+
+    def read(self, key, run):
+        """
+        Cached, coalesced and retried read: run(client) performs the upstream query.
+        Results may be shared between callers, so treat them as read-only.
+        """
+        key = (self.scope(), self.table) + key
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+
+        client = self.client
+        upstream = lambda: self._guarded(lambda: run(client), key=key)
+        if self.flights is not None:
+            value = self.flights.do(key, upstream)
+        else:
+            value = upstream()
+        self.cache.set(key, value)
+        return value
+
+    def count(self):
+        """Exact number of rows (a HEAD request, no rows transferred)"""
+        local = self.local()
+        if local:
+            return local.count(self.table)
+        return self.read(('count',), lambda client: response_count(send(
+            self.query(client).select("id", count="exact", head=True), self._timeout('count'))))
+
+    def ping(self, client=None, timeout=2.0):
+        """
+        Seconds taken by the cheapest possible query (HEAD, one row, no count).
+        Bypasses the cache and the circuit breaker; raises when Supabase is unreachable.
+        """
+        started = time.perf_counter()
+        send(self.query(client).select("id", head=True).limit(1), timeout)
+        return time.perf_counter() - started
+
+    def iter_rows(self, columns="*", page_size=None):
+        """
+        Yield pages of raw rows in id order. Pages are fetched by keyset
+        (id > last id) rather than offset, so each page costs the same.
+        """
+        page_size = page_size or self.page_size
+        last_id = None
+        while True:
+            query = self.query().select(columns).order("id").limit(page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = decode_json(self._guarded(lambda: self.fetch(query)))
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]['id']
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def written(self, op, payload):
+        """
+        Propagate a confirmed write: apply it to the mirror (read-your-writes),
+        drop cached reads and notify write hooks.
+        op is 'upsert' (payload: rows), 'delete' (payload: id), 'delete_all'
+        or 'link' (payload: link rows, which the mirror does not replicate).
+        """
+        if self.mirror is not None and op != 'link':
+            try:
+                if op == 'delete_all':
+                    self.mirror.clear(self.table)
+                elif op == 'delete':
+                    self.mirror.apply_delete(self.table, payload)
+                else:
+                    for row in payload:
+                        self.mirror.apply_upsert(self.table, row)
+            except Exception as e:
+                print(f"{ANSI['R']}Mirror write error: {e}{ANSI['W']}")
+        self.cache.clear()
+        if self.resilience is not None:
+            self.resilience.forget()
+        for hook in self.write_hooks:
+            hook(self.table, op, payload)
+
+    def write(self, query):
+        """
+        Send a write once (writes are never retried) with the write timeout.
+        Fails fast with CircuitOpenError while the breaker is open.
+        """
+        return self._guarded(lambda: send(query, self._timeout('write')), idempotent=False)
+
+    def _write_rows(self, query):
+        """Rows returned by a write (return=representation)"""
+        content = self.write(query).content
+        return decode_json(content) if content else []
+
+    def insert_rows(self, rows):
+        """Insert rows in batches of batch_size; returns the inserted rows"""
+        inserted = []
+        for batch in chunked(rows, self.batch_size):
+            data = self._write_rows(self.query().insert(batch))
+            inserted.extend(data)
+            self.written('upsert', data)
+        return inserted
+
+    def update_row(self, row_id, changes, client=None):
+        """Update one row; returns the updated row or None if it does not exist"""
+        data = self._write_rows(self.query(client).update(changes).eq("id", row_id))
+        if not data:
+            return None
+        self.written('upsert', data)
+        return data[0]
+
+    def delete(self, row_id):
+        """Delete one row; returns False if it did not exist"""
+        if not self._write_rows(self.query().delete().eq("id", row_id)):
+            return False
+        self.written('delete', row_id)
+        return True
+
+    def delete_many(self, row_ids):
+        """Delete rows in batches of batch_size; returns how many were deleted"""
+        deleted = 0
+        for batch in chunked(list(row_ids), self.batch_size):
+            for row in self._write_rows(self.query().delete().in_("id", batch)):
+                self.written('delete', row['id'])
+                deleted += 1
+        return deleted
+
+    def delete_all(self):
+        """Delete every row; returns how many were deleted"""
+        response = self.write(self.query().delete(count="exact", returning="minimal").neq("id", NIL_UUID))
+        self.written('delete_all', None)
+        return response_count(response)
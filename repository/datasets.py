@@ -0,0 +1,201 @@
+# datasets.py
+"""
+Repository for the datasets table
+"""
+
+from catalog_index import fingerprint, dataset_fingerprint
+from models import Dataset, datasets_from_rows, decode_datasets, decode_json
+from repository.base import BaseRepository, chunked
+
+# Dataset columns plus the embedded project, as shown in listings
+DATASET_COLUMNS = """
+    id, name, description, size_mb, format, source_url, ai_project_id, created_at,
+    ai_projects(id, name, model_type)
+"""
+# Changing any of these changes a dataset's fingerprint
+FINGERPRINT_FIELDS = {'source_url', 'size_mb', 'format'}
+UNIQUE_VIOLATION = '23505'
+
+
+class DuplicateContentError(Exception):
+    """An update would give a dataset the same content as another catalogued dataset (.existing)"""
+
+    def __init__(self, existing):
+        super().__init__(f"The same content is already catalogued as dataset {existing.id}")
+        self.existing = existing
+
+
+class DatasetRepository(BaseRepository):
+    """
+    Reads and writes datasets, returning Dataset models.
+
+    dedupe  store a content fingerprint on every dataset written and read the
+            dataset_projects links, so one dataset record can serve many
+            projects (needs the migration in docs/database_creation.sql)
+    """
+
+    table = "datasets"
+    link_table = "dataset_projects"
+
+    def __init__(self, client, dedupe=False, **options):
+        super().__init__(client, **options)
+        self.dedupe = dedupe
+
+    def list(self, offset=0, limit=None):
+        """Datasets with their project, newest first; the whole table when limit is None"""
+        local = self.local()
+        if local:
+            return datasets_from_rows(local.list_datasets(offset, -1 if limit is None else limit))
+
+        def run(client):
+            query = self.query(client).select(DATASET_COLUMNS).order("created_at", desc=True)
+            if limit is not None:
+                query = query.range(offset, offset + limit - 1)
+            return decode_datasets(self.fetch(query))
+        return self.read(('list', offset, limit), run)
+
+    def get(self, dataset_id):
+        """A single dataset with its project, or None"""
+        local = self.local()
+        if local:
+            row = local.get_dataset(dataset_id)
+            return Dataset.from_row(row) if row else None
+        datasets = self.read(('id', dataset_id), lambda client: decode_datasets(self.fetch(
+            self.query(client).select(DATASET_COLUMNS).eq("id", dataset_id))))
+        return datasets[0] if datasets else None
+
+    def by_project(self, project_id):
+        """Datasets belonging to (or linked to) one project, newest first"""
+        local = self.local()
+        # The mirror does not replicate links: with dedupe it only stands in during outages
+        if local and (not self.dedupe or self.resilience is not None and self.resilience.breaker.is_open):
+            return datasets_from_rows(local.project_datasets(project_id))
+
+        def run(client):
+            datasets = decode_datasets(self.fetch(
+                self.query(client).select("*").eq("ai_project_id", project_id).order("created_at", desc=True)))
+            if not self.dedupe:
+                return datasets
+            owned = {d.id for d in datasets}
+            linked = [row['dataset_id'] for row in decode_json(self.fetch(
+                client.table(self.link_table).select("dataset_id").eq("ai_project_id", project_id)))
+                if row['dataset_id'] not in owned]
+            for batch in chunked(linked, self.batch_size):
+                datasets.extend(decode_datasets(self.fetch(self.query(client).select("*").in_("id", batch))))
+            datasets.sort(key=lambda d: d.created_at or '', reverse=True)
+            return datasets
+        return self.read(('project', project_id), run)
+
+    def linked_ids(self):
+        """dataset_id of every project link (one entry per extra project); empty without dedupe"""
+        if not self.dedupe:
+            return []
+
+        def run(client):
+            ids = []
+            while True:
+                query = (client.table(self.link_table).select("dataset_id")
+                         .order("dataset_id").order("ai_project_id").range(len(ids), len(ids) + self.page_size - 1))
+                rows = decode_json(self.fetch(query))
+                ids.extend(row['dataset_id'] for row in rows)
+                if len(rows) < self.page_size:
+                    return ids
+        return self.read(('links',), run)
+
+    def links_of(self, dataset_ids):
+        """Project links of these datasets: [(dataset_id, ai_project_id), ...]"""
+        links = []
+        for batch in chunked(list(dataset_ids), self.batch_size):
+            rows = decode_json(self._guarded(lambda: self.fetch(
+                self.client.table(self.link_table).select("dataset_id, ai_project_id").in_("dataset_id", batch))))
+            links.extend((row['dataset_id'], row['ai_project_id']) for row in rows)
+        return links
+
+    def find_by_fingerprint(self, fp):
+        """The dataset holding this content, or None; always read upstream, never cached"""
+        datasets = decode_datasets(self._guarded(lambda: self.fetch(
+            self.query().select(DATASET_COLUMNS).eq("fingerprint", fp).order("created_at").limit(1))))
+        return datasets[0] if datasets else None
+
+    def create(self, name, description, size_mb, format, ai_project_id, source_url=None):
+        created = self.create_many([{
+            "name": name,
+            "description": description,
+            "size_mb": size_mb,
+            "format": format,
+            "source_url": source_url,
+            "ai_project_id": ai_project_id
+        }])
+        return created[0] if created else None
+
+    def create_many(self, rows):
+        """Insert datasets in batches; returns the created datasets"""
+        if self.dedupe:
+            rows = [dict(row, fingerprint=dataset_fingerprint(row)) for row in rows]
+        return datasets_from_rows(self.insert_rows(rows))
+
+    def create_or_link(self, name, description, size_mb, format, ai_project_id, source_url=None):
+        """
+        Create a dataset, unless the same content (source_url, size and format)
+        is already catalogued: then link ai_project_id to that record instead.
+        Returns (dataset, created).
+        """
+        fp = fingerprint(source_url, size_mb, format) if self.dedupe else None
+        if fp is not None:
+            existing = self.find_by_fingerprint(fp)
+            if existing is not None:
+                return self._link_existing(existing, ai_project_id), False
+        try:
+            return self.create(name, description, size_mb, format, ai_project_id, source_url), True
+        except Exception as e:
+            # A concurrent request registered the same content first (postgrest's APIError, matched by code)
+            existing = self.find_by_fingerprint(fp) if fp is not None and getattr(e, 'code', None) == UNIQUE_VIOLATION else None
+            if existing is None:
+                raise
+            return self._link_existing(existing, ai_project_id), False
+
+    def _link_existing(self, dataset, ai_project_id):
+        if dataset.ai_project_id != ai_project_id:
+            self.link_projects([(dataset.id, ai_project_id)])
+        return dataset
+
+    def link_projects(self, links, client=None):
+        """Link datasets to additional projects: [(dataset_id, ai_project_id), ...]; existing links are kept"""
+        rows = [{'dataset_id': dataset_id, 'ai_project_id': project_id} for dataset_id, project_id in links]
+        for batch in chunked(rows, self.batch_size):
+            self.write((client or self.client).table(self.link_table).upsert(
+                batch, ignore_duplicates=True, returning='minimal'))
+            self.written('link', batch)
+
+    def update(self, dataset_id, changes):
+        """
+        Update a dataset; returns it, or None if it does not exist.
+        Raises DuplicateContentError if the changes make it a copy of another dataset.
+        """
+        if self.dedupe and FINGERPRINT_FIELDS & changes.keys():
+            current = self.get(dataset_id)
+            if current is None:
+                return None
+            merged = {field: changes.get(field, getattr(current, field)) for field in FINGERPRINT_FIELDS}
+            changes = dict(changes, fingerprint=dataset_fingerprint(merged))
+        try:
+            row = self.update_row(dataset_id, changes)
+        except Exception as e:
+            # The new content is catalogued already: the unique fingerprint index rejects it
+            fp = changes.get('fingerprint')
+            existing = self.find_by_fingerprint(fp) if fp is not None and getattr(e, 'code', None) == UNIQUE_VIOLATION else None
+            if existing is None:
+                raise
+            raise DuplicateContentError(existing) from e
+        return Dataset.from_row(row) if row else None
+
+    def update_many(self, updates, client=None):
+        """
+        Apply [{'id': ..., 'size_mb': ...}, ...] in one round trip through the
+        apply_dataset_updates function (see docs/database_creation.sql).
+        Returns the updated rows; ids missing from the result were not found.
+        """
+        data = self._write_rows((client or self.client).rpc('apply_dataset_updates', {'updates': updates}))
+        if data:
+            self.written('upsert', data)
+        return data
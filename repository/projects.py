@@ -0,0 +1,54 @@
+# projects.py
+"""
+Repository for the ai_projects table
+"""
+
+from models import Project, projects_from_rows, decode_projects
+from repository.base import BaseRepository
+
+
+class ProjectRepository(BaseRepository):
+    """Reads and writes AI projects, returning Project models"""
+
+    table = "ai_projects"
+
+    def list(self, offset=0, limit=None):
+        """Projects newest first; the whole table when limit is None"""
+        local = self.local()
+        if local:
+            return projects_from_rows(local.list_projects(offset, -1 if limit is None else limit))
+
+        def run(client):
+            query = self.query(client).select("*").order("created_at", desc=True)
+            if limit is not None:
+                query = query.range(offset, offset + limit - 1)
+            return decode_projects(self.fetch(query))
+        return self.read(('list', offset, limit), run)
+
+    def get(self, project_id):
+        """A single project, or None"""
+        local = self.local()
+        if local:
+            row = local.get_project(project_id)
+            return Project.from_row(row) if row else None
+        projects = self.read(('id', project_id), lambda client: decode_projects(self.fetch(
+            self.query(client).select("*").eq("id", project_id))))
+        return projects[0] if projects else None
+
+    def create(self, name, description, model_type, hyperparameters):
+        created = self.create_many([{
+            "name": name,
+            "description": description,
+            "model_type": model_type,
+            "hyperparameters": hyperparameters
+        }])
+        return created[0] if created else None
+
+    def create_many(self, rows):
+        """Insert projects in batches; returns the created projects"""
+        return projects_from_rows(self.insert_rows(rows))
+
+    def update(self, project_id, changes):
+        """Update a project; returns it, or None if it does not exist"""
+        row = self.update_row(project_id, changes)
+        return Project.from_row(row) if row else None
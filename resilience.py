@@ -0,0 +1,200 @@
+# resilience.py
+"""
+Resilient upstream calls: per-operation timeouts, bounded retries with
+exponential backoff and full jitter for idempotent reads, and a circuit
+breaker that fails fast (or serves the last good result) while Supabase is down.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# HTTP statuses worth retrying: throttling and gateway/server failures
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+# Compared by qualified class name, so importing this module does not import httpx and postgrest
+TRANSIENT_ERRORS = {'httpx.TransportError', 'resilience.TransientAPIError'}
+
+_transient_api_error = None
+
+
+def transient_api_error_class():
+    """
+    TransientAPIError: a postgrest APIError for an upstream error response that
+    may succeed when retried. Defined on first use, when postgrest is loaded anyway.
+    """
+    global _transient_api_error
+    if _transient_api_error is None:
+        from postgrest.exceptions import APIError
+
+        class TransientAPIError(APIError):
+            """An upstream error response that may succeed when retried"""
+
+        TransientAPIError.__module__ = __name__
+        _transient_api_error = TransientAPIError
+    return _transient_api_error
+
+
+def __getattr__(name):
+    # `from resilience import TransientAPIError` keeps working without an import-time dependency
+    if name == 'TransientAPIError':
+        return transient_api_error_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+def is_transient(error):
+    """Timeouts, connection failures and 5xx/429 responses; never client errors"""
+    return any(f"{cls.__module__}.{cls.__name__}" in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """
+    closed     calls go through; consecutive transient failures are counted
+    open       calls are rejected until reset_timeout has elapsed
+    half_open  one trial call is let through; success closes, failure reopens
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.state == 'open' and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'times_opened': self.times_opened,
+            'rejected_calls': self.rejected,
+        }
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Full jitter: uniform between 0 and the capped exponential delay"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class ResiliencePolicy:
+    """
+    Wraps upstream calls for the repositories.
+    Reads are retried and remembered so they can be served stale while the
+    breaker is open; writes are never retried and fail fast when it is open.
+    """
+
+    def __init__(self, timeouts=None, retries=2, base_delay=0.1, max_delay=2.0,
+                 breaker=None, serve_stale=True, stale_entries=512, sleep=time.sleep):
+        self.timeouts = {'read': 5.0, 'count': 5.0, 'write': 10.0}
+        self.timeouts.update(timeouts or {})
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.serve_stale = serve_stale
+        self.stale_entries = stale_entries
+        self.sleep = sleep
+        self.retried = 0
+        self.stale_served = 0
+        self._stale = OrderedDict()
+        self._lock = threading.Lock()
+
+    def timeout(self, operation):
+        """Timeout in seconds for an operation kind ('read', 'count' or 'write')"""
+        return self.timeouts.get(operation, self.timeouts['read'])
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._stale[key] = value
+            self._stale.move_to_end(key)
+            while len(self._stale) > self.stale_entries:
+                self._stale.popitem(last=False)
+
+    def _stale_or_raise(self, key, error):
+        with self._lock:
+            if self.serve_stale and key is not None and key in self._stale:
+                self.stale_served += 1
+                return self._stale[key]
+        raise error
+
+    def call(self, fn, idempotent=True, key=None):
+        """
+        Run fn() under the breaker. Idempotent calls are retried on transient
+        errors; when key is given, the last good result is served if upstream
+        is unavailable.
+        """
+        attempts = self.retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                return self._stale_or_raise(key, CircuitOpenError("Supabase is unavailable (circuit open)"))
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_transient(e):
+                    # The upstream answered: a client error says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 < attempts and not self.breaker.is_open:
+                    self.retried += 1
+                    self.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+                    continue
+                return self._stale_or_raise(key, e)
+            self.breaker.record_success()
+            if key is not None:
+                self._remember(key, result)
+            return result
+
+    def forget(self):
+        """Drop remembered results (after writes, so stale reads never predate them)"""
+        with self._lock:
+            self._stale.clear()
+
+    def stats(self):
+        return {
+            'breaker': self.breaker.stats(),
+            'timeouts': self.timeouts,
+            'retried_calls': self.retried,
+            'stale_served': self.stale_served,
+        }
@@ -0,0 +1,147 @@
+# response_cache.py
+"""
+HTTP response cache for authenticated pages.
+Rendered pages are kept per route and user under a data version stamp that
+every confirmed write bumps, so a cached page is reused only while nothing has
+changed. Responses carry ETag/Last-Modified, and repeat navigations that send
+them back get a 304 without the view running at all.
+"""
+
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import g, make_response, message_flashed, request, session
+
+from local_sqlite import LocalSQLite
+from repository.cache import TTLCache, MISSING
+
+
+class DataVersion:
+    """In-process version stamp: (version, changed_at)"""
+
+    def __init__(self):
+        self._version = 0
+        self._changed_at = time.time()
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._version, self._changed_at
+
+    def bump(self):
+        with self._lock:
+            self._version += 1
+            self._changed_at = time.time()
+
+
+class SQLiteDataVersion:
+    """Version stamp shared by all processes using the same SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connect = LocalSQLite(path)
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER, changed_at REAL)")
+        conn.execute("INSERT OR IGNORE INTO data_version (id, version, changed_at) VALUES (1, 0, ?)", (time.time(),))
+
+    def current(self):
+        return tuple(self._connect().execute("SELECT version, changed_at FROM data_version WHERE id = 1").fetchone())
+
+    def bump(self):
+        self._connect().execute("UPDATE data_version SET version = version + 1, changed_at = ? WHERE id = 1", (time.time(),))
+
+
+class _Entry:
+    """A cached page"""
+
+    __slots__ = ('body', 'mimetype', 'etag', 'last_modified')
+
+    def __init__(self, body, mimetype, etag, last_modified):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class ResponseCache:
+    """
+    Cache GET pages per (route, query string, user, data version).
+
+    version   DataVersion or SQLiteDataVersion, bumped on every confirmed write
+    ttl       seconds a page is reused at most, which bounds staleness for
+              changes made outside this app (SQL editor, other services); 0 disables
+
+    Pages that flash messages, or are requested while messages are pending,
+    are never cached: the flashes would be replayed or lost.
+    """
+
+    def __init__(self, version=None, ttl=300, maxsize=512):
+        self.version = version or DataVersion()
+        self.enabled = ttl > 0
+        self.pages = TTLCache(ttl=ttl, maxsize=maxsize)
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def init_app(self, app):
+        def flashed(sender, **extra):
+            g.flashed_messages = True
+        message_flashed.connect(flashed, app, weak=False)
+
+    def _respond(self, entry, version_stamp):
+        """The cached page, or a 304 when the client's ETag/Last-Modified still match"""
+        response = make_response(entry.body)
+        response.mimetype = entry.mimetype
+        response.set_etag(entry.etag)
+        response.last_modified = entry.last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True  # Revalidate on every navigation, cheaply
+        response.vary.add('Cookie')
+        response.headers['X-Data-Version'] = str(version_stamp)
+        return response.make_conditional(request)
+
+    def cached(self, view):
+        """Decorator for GET views whose output depends only on the URL, the user and the data"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return view(*args, **kwargs)
+            if request.method != 'GET' or session.get('_flashes'):
+                self.bypassed += 1
+                return view(*args, **kwargs)
+
+            version, changed_at = self.version.current()
+            key = (request.endpoint, request.full_path, session.get('user', {}).get('id'), version)
+            entry = self.pages.get(key)
+            if entry is not MISSING:
+                response = self._respond(entry, version)
+                if response.status_code == 304:
+                    self.not_modified += 1
+                else:
+                    self.hits += 1
+                return response
+
+            self.misses += 1
+            g.flashed_messages = False
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or g.flashed_messages or response.direct_passthrough:
+                return response
+
+            body = response.get_data()
+            entry = _Entry(body, response.mimetype, hashlib.sha1(body).hexdigest(), changed_at)
+            self.pages.set(key, entry)
+            return self._respond(entry, version)
+        return wrapper
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'pages': self.pages.stats()['entries'],
+            'hits': self.hits,
+            'not_modified': self.not_modified,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'data_version': self.version.current()[0],
+        }
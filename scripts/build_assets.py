@@ -0,0 +1,29 @@
+# build_assets.py
+"""
+Build minified, content-hashed CSS/JS into static/dist.
+
+    python scripts/build_assets.py
+
+Run it on deploy (and after editing static files); the app picks up the
+manifest at startup and falls back to the source files when it is missing.
+"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSI
+from assets import build_assets
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+def main():
+    print(f"\n{ANSI['Y']}📦 Building static assets...{ANSI['W']}")
+    manifest = build_assets(STATIC_FOLDER)
+    for source, hashed in manifest.items():
+        before = os.path.getsize(os.path.join(STATIC_FOLDER, source))
+        after = os.path.getsize(os.path.join(STATIC_FOLDER, hashed))
+        print(f"  • {source} → {hashed} ({before / 1024:.1f} KB → {after / 1024:.1f} KB)")
+    print(f"{ANSI['G']}✅ Wrote {len(manifest)} assets and static/dist/manifest.json{ANSI['W']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# catalog_analytics.py
+"""
+Columnar analytics for the AI projects and datasets catalog.
+
+    python scripts/catalog_analytics.py export [--output exports] [--format parquet|arrow]
+    python scripts/catalog_analytics.py stats  [--output exports] [--format parquet|arrow]
+
+`export` writes both tables (hyperparameters flattened into columns) as chunked
+files; `stats` computes the catalog report on those files with pyarrow compute.
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSI
+import analytics
+
+def export(args):
+    """
+    Export ai_projects and datasets to columnar files
+    """
+    from clients import get_client
+    from repository import ProjectRepository, DatasetRepository
+
+    supabase = get_client()
+
+    print(f"\n{ANSI['Y']}📦 Exporting catalog to {args.output} ({args.format})...{ANSI['W']}")
+    started = time.perf_counter()
+    counts = analytics.export_catalog(
+        ProjectRepository(supabase), DatasetRepository(supabase), args.output,
+        file_format=args.format,
+        page_size=args.page_size,
+        rows_per_file=args.rows_per_file
+    )
+    elapsed = time.perf_counter() - started
+    print(f"{ANSI['G']}✅ Exported {counts['ai_projects']} projects and {counts['datasets']} datasets in {elapsed:.2f}s{ANSI['W']}")
+
+def stats(args):
+    """
+    Display catalog statistics computed on the exported files
+    """
+    started = time.perf_counter()
+    report = analytics.catalog_stats(args.output, file_format=args.format)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n📊 {ANSI['G']}Catalog Statistics:{ANSI['W']}")
+    print("=" * 60)
+    print(f"📈 {ANSI['B']}Total dataset size:{ANSI['W']} {report['total_size_mb']} MB ({report['total_size_gb']} GB)")
+    print(f"📁 {ANSI['B']}Total number of datasets:{ANSI['W']} {report['total_datasets']} (mean {report['mean_size_mb']} MB)")
+    if 'deduplicated_datasets' in report:
+        print(f"🧬 {ANSI['B']}Deduplicated:{ANSI['W']} {report['deduplicated_datasets']} datasets, "
+              f"{report['deduplicated_size_mb']} MB ({report['deduplicated_size_gb']} GB); "
+              f"{report['duplicate_datasets']} duplicates")
+    print(f"🤖 {ANSI['B']}Total number of projects:{ANSI['W']} {report['total_projects']}")
+
+    print(f"\n📄 {ANSI['B']}Formats:{ANSI['W']}")
+    for fmt, count in report['dataset_formats'].items():
+        print(f"  • {fmt}: {count}")
+
+    print(f"\n🧠 {ANSI['B']}Model types:{ANSI['W']}")
+    for model_type, count in report['project_types'].items():
+        print(f"  • {model_type}: {count}")
+
+    print(f"\n🗂️  {ANSI['B']}Largest projects:{ANSI['W']}")
+    for project in report['projects'][:args.top]:
+        print(f"  • {project['name']} ({project['model_type']}): {project['datasets']} datasets, {project['size_mb']} MB")
+
+    print("-" * 60)
+    print(f"{ANSI['B']}Report computed in {elapsed:.3f}s{ANSI['W']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar analytics for the dataset catalog")
+    parser.add_argument('command', choices=['export', 'stats'])
+    parser.add_argument('--output', default='exports', help="Directory holding the exported files")
+    parser.add_argument('--format', default='parquet', choices=analytics.FORMATS)
+    parser.add_argument('--page-size', type=int, default=1000, help="Rows fetched per Supabase request")
+    parser.add_argument('--rows-per-file', type=int, default=100000, help="Rows per part file")
+    parser.add_argument('--top', type=int, default=10, help="Projects shown in the rollup")
+    args = parser.parse_args()
+
+    try:
+        analytics.require_pyarrow()
+    except ImportError as e:
+        print(f"{ANSI['R']}❌ {e}{ANSI['W']}")
+        sys.exit(1)
+
+    if args.command == 'export':
+        export(args)
+    else:
+        stats(args)
+
+if __name__ == "__main__":
+    main()
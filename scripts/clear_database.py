@@ -4,19 +4,16 @@ Script to clear all data from Supabase database tables.
 This script will delete all records from ai_projects and datasets tables.
 """
 
-from supabase import create_client
-from dotenv import load_dotenv
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import ANSI
+from clients import LazyClient
+from repository import ProjectRepository, DatasetRepository
 
-# Load environment variables
-load_dotenv()
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
-
-supabase = create_client(url, key)
+supabase = LazyClient()  # Reads SUPABASE_URL/SUPABASE_KEY (and .env) on first use
+projects_repo = ProjectRepository(supabase)
+datasets_repo = DatasetRepository(supabase)
 
 def confirm_deletion():
     """
@@ -36,17 +33,14 @@ def clear_datasets_table():
         print(f"\n{ANSI['Y']}🗑️  Clearing datasets table...{ANSI['W']}")
         
         # Get count before deletion
-        count_result = supabase.table("datasets").select("id", count="exact").execute()
-        initial_count = len(count_result.data) if count_result.data else 0
-        
-        if initial_count == 0:
+        if datasets_repo.count() == 0:
             print(f"{ANSI['B']}📝 Datasets table is already empty.{ANSI['W']}")
             return True
             
         # Delete all records
-        result = supabase.table("datasets").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
+        deleted = datasets_repo.delete_all()
         
-        print(f"{ANSI['G']}✅ Successfully deleted {initial_count} records from datasets table.{ANSI['W']}")
+        print(f"{ANSI['G']}✅ Successfully deleted {deleted} records from datasets table.{ANSI['W']}")
         return True
         
     except Exception as e:
@@ -61,17 +55,14 @@ def clear_ai_projects_table():
         print(f"\n{ANSI['Y']}🗑️  Clearing ai_projects table...{ANSI['W']}")
         
         # Get count before deletion
-        count_result = supabase.table("ai_projects").select("id", count="exact").execute()
-        initial_count = len(count_result.data) if count_result.data else 0
-        
-        if initial_count == 0:
+        if projects_repo.count() == 0:
             print(f"{ANSI['B']}📝 AI Projects table is already empty.{ANSI['W']}")
             return True
             
         # Delete all records
-        result = supabase.table("ai_projects").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
+        deleted = projects_repo.delete_all()
         
-        print(f"{ANSI['G']}✅ Successfully deleted {initial_count} records from ai_projects table.{ANSI['W']}")
+        print(f"{ANSI['G']}✅ Successfully deleted {deleted} records from ai_projects table.{ANSI['W']}")
         return True
         
     except Exception as e:
@@ -87,12 +78,10 @@ def get_table_stats():
         print("=" * 40)
         
         # Count AI projects
-        projects_result = supabase.table("ai_projects").select("id", count="exact").execute()
-        projects_count = len(projects_result.data) if projects_result.data else 0
+        projects_count = projects_repo.count()
         
         # Count datasets
-        datasets_result = supabase.table("datasets").select("id", count="exact").execute()
-        datasets_count = len(datasets_result.data) if datasets_result.data else 0
+        datasets_count = datasets_repo.count()
         
         print(f"• AI Projects: {projects_count} records")
         print(f"• Datasets: {datasets_count} records")
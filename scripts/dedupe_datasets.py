@@ -0,0 +1,106 @@
+# dedupe_datasets.py
+"""
+Merge duplicate datasets already in the catalog.
+
+    python scripts/dedupe_datasets.py [--apply] [--page-size 1000] [--show 10]
+
+Datasets are grouped by fingerprint (normalized source_url, size and format,
+see catalog_index.py). For each group the oldest dataset is kept, the projects
+of the others are linked to it through dataset_projects and the duplicates are
+deleted; then every remaining dataset gets its fingerprint stored.
+Without --apply, only reports what would change.
+Requires the content-addressed catalog migration in docs/database_creation.sql.
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSI
+from catalog_index import plan_dedupe, dataset_fingerprint
+
+COLUMNS = "id, name, size_mb, format, source_url, ai_project_id, created_at, fingerprint"
+
+def load_rows(datasets_repo, page_size):
+    """Every dataset row, streamed page by page"""
+    return [row for page in datasets_repo.iter_rows(COLUMNS, page_size) for row in page]
+
+def report(plan, backfill, show):
+    duplicates = sum(len(dups) for _, dups in plan)
+    reclaimable_mb = sum(d['size_mb'] or 0 for _, dups in plan for d in dups)
+
+    print(f"\n📊 {ANSI['G']}Deduplication plan:{ANSI['W']}")
+    print("=" * 60)
+    print(f"🧬 {ANSI['B']}Duplicate groups:{ANSI['W']} {len(plan)}")
+    print(f"🗑️  {ANSI['B']}Duplicate datasets:{ANSI['W']} {duplicates} ({reclaimable_mb} MB)")
+    print(f"🏷️  {ANSI['B']}Fingerprints to store:{ANSI['W']} {len(backfill)}")
+
+    largest = sorted(plan, key=lambda group: -len(group[1]))[:show]
+    if largest:
+        print(f"\n📦 {ANSI['B']}Largest groups:{ANSI['W']}")
+        for canonical, dups in largest:
+            print(f"  • {canonical['name']} ({canonical['source_url']}): {len(dups) + 1} copies, keeping {canonical['id']}")
+
+def apply(datasets_repo, plan, backfill):
+    """Relink projects, delete duplicates, then store fingerprints (in that order, for the unique index)"""
+    duplicate_ids = [d['id'] for _, dups in plan for d in dups]
+    canonical_of = {d['id']: canonical['id'] for canonical, dups in plan for d in dups}
+    owner_of = {canonical['id']: canonical['ai_project_id'] for canonical, _ in plan}
+
+    links = {(canonical['id'], d['ai_project_id']) for canonical, dups in plan for d in dups if d['ai_project_id']}
+    # Links already pointing at a duplicate move to the dataset that is kept
+    links.update((canonical_of[dataset_id], project_id) for dataset_id, project_id in datasets_repo.links_of(duplicate_ids))
+    links = sorted(link for link in links if link[1] != owner_of[link[0]])
+
+    datasets_repo.link_projects(links)
+    print(f"{ANSI['G']}🔗 Linked {len(links)} projects to kept datasets{ANSI['W']}")
+    deleted = datasets_repo.delete_many(duplicate_ids)
+    print(f"{ANSI['G']}🗑️  Deleted {deleted} duplicate datasets{ANSI['W']}")
+    updated = 0
+    for start in range(0, len(backfill), datasets_repo.batch_size):
+        updated += len(datasets_repo.update_many(backfill[start:start + datasets_repo.batch_size]))
+    print(f"{ANSI['G']}🏷️  Stored {updated} fingerprints{ANSI['W']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate datasets already in the catalog")
+    parser.add_argument('--apply', action='store_true', help="Write the changes (default: report only)")
+    parser.add_argument('--page-size', type=int, default=1000, help="Rows fetched per Supabase request")
+    parser.add_argument('--show', type=int, default=10, help="Duplicate groups listed in the report")
+    args = parser.parse_args()
+
+    from clients import get_client
+    from repository import DatasetRepository
+
+    datasets_repo = DatasetRepository(get_client(), dedupe=True)
+
+    print(f"🧬 {ANSI['G']}Dataset Deduplication{ANSI['W']}")
+    started = time.perf_counter()
+    rows = load_rows(datasets_repo, args.page_size)
+    plan = plan_dedupe(rows)
+    duplicate_ids = {d['id'] for _, dups in plan for d in dups}
+    backfill = []
+    for row in rows:
+        fp = dataset_fingerprint(row)
+        if row['id'] not in duplicate_ids and row.get('fingerprint') != fp:
+            backfill.append({'id': row['id'], 'fingerprint': fp})
+    print(f"{ANSI['B']}Scanned {len(rows)} datasets in {time.perf_counter() - started:.2f}s{ANSI['W']}")
+
+    report(plan, backfill, args.show)
+    if not plan and not backfill:
+        print(f"\n{ANSI['B']}✨ Catalog is already deduplicated.{ANSI['W']}")
+        return
+    if not args.apply:
+        print(f"\n{ANSI['Y']}Dry run: re-run with --apply to write these changes.{ANSI['W']}")
+        return
+
+    print(f"\n{ANSI['G']}🚀 Applying...{ANSI['W']}")
+    try:
+        apply(datasets_repo, plan, backfill)
+    except Exception as e:
+        print(f"{ANSI['R']}❌ Deduplication failed: {e}{ANSI['W']}")
+        print(f"{ANSI['Y']}The job is safe to re-run: it picks up from the current state.{ANSI['W']}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# fault_stub.py
+"""
+Fault-injecting stand-in for the Supabase REST API, to exercise timeouts,
+retries and the circuit breaker locally.
+
+    python scripts/fault_stub.py [--port 54321] [--latency 0.2] [--error-rate 0.3] [--hang-rate 0.1]
+    SUPABASE_URL=http://localhost:54321 python app.py
+
+Serves a small in-memory ai_projects/datasets catalog (with dataset_projects
+links and --duplicate-rate copies of earlier datasets) under /rest/v1/. Each
+request is delayed by --latency (plus up to --jitter), fails with --status at
+--error-rate, or hangs for --hang seconds at --hang-rate.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ANSI
+
+TABLES = {'ai_projects': [], 'datasets': [], 'dataset_projects': []}
+lock = threading.Lock()
+counters = {'requests': 0, 'errors': 0, 'hangs': 0}
+
+
+def seed(projects, datasets_per_project, duplicate_rate=0.0):
+    """Fill the in-memory tables with a small catalog; duplicate_rate of the datasets copy an earlier one's content"""
+    for i in range(projects):
+        project = {
+            'id': str(uuid.uuid4()),
+            'name': f"Stub project {i}",
+            'description': "Served by fault_stub.py",
+            'model_type': random.choice(['NLP', 'Computer Vision', 'Reinforcement Learning']),
+            'hyperparameters': {'learning_rate': 0.001, 'epochs': 10},
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        TABLES['ai_projects'].append(project)
+        for j in range(datasets_per_project):
+            content = {
+                'size_mb': random.randint(1, 5000),
+                'format': random.choice(['CSV', 'JSON', 'Parquet']),
+                'source_url': f"https://data.example.com/{uuid.uuid4().hex}",
+            }
+            if TABLES['datasets'] and random.random() < duplicate_rate:
+                original = random.choice(TABLES['datasets'])
+                content = {k: original[k] for k in content}
+            TABLES['datasets'].append(dict(
+                content,
+                id=str(uuid.uuid4()),
+                name=f"Stub dataset {i}.{j}",
+                description=None,
+                ai_project_id=project['id'],
+                created_at=datetime.now(timezone.utc).isoformat(),
+                fingerprint=None,
+            ))
+
+
+def with_project(dataset):
+    """Embed the parent project the way ai_projects(id, name, model_type) does"""
+    project = next((p for p in TABLES['ai_projects'] if p['id'] == dataset['ai_project_id']), None)
+    embedded = {k: project[k] for k in ('id', 'name', 'model_type')} if project else None
+    return dict(dataset, ai_projects=embedded)
+
+
+def matches(row, params):
+    """Apply the eq/neq/gt/in filters PostgREST receives as query parameters"""
+    for column, values in params.items():
+        if column in ('select', 'order', 'limit', 'offset'):
+            continue
+        op, _, value = values[0].partition('.')
+        current = str(row.get(column))
+        if op == 'eq' and current != value:
+            return False
+        if op == 'neq' and current == value:
+            return False
+        if op == 'gt' and not current > value:
+            return False
+        if op == 'in' and current not in value.strip('()').replace('"', '').split(','):
+            return False
+    return True
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    options = None
+
+    def log_message(self, format, *args):
+        if self.options.verbose:
+            super().log_message(format, *args)
+
+    def _inject_faults(self):
+        """Delay, hang or fail the request; returns True when a failure was sent"""
+        options = self.options
+        with lock:
+            counters['requests'] += 1
+        time.sleep(options.latency + random.uniform(0, options.jitter))
+        if random.random() < options.hang_rate:
+            with lock:
+                counters['hangs'] += 1
+            time.sleep(options.hang)
+        if random.random() < options.error_rate:
+            with lock:
+                counters['errors'] += 1
+            self._send(options.status, {'message': 'Injected failure', 'code': str(options.status)})
+            return True
+        return False
+
+    def _send(self, status, body=None, total=None):
+        payload = b'' if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if total is not None:
+            self.send_header('Content-Range', f"*/{total}")
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _route(self):
+        """(table, query params) for /rest/v1/<table>, or None"""
+        parsed = urlparse(self.path)
+        table = parsed.path.rsplit('/', 1)[-1]
+        if not parsed.path.startswith('/rest/v1/') or table not in TABLES:
+            self._send(404, {'message': f"Unknown path {parsed.path}"})
+            return None
+        return table, parse_qs(parsed.query)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_GET(self):
+        route = self._route()
+        if route is None or self._inject_faults():
+            return
+        table, params = route
+        with lock:
+            rows = [r for r in TABLES[table] if matches(r, params)]
+        if 'order' in params:
+            # Stable sorts, last key first, give the multi-column order
+            for term in reversed(params['order'][0].split(',')):
+                column, _, direction = term.partition('.')
+                rows.sort(key=lambda r: str(r.get(column)), reverse=direction.startswith('desc'))
+        if table == 'datasets' and 'ai_projects' in params.get('select', [''])[0]:
+            rows = [with_project(r) for r in rows]
+        offset = int(params.get('offset', ['0'])[0])
+        limit = params.get('limit')
+        page = rows[offset:offset + int(limit[0])] if limit else rows[offset:]
+        self._send(200, page, total=len(rows))
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def _apply_dataset_updates(self):
+        """Stand-in for the apply_dataset_updates SQL function"""
+        if self._inject_faults():
+            return
+        updates = {u['id']: u for u in self._body()['updates']}
+        with lock:
+            rows = [r for r in TABLES['datasets'] if r['id'] in updates]
+            for row in rows:
+                row.update({k: v for k, v in updates[row['id']].items() if k != 'id'})
+        self._send(200, rows)
+
+    def do_POST(self):
+        if urlparse(self.path).path == '/rest/v1/rpc/apply_dataset_updates':
+            return self._apply_dataset_updates()
+        route = self._route()
+        if route is None or self._inject_faults():
+            return
+        table, _ = route
+        body = self._body()
+        rows = [dict(row, created_at=datetime.now(timezone.utc).isoformat())
+                for row in (body if isinstance(body, list) else [body])]
+        with lock:
+            if table == 'dataset_projects':
+                # Primary key (dataset_id, ai_project_id); upserts ignore duplicates
+                existing = {(r['dataset_id'], r['ai_project_id']) for r in TABLES[table]}
+                rows = [r for r in rows if (r['dataset_id'], r['ai_project_id']) not in existing]
+            else:
+                for row in rows:
+                    row['id'] = str(uuid.uuid4())
+            if table == 'datasets':
+                taken = {r.get('fingerprint') for r in TABLES[table]} - {None}
+                if any(r.get('fingerprint') in taken for r in rows):
+                    return self._send(409, {'message': 'duplicate key value violates unique constraint '
+                                                       '"idx_datasets_fingerprint"', 'code': '23505'})
+            TABLES[table].extend(rows)
+        self._send(201, rows)
+
+    def do_PATCH(self):
+        route = self._route()
+        if route is None or self._inject_faults():
+            return
+        table, params = route
+        changes = self._body()
+        with lock:
+            rows = [r for r in TABLES[table] if matches(r, params)]
+            for row in rows:
+                row.update(changes)
+        self._send(200, rows)
+
+    def do_DELETE(self):
+        route = self._route()
+        if route is None or self._inject_faults():
+            return
+        table, params = route
+        with lock:
+            rows = [r for r in TABLES[table] if matches(r, params)]
+            TABLES[table] = [r for r in TABLES[table] if r not in rows]
+            if table in ('ai_projects', 'datasets'):
+                # ON DELETE CASCADE
+                column = 'ai_project_id' if table == 'ai_projects' else 'dataset_id'
+                ids = {r['id'] for r in rows}
+                TABLES['dataset_projects'] = [r for r in TABLES['dataset_projects'] if r[column] not in ids]
+        self._send(200, rows, total=len(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fault-injecting Supabase REST stub")
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra latency, up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with --status")
+    parser.add_argument('--status', type=int, default=503, help="Status code of injected failures")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="Fraction of requests that hang for --hang seconds")
+    parser.add_argument('--hang', type=float, default=30.0)
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--datasets-per-project', type=int, default=5)
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help="Fraction of datasets copying an earlier one's content")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    seed(args.projects, args.datasets_per_project, args.duplicate_rate)
+    StubHandler.options = args
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StubHandler)
+    print(f"{ANSI['G']}🧪 Fault stub listening on http://localhost:{args.port}{ANSI['W']}")
+    print(f"{ANSI['B']}latency={args.latency}s jitter={args.jitter}s error_rate={args.error_rate} "
+          f"(HTTP {args.status}) hang_rate={args.hang_rate} ({args.hang}s){ANSI['W']}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{ANSI['Y']}Requests: {counters['requests']}, injected errors: {counters['errors']}, "
+              f"hangs: {counters['hangs']}{ANSI['W']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# singleflight.py
+"""
+Request coalescing for identical concurrent reads.
+While a query is in flight, other callers asking for the same key wait for
+it and share its result instead of sending their own upstream request.
+"""
+
+import threading
+
+
+class _Call:
+    """One in-flight upstream call and the callers waiting on it"""
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run fn once per key at a time; concurrent callers get the same result.
+    Results are shared objects, so callers must treat them as read-only.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    def do(self, key, fn):
+        """Return fn(), sharing the call with any identical one already running"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced_calls += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.upstream_calls += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        """Counters for the metrics endpoint"""
+        with self._lock:
+            total = self.upstream_calls + self.coalesced_calls
+            return {
+                'requests': total,
+                'upstream_calls': self.upstream_calls,
+                'upstream_calls_saved': self.coalesced_calls,
+                'in_flight': len(self._calls),
+                'saved_ratio': round(self.coalesced_calls / total, 3) if total else 0.0,
+            }
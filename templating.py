@@ -0,0 +1,71 @@
+# templating.py
+"""
+Jinja setup: templates compiled once at startup (optionally with an on-disk
+bytecode cache shared by workers) and a {% cache %} tag for fragments that
+do not need to be re-rendered on every hit.
+
+    {% cache 'nav', user.id, request.endpoint %} ... {% endcache %}
+"""
+
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from repository.cache import NullCache, MISSING
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Cache the rendered body of {% cache key, ... %} blocks in
+    environment.fragment_cache (any cache with get/set/clear, see repository.cache).
+    Keys must include everything the fragment depends on, e.g. the user id.
+    When environment.fragment_version is set (a DataVersion or SQLiteDataVersion),
+    its current version is part of every key, so a write in another process
+    invalidates the fragments here too.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=NullCache(), fragment_version=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(key)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        key = tuple(key)
+        if self.environment.fragment_version is not None:
+            key += (self.environment.fragment_version.current()[0],)
+        fragment = self.environment.fragment_cache.get(key)
+        if fragment is MISSING:
+            fragment = caller()
+            self.environment.fragment_cache.set(key, fragment)
+        return fragment
+
+
+def init_templates(app, fragment_cache=None, bytecode_cache_dir=None, version=None):
+    """
+    Enable fragment caching (keyed by version when given) and compile every
+    template now, so the first request does not pay for it.
+    Returns the number of templates compiled.
+    """
+    env = app.jinja_env
+    if bytecode_cache_dir:
+        # FileSystemBytecodeCache does not create its directory and would fail on the first write
+        os.makedirs(bytecode_cache_dir, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+    env.add_extension(FragmentCacheExtension)
+    env.fragment_cache = fragment_cache or NullCache()
+    env.fragment_version = version
+
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
@@ -0,0 +1,261 @@
+"""In-memory stand-ins for the parts of the Supabase client the code under test uses"""
+
+import json
+
+
+class FakeAPIError(Exception):
+    """Shaped like postgrest's APIError: carries the PostgREST/Postgres error code"""
+
+    def __init__(self, code, message="error"):
+        super().__init__(message)
+        self.code = code
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.orders = []
+        self.offset = 0
+        self.count = None
+
+    def select(self, columns="*"):
+        self.columns = columns
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def range(self, start, end):
+        self.offset, self.count = start, end - start + 1
+        return self
+
+    def execute(self):
+        self.client.queries.append(self)
+        if self.client.fail is not None:
+            self.client.fail(self)
+        rows = [dict(row) for row in self.client.tables[self.table] if all(f(row) for f in self.filters)]
+        for column, desc in reversed(self.orders):
+            if any(column not in row for row in self.client.tables[self.table]):
+                raise FakeAPIError('42703', f"column {self.table}.{column} does not exist")
+            rows.sort(key=lambda row: row[column] or '', reverse=desc)
+        rows = rows[self.offset:]
+        if self.count is not None:
+            rows = rows[:self.count]
+        return _Response(rows)
+
+
+class FakeClient:
+    """client.table(name) query builder over {table: [rows]}; fail(query) may raise to inject errors"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+        self.fail = None
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+# Foreign keys PostgREST can embed: (table, embedded table) -> column of table
+FOREIGN_KEYS = {('datasets', 'ai_projects'): 'ai_project_id'}
+# Unique constraints: table -> column tuples (NULLs never conflict, as in Postgres)
+UNIQUE = {'datasets': [('fingerprint',)], 'dataset_projects': [('dataset_id', 'ai_project_id')]}
+
+
+def _split_top_level(text):
+    """'a,b(c,d),e' -> ['a', 'b(c,d)', 'e']"""
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    return [part.strip() for part in parts + [current] if part.strip()]
+
+
+def _coerce(raw, sample):
+    if isinstance(sample, bool):
+        return raw == 'true'
+    if isinstance(sample, int):
+        return int(raw)
+    if isinstance(sample, float):
+        return float(raw)
+    return raw
+
+
+def _matches(row, column, condition):
+    op, _, raw = condition.partition('.')
+    value = row.get(column)
+    if op == 'is':
+        return value is None if raw == 'null' else value is not None
+    if value is None:
+        return False
+    if op == 'in':
+        return value in [_coerce(item, value) for item in raw.strip('()').split(',')]
+    other = _coerce(raw, value)
+    return {'eq': value == other, 'neq': value != other, 'gt': value > other, 'gte': value >= other,
+            'lt': value < other, 'lte': value <= other}[op]
+
+
+class FakePostgrest:
+    """
+    A PostgREST server over {table: [rows]} behind a real postgrest client
+    (httpx.MockTransport), so repository queries run unchanged. Supports the
+    subset the repositories use: select with embedding, eq/neq/gt/gte/lt/lte/in/is
+    filters, order, limit/offset, exact counts, insert/upsert, update, delete and
+    functions registered in rpcs. fail(request) may return a response to inject errors.
+    """
+
+    def __init__(self, tables, rpcs=None):
+        import httpx
+        from postgrest import SyncPostgrestClient
+        self.tables = tables
+        self.rpcs = rpcs or {}
+        self.requests = []
+        self.fail = None
+        self._next_id = 0
+        http = httpx.Client(base_url="http://fake", transport=httpx.MockTransport(self._handle))
+        self.client = SyncPostgrestClient("http://fake", http_client=http)
+
+    # The parts of a Supabase client the repositories use
+    def table(self, name):
+        return self.client.table(name)
+
+    def rpc(self, name, params):
+        return self.client.rpc(name, params)
+
+    def _handle(self, request):
+        import httpx
+        self.requests.append(request)
+        if self.fail is not None:
+            response = self.fail(request)
+            if response is not None:
+                return response
+        path = request.url.path.strip('/')
+        prefer = request.headers.get('prefer', '')
+        body = json.loads(request.content) if request.content else None
+        if path.startswith('rpc/'):
+            function = self.rpcs.get(path[4:])
+            if function is None:
+                return self._error(404, 'PGRST202', f"function {path[4:]} not found")
+            return httpx.Response(200, json=function(self, **body))
+
+        table = path
+        params = request.url.params
+        rows = self.tables.setdefault(table, [])
+        selected = [row for row in rows if all(
+            _matches(row, column, condition) for column, condition in params.multi_items()
+            if column not in ('select', 'order', 'limit', 'offset', 'columns', 'on_conflict'))]
+
+        if request.method in ('GET', 'HEAD'):
+            total = len(selected)
+            for clause in reversed(params.get('order', '').split(',') if params.get('order') else []):
+                column, _, direction = clause.partition('.')
+                desc = direction.startswith('desc')
+                present = sorted((r for r in selected if r.get(column) is not None), key=lambda r: r[column], reverse=desc)
+                selected = present + [r for r in selected if r.get(column) is None]
+            offset = int(params.get('offset', 0))
+            limit = params.get('limit')
+            selected = selected[offset:offset + int(limit) if limit is not None else None]
+            headers = {'content-range': f"*/{total}"} if 'count=exact' in prefer else {}
+            if request.method == 'HEAD':
+                return httpx.Response(200, headers=headers)
+            return httpx.Response(200, json=[self._project(table, row, params.get('select', '*')) for row in selected],
+                                  headers=headers)
+
+        if request.method == 'POST':
+            written = []
+            for row in body if isinstance(body, list) else [body]:
+                row = dict(row)
+                if table != 'dataset_projects':
+                    row.setdefault('id', self._new_id())
+                    row.setdefault('created_at', f"2024-01-01T00:00:{len(rows):02d}")
+                if self._conflict(table, row, rows):
+                    if 'ignore-duplicates' in prefer:
+                        continue
+                    return self._error(409, '23505', f"duplicate key value violates unique constraint on {table}")
+                rows.append(row)
+                written.append(row)
+            return self._written(written, prefer, 201)
+
+        if request.method == 'PATCH':
+            for row in selected:
+                if self._conflict(table, dict(row, **body), [r for r in rows if r is not row]):
+                    return self._error(409, '23505', f"duplicate key value violates unique constraint on {table}")
+            for row in selected:
+                row.update(body)
+            return self._written(selected, prefer, 200)
+
+        if request.method == 'DELETE':
+            ids = {id(row) for row in selected}
+            self.tables[table] = [row for row in rows if id(row) not in ids]
+            return self._written(selected, prefer, 200)
+        return self._error(405, 'PGRST000', request.method)
+
+    def _new_id(self):
+        self._next_id += 1
+        return f"00000000-0000-0000-0000-{self._next_id:012d}"
+
+    @staticmethod
+    def _conflict(table, row, rows):
+        for columns in UNIQUE.get(table, []):
+            key = tuple(row.get(c) for c in columns)
+            if None not in key and any(tuple(other.get(c) for c in columns) == key for other in rows):
+                return True
+        return False
+
+    def _project(self, table, row, select):
+        if select == '*':
+            return dict(row)
+        result = {}
+        for column in _split_top_level(select):
+            if '(' in column:
+                embedded, inner = column[:-1].split('(', 1)
+                parent_id = row.get(FOREIGN_KEYS[(table, embedded)])
+                parent = next((r for r in self.tables.get(embedded, []) if r['id'] == parent_id), None)
+                result[embedded] = self._project(embedded, parent, inner) if parent else None
+            elif column == '*':
+                result.update(row)
+            else:
+                result[column] = row.get(column)
+        return result
+
+    @staticmethod
+    def _written(rows, prefer, status):
+        import httpx
+        headers = {'content-range': f"*/{len(rows)}"} if 'count=exact' in prefer else {}
+        if 'return=minimal' in prefer:
+            return httpx.Response(status if status != 200 else 204, headers=headers)
+        return httpx.Response(status, json=[dict(row) for row in rows], headers=headers)
+
+    @staticmethod
+    def _error(status, code, message):
+        import httpx
+        return httpx.Response(status, json={'code': code, 'message': message, 'details': None, 'hint': None})
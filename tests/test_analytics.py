@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import analytics
+
+analytics.require_pyarrow()
+
+
+class FakeRepository:
+    """iter_rows() of the repositories over a list of rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_rows(self, columns="*", page_size=1000):
+        for start in range(0, len(self.rows), page_size):
+            yield [dict(row) for row in self.rows[start:start + page_size]]
+
+
+PROJECTS = [
+    {'id': 'p1', 'name': 'Vision', 'description': None, 'model_type': 'Computer Vision', 'created_at': '2024-01-01',
+     'hyperparameters': {'epochs': 10, 'optimizer': {'name': 'adam', 'lr': 0.001}, 'augment': True}},
+    {'id': 'p2', 'name': 'Text', 'description': None, 'model_type': 'NLP', 'created_at': '2024-01-02',
+     'hyperparameters': {'epochs': 3, 'layers': [1, 2]}},
+]
+
+
+def dataset(id, project, size_mb, format='CSV', source_url=None):
+    return {'id': id, 'name': id, 'description': None, 'size_mb': size_mb, 'format': format,
+            'source_url': source_url, 'ai_project_id': project, 'created_at': '2024-01-03'}
+
+
+DATASETS = [
+    dataset('d1', 'p1', 100, source_url='https://example.com/images'),
+    dataset('d2', 'p2', 100, source_url='https://example.com/images?utm_source=x'),
+    dataset('d3', 'p2', 50, format='JSON'),
+    dataset('d4', 'gone', 5),
+]
+
+
+def test_flatten_hyperparameters():
+    assert analytics.flatten_hyperparameters(PROJECTS[0]['hyperparameters']) == {
+        'hp_epochs': 10, 'hp_optimizer.name': 'adam', 'hp_optimizer.lr': 0.001, 'hp_augment': True}
+
+
+def test_projects_table_types_hyperparameter_columns():
+    table = analytics.projects_table(PROJECTS)
+    types = {field.name: str(field.type) for field in table.schema}
+    assert types['hp_epochs'] == 'double'
+    assert types['hp_augment'] == 'bool'
+    assert types['hp_optimizer.name'] == 'string'
+    assert table.column('hp_layers').to_pylist() == [None, '[1, 2]']
+
+
+@pytest.mark.parametrize('file_format', analytics.FORMATS)
+def test_export_then_stats(tmp_path, file_format):
+    counts = analytics.export_catalog(FakeRepository(PROJECTS), FakeRepository(DATASETS), str(tmp_path),
+                                      file_format=file_format, page_size=2, rows_per_file=2)
+    assert counts == {'ai_projects': 2, 'datasets': 4}
+    assert len(list((tmp_path / 'datasets').iterdir())) == 2  # A new part once a part holds rows_per_file rows
+
+    report = analytics.catalog_stats(str(tmp_path), file_format=file_format)
+    assert report['total_projects'] == 2
+    assert report['total_datasets'] == 4
+    assert report['total_size_mb'] == 255
+    assert report['dataset_formats'] == {'CSV': 3, 'JSON': 1}
+    assert report['project_types'] == {'Computer Vision': 1, 'NLP': 1}
+    assert report['projects'] == [
+        {'id': 'p2', 'name': 'Text', 'model_type': 'NLP', 'datasets': 2, 'size_mb': 150},
+        {'id': 'p1', 'name': 'Vision', 'model_type': 'Computer Vision', 'datasets': 1, 'size_mb': 100},
+        {'id': 'gone', 'name': 'Deleted project', 'model_type': None, 'datasets': 1, 'size_mb': 5},
+    ]
+    # d1 and d2 are the same content once tracking parameters are dropped
+    assert report['deduplicated_datasets'] == 3
+    assert report['deduplicated_size_mb'] == 155
+    assert report['duplicate_datasets'] == 1
+
+
+@pytest.mark.parametrize('file_format', analytics.FORMATS)
+def test_stats_of_an_empty_catalog(tmp_path, file_format):
+    counts = analytics.export_catalog(FakeRepository([]), FakeRepository([]), str(tmp_path), file_format=file_format)
+    assert counts == {'ai_projects': 0, 'datasets': 0}
+
+    report = analytics.catalog_stats(str(tmp_path), file_format=file_format)
+    assert report['total_datasets'] == 0
+    assert report['total_size_mb'] == 0
+    assert report['projects'] == []
+    assert report['dataset_formats'] == {}
+    assert report['deduplicated_datasets'] == 0
+
+
+def test_reexport_replaces_old_parts(tmp_path):
+    analytics.export_catalog(FakeRepository(PROJECTS), FakeRepository(DATASETS), str(tmp_path), rows_per_file=1)
+    analytics.export_catalog(FakeRepository(PROJECTS), FakeRepository([]), str(tmp_path))
+    assert analytics.catalog_stats(str(tmp_path))['total_datasets'] == 0
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        analytics.export_catalog(FakeRepository([]), FakeRepository([]), str(tmp_path), file_format='csv')
@@ -0,0 +1,141 @@
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from supabase_auth.errors import AuthApiError, AuthRetryableError
+
+from auth_tokens import TokenVerifier, UserClientCache, VerificationUnavailable, seconds_until_expiry
+
+SECRET = "legacy-secret"
+
+
+def make_token(key=SECRET, algorithm='HS256', expires_in=3600, **claims):
+    payload = dict({'sub': 'user-1', 'aud': 'authenticated', 'exp': int(time.time()) + expires_in}, **claims)
+    return jwt.encode(payload, key, algorithm=algorithm)
+
+
+class FakeSigningKey:
+    def __init__(self, key):
+        self.key = key
+
+
+def test_hs256_with_secret():
+    claims = TokenVerifier("http://stub", jwt_secret=SECRET).verify(make_token())
+    assert claims['sub'] == 'user-1'
+    assert seconds_until_expiry(claims) > 3500
+
+
+def test_hs256_wrong_secret_rejected():
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenVerifier("http://stub", jwt_secret="other").verify(make_token())
+
+
+def test_expired_token():
+    with pytest.raises(jwt.ExpiredSignatureError):
+        TokenVerifier("http://stub", jwt_secret=SECRET).verify(make_token(expires_in=-60))
+
+
+def test_hs256_without_secret_or_remote_fails_clearly():
+    with pytest.raises(jwt.InvalidAlgorithmError, match="SUPABASE_JWT_SECRET"):
+        TokenVerifier("http://stub").verify(make_token())
+
+
+def test_hs256_without_secret_uses_remote_once_per_token():
+    calls = []
+    verifier = TokenVerifier("http://stub", remote=calls.append)
+    token = make_token()
+    assert verifier.verify(token)['sub'] == 'user-1'
+    assert verifier.verify(token)['sub'] == 'user-1'
+    assert calls == [token]
+
+
+def test_hs256_remote_rejection():
+    def reject(token):
+        raise RuntimeError("invalid JWT")
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenVerifier("http://stub", remote=reject).verify(make_token())
+
+
+def test_expired_hs256_never_reaches_remote():
+    calls = []
+    with pytest.raises(jwt.ExpiredSignatureError):
+        TokenVerifier("http://stub", remote=calls.append).verify(make_token(expires_in=-60))
+    assert calls == []
+
+
+def test_asymmetric_token_uses_jwks_even_with_secret():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    verifier = TokenVerifier("http://stub", jwt_secret=SECRET)
+    verifier._jwks_client.get_signing_key_from_jwt = lambda token: FakeSigningKey(private_key.public_key())
+    assert verifier.verify(make_token(private_key, 'RS256'))['sub'] == 'user-1'
+
+
+def test_unreachable_jwks_is_not_an_invalid_token():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    verifier = TokenVerifier("http://127.0.0.1:9", jwks_timeout=1)  # Nothing listens on the discard port
+    started = time.monotonic()
+    with pytest.raises(VerificationUnavailable):
+        verifier.verify(make_token(private_key, 'RS256', kid='k1'))
+    assert time.monotonic() - started < 5
+
+
+@pytest.mark.parametrize('error', [
+    httpx.ConnectError("connection refused"),
+    AuthRetryableError("Bad gateway", 502),
+    AuthApiError("Service unavailable", 503, None),
+])
+def test_remote_outage_is_not_an_invalid_token(error):
+    def down(token):
+        raise error
+    with pytest.raises(VerificationUnavailable):
+        TokenVerifier("http://stub", remote=down).verify(make_token())
+
+
+def test_remote_client_error_rejects_the_token():
+    def reject(token):
+        raise AuthApiError("invalid JWT", 401, None)
+    with pytest.raises(jwt.InvalidSignatureError):
+        TokenVerifier("http://stub", remote=reject).verify(make_token())
+
+
+def test_session_survives_an_auth_outage(monkeypatch):
+    import app as web
+
+    def unavailable(token):
+        raise VerificationUnavailable("JWKS unreachable")
+    monkeypatch.setattr(web.token_verifier, 'verify', unavailable)
+    monkeypatch.setattr(web, 'rate_limiter', None)
+    client = web.app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'id': 'user-1'}
+        session['access_token'] = 'token'
+
+    api = client.get('/api/projects')
+    assert api.status_code == 503
+    assert api.headers['Retry-After']
+    page = client.get('/projects')
+    assert page.status_code == 503
+    assert b'Service unavailable' in page.data
+    with client.session_transaction() as session:
+        assert session['user'] == {'id': 'user-1'}
+
+
+def test_unsupported_algorithm():
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        TokenVerifier("http://stub", jwt_secret=SECRET).verify(make_token(algorithm='HS512'))
+
+
+def test_user_client_cache_lru():
+    cache = UserClientCache("http://localhost:54321", "key", maxsize=2)
+    first = cache.get('a', 'token-a')
+    assert cache.get('a', 'token-a') is first
+    cache.get('b', 'token-b')
+    cache.get('a', 'token-a')  # a becomes most recent
+    cache.get('c', 'token-c')  # evicts b
+    assert len(cache) == 2
+    assert cache.get('a', 'token-a') is first
+    assert cache.get('a', 'rotated') is not first
+    cache.discard('a')
+    assert len(cache) == 1
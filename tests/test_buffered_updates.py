@@ -0,0 +1,72 @@
+import pytest
+
+import app as web
+from write_buffer import WriteBehindBuffer
+
+
+class FakeDatasets:
+    def update_many(self, updates, client=None):
+        return updates
+
+
+class Row:
+    def __init__(self, changes):
+        self.changes = changes
+
+    def to_dict(self):
+        return dict(self.changes)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    direct = []
+
+    def update(dataset_id, changes):
+        # RLS: u1 may read 'readable' but only write 'writable'
+        direct.append(dataset_id)
+        return Row(dict(changes, id=dataset_id)) if dataset_id == 'writable' else None
+
+    buffer = WriteBehindBuffer(FakeDatasets())
+    monkeypatch.setattr(web, 'write_buffer', buffer)
+    monkeypatch.setattr(web, 'rate_limiter', None)
+    monkeypatch.setattr(web, 'authenticate_request', lambda: True)
+    monkeypatch.setattr(web.datasets_repo, 'update', update)
+    web.buffered_access.clear()
+    test_client = web.app.test_client()
+    with test_client.session_transaction() as session:
+        session['user'] = {'id': 'u1'}
+    return test_client, buffer, direct
+
+
+def test_first_update_is_written_by_the_user_then_updates_are_queued(client):
+    test_client, buffer, direct = client
+    assert test_client.put('/api/datasets/writable', json={'size_mb': 1}).status_code == 200
+    for size in (2, 3):
+        response = test_client.put('/api/datasets/writable', json={'size_mb': size})
+        assert response.status_code == 202
+    assert direct == ['writable']
+    assert buffer.pending('writable') == {'size_mb': 3}
+    assert buffer._pending['writable'].user == 'u1'
+
+
+def test_rows_the_user_cannot_write_are_never_buffered(client):
+    test_client, buffer, direct = client
+    for _ in range(2):
+        response = test_client.put('/api/datasets/readable', json={'size_mb': 1})
+        assert response.status_code == 404
+    assert direct == ['readable', 'readable']
+    assert buffer.pending('readable') is None
+
+
+def test_buffer_is_disabled_for_several_workers():
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, WEB_CONCURRENCY='3', WRITE_BUFFER_ENABLED='True')
+    env.pop('WRITE_BUFFER_JOURNAL', None)
+    result = subprocess.run([sys.executable, '-c', 'import app; print(app.write_buffer)'],
+                            cwd=root, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert 'Write buffer disabled' in result.stdout
+    assert result.stdout.strip().endswith('None')
@@ -0,0 +1,75 @@
+import pytest
+
+from catalog_index import dedup_totals, fingerprint, normalize_source_url, plan_dedupe
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTPS://Example.COM/data/', 'https://example.com/data'),
+    ('https://example.com:443/data', 'https://example.com/data'),
+    ('http://example.com:8080/data', 'http://example.com:8080/data'),
+    ('example.com/data', 'https://example.com/data'),
+    ('https://example.com/data#section', 'https://example.com/data'),
+    ('https://example.com/data?b=2&a=1', 'https://example.com/data?a=1&b=2'),
+    ('https://example.com/data?utm_source=x&UTM_Medium=y&fbclid=1&gclid=2', 'https://example.com/data'),
+    ('https://example.com', 'https://example.com/'),
+    ('', None),
+    (None, None),
+])
+def test_normalize_source_url(url, expected):
+    assert normalize_source_url(url) == expected
+
+
+@pytest.mark.parametrize('param', ['ref', 'referrer', 'refresh', 'fbclid_version', 'gclid2'])
+def test_non_tracking_parameters_are_kept(param):
+    assert normalize_source_url(f"https://github.com/org/repo/archive?{param}=v2") == \
+        f"https://github.com/org/repo/archive?{param}=v2"
+
+
+def test_ref_selects_different_content():
+    main = fingerprint('https://example.com/data.csv?ref=main', 10, 'CSV')
+    tagged = fingerprint('https://example.com/data.csv?ref=v1.0', 10, 'CSV')
+    assert main != tagged
+
+
+def test_fingerprint_ignores_presentation_differences():
+    assert fingerprint('https://example.com/data.csv', 10, 'CSV') == \
+        fingerprint('EXAMPLE.com/data.csv/?utm_campaign=launch', 10.4, ' csv ')
+
+
+def test_fingerprint_depends_on_size_and_format():
+    base = fingerprint('https://example.com/data', 10, 'CSV')
+    assert base != fingerprint('https://example.com/data', 11, 'CSV')
+    assert base != fingerprint('https://example.com/data', 10, 'JSON')
+    assert fingerprint(None, 10, 'CSV') is None
+
+
+def row(id, created_at, source_url='https://example.com/data', size_mb=10, format='CSV'):
+    return {'id': id, 'created_at': created_at, 'source_url': source_url, 'size_mb': size_mb, 'format': format}
+
+
+def test_plan_keeps_the_oldest_registration():
+    rows = [row('b', '2024-02-01'), row('a', '2024-01-01'), row('c', '2024-03-01', source_url='https://example.com/data?utm_source=x')]
+    [(canonical, duplicates)] = plan_dedupe(rows)
+    assert canonical['id'] == 'a'
+    assert [d['id'] for d in duplicates] == ['b', 'c']
+
+
+def test_plan_never_groups_datasets_without_a_source_url():
+    rows = [row('a', '2024-01-01', source_url=None), row('b', '2024-01-02', source_url='')]
+    assert plan_dedupe(rows) == []
+
+
+def test_plan_keeps_different_refs_apart():
+    rows = [row('a', '2024-01-01', source_url='https://example.com/data?ref=main'),
+            row('b', '2024-01-02', source_url='https://example.com/data?ref=dev')]
+    assert plan_dedupe(rows) == []
+
+
+def test_dedup_totals_count_links_and_unique_content():
+    rows = [row('a', '2024-01-01'), row('b', '2024-01-02'), row('c', '2024-01-03', source_url=None, size_mb=5)]
+    totals = dedup_totals(rows, linked_ids=['a'])
+    assert totals['logical_datasets'] == 4
+    assert totals['logical_size_mb'] == 35
+    assert totals['deduplicated_datasets'] == 2
+    assert totals['deduplicated_size_mb'] == 15
+    assert totals['duplicate_datasets'] == 2
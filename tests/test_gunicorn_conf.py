@@ -0,0 +1,38 @@
+import os
+import runpy
+
+import pytest
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    for name in ('WEB_CONCURRENCY', 'DATA_VERSION_STORE', 'RATE_LIMIT_STORE'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv('GUNICORN_STATE_DIR', str(tmp_path / 'state'))
+    return monkeypatch
+
+
+def test_several_workers_share_their_stores(env, tmp_path):
+    env.setenv('WEB_CONCURRENCY', '3')
+    settings = runpy.run_path(CONF)
+    assert settings['workers'] == 3
+    assert os.environ['WEB_CONCURRENCY'] == '3'
+    assert os.environ['DATA_VERSION_STORE'] == str(tmp_path / 'state' / 'version.db')
+    assert os.environ['RATE_LIMIT_STORE'] == str(tmp_path / 'state' / 'ratelimit.db')
+    assert (tmp_path / 'state').is_dir()
+
+
+def test_configured_stores_are_kept(env):
+    env.setenv('WEB_CONCURRENCY', '2')
+    env.setenv('DATA_VERSION_STORE', '/srv/version.db')
+    runpy.run_path(CONF)
+    assert os.environ['DATA_VERSION_STORE'] == '/srv/version.db'
+
+
+def test_a_single_worker_keeps_in_process_state(env):
+    env.setenv('WEB_CONCURRENCY', '1')
+    runpy.run_path(CONF)
+    assert 'DATA_VERSION_STORE' not in os.environ
+    assert 'RATE_LIMIT_STORE' not in os.environ
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import threading
+
+from local_sqlite import LocalSQLite
+
+
+def test_one_connection_per_thread(tmp_path):
+    connect = LocalSQLite(str(tmp_path / 'local.db'))
+    assert connect() is connect()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connect()))
+    thread.start()
+    thread.join()
+    assert other[0] is not connect()
+
+
+def test_forked_workers_open_their_own_connection(tmp_path, monkeypatch):
+    connect = LocalSQLite(str(tmp_path / 'local.db'))
+    parent = connect()
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert connect() is not parent
+
+
+def test_connections_are_autocommit_wal(tmp_path):
+    connect = LocalSQLite(str(tmp_path / 'local.db'), row_factory=sqlite3.Row)
+    conn = connect()
+    assert conn.isolation_level is None
+    assert conn.execute("PRAGMA journal_mode").fetchone()['journal_mode'] == 'wal'
@@ -0,0 +1,44 @@
+import main_exercice
+from models import Project
+
+
+class FakeProjects:
+    def __init__(self):
+        self.created = []
+
+    def create(self, name, description, model_type, hyperparameters):
+        project = Project(f"id-{name}", name, description, model_type, hyperparameters)
+        self.created.append(project)
+        return project
+
+    def list(self):
+        return list(reversed(self.created))  # Newest first, like the real listing
+
+
+class FakeDatasets:
+    def __init__(self):
+        self.created = []
+
+    def create(self, name, description, size_mb, format, ai_project_id, source_url=None):
+        self.created.append((name, ai_project_id))
+
+    def list(self):
+        return []
+
+
+def test_demo_links_each_dataset_to_its_own_project(monkeypatch, capsys):
+    datasets = FakeDatasets()
+    monkeypatch.setattr(main_exercice, 'projects_repo', FakeProjects())
+    monkeypatch.setattr(main_exercice, 'datasets_repo', datasets)
+    main_exercice.main()
+    assert datasets.created == [
+        ("Enron Email Dataset", "id-Spam Detection"),
+        ("ImageNet Faces", "id-Face Recognition"),
+        ("Historical Weather Data", "id-Weather Prediction"),
+    ]
+
+
+def test_create_ai_project_returns_the_project(monkeypatch, capsys):
+    monkeypatch.setattr(main_exercice, 'projects_repo', FakeProjects())
+    project = main_exercice.create_ai_project("P", "d", "NLP", {})
+    assert isinstance(project, Project) and project.id == "id-P"
@@ -0,0 +1,135 @@
+import pytest
+
+from mirror import LocalMirror
+from fakes import FakeClient
+
+
+def project(id, stamp, name=None, with_updated_at=True):
+    row = {'id': id, 'name': name or id, 'description': None, 'model_type': 'NLP',
+           'hyperparameters': None, 'created_at': stamp}
+    if with_updated_at:
+        row['updated_at'] = stamp
+    return row
+
+
+@pytest.fixture
+def upstream():
+    return FakeClient({
+        'ai_projects': [project('p1', '2024-01-01'), project('p2', '2024-01-02')],
+        'datasets': [],
+    })
+
+
+@pytest.fixture
+def mirror(tmp_path, upstream):
+    return LocalMirror(str(tmp_path / 'mirror.db'), upstream, max_staleness=60, sync_interval=0, page_size=2)
+
+
+def names(mirror):
+    return sorted(p['name'] for p in mirror.list_projects())
+
+
+def test_first_sync_copies_everything(mirror):
+    assert mirror.sync(force=True)
+    assert names(mirror) == ['p1', 'p2']
+    assert mirror.is_fresh()
+
+
+def test_incremental_sync_picks_up_edits_and_deletions(mirror, upstream):
+    mirror.sync(force=True)
+    upstream.tables['ai_projects'][0].update(name='renamed', updated_at='2024-02-01')
+    del upstream.tables['ai_projects'][1]
+    mirror.sync_table('ai_projects')  # Incremental: no full refresh
+    assert names(mirror) == ['renamed']
+
+
+def test_sweep_keeps_local_writes_newer_than_the_cursor(mirror, upstream):
+    mirror.sync(force=True)
+    # Confirmed by Supabase after the sweep read its ids
+    mirror.apply_upsert('ai_projects', project('p3', '2024-03-01'))
+    upstream.tables['ai_projects'][0].update(updated_at='2024-02-01')
+    mirror.sync_table('ai_projects')
+    assert 'p3' in names(mirror)
+
+
+def test_transient_errors_keep_the_updated_at_cursor(mirror, upstream):
+    def timeout_once(query):
+        upstream.fail = None  # The very next query succeeds
+        raise TimeoutError("read timed out")
+    upstream.fail = timeout_once
+    assert not mirror.sync(force=True)
+    assert 'timed out' in mirror.last_error
+    assert mirror._state('ai_projects')['cursor_column'] == 'updated_at'
+
+    assert mirror.sync(force=True)
+    assert mirror._state('ai_projects')['cursor_column'] == 'updated_at'
+
+
+def test_missing_updated_at_switches_to_full_syncs(tmp_path):
+    upstream = FakeClient({
+        'ai_projects': [project('p1', '2024-01-01', with_updated_at=False)],
+        'datasets': [],
+    })
+    mirror = LocalMirror(str(tmp_path / 'mirror.db'), upstream, sync_interval=0)
+    assert mirror.sync(force=True)
+    assert mirror._state('ai_projects')['cursor_column'] == 'created_at'
+
+    # Edits cannot be tracked by created_at, so every sync re-reads the table
+    upstream.tables['ai_projects'][0]['name'] = 'renamed'
+    mirror.sync(force=True)
+    assert names(mirror) == ['renamed']
+
+
+def test_adding_updated_at_later_makes_syncs_incremental(tmp_path):
+    upstream = FakeClient({
+        'ai_projects': [project('p1', '2024-01-01', with_updated_at=False)],
+        'datasets': [],
+    })
+    mirror = LocalMirror(str(tmp_path / 'mirror.db'), upstream, sync_interval=0)
+    mirror.sync(force=True)
+    assert mirror._state('ai_projects')['cursor_column'] == 'created_at'
+
+    # The updated_at migration runs: the next (full) sync picks the column up again
+    upstream.tables['ai_projects'][0]['updated_at'] = '2024-01-01'
+    mirror.sync(force=True)
+    assert mirror._state('ai_projects')['cursor_column'] == 'updated_at'
+
+    upstream.queries.clear()
+    mirror.sync_table('ai_projects')
+    pulls = [q for q in upstream.queries if q.columns == '*']
+    assert [q.orders[0][0] for q in pulls] == ['updated_at']
+    assert all(q.filters for q in pulls)  # Only rows changed since the cursor
+
+
+def test_staleness_reflects_failed_syncs(mirror, upstream, monkeypatch):
+    mirror.sync(force=True)
+    import mirror as mirror_module
+    now = mirror_module.time.time()
+    monkeypatch.setattr(mirror_module.time, 'time', lambda: now + 120)
+    def down(query):
+        raise ConnectionError("unreachable")
+    upstream.fail = down
+    assert not mirror.sync(force=True)
+    assert mirror.staleness() >= 120
+    assert not mirror.stats()['fresh']
+
+
+def test_deletes_cascade_locally(mirror, upstream):
+    upstream.tables['datasets'].append({
+        'id': 'd1', 'name': 'd', 'description': None, 'size_mb': 1, 'format': 'CSV', 'source_url': None,
+        'ai_project_id': 'p1', 'created_at': '2024-01-03', 'updated_at': '2024-01-03'})
+    mirror.sync(force=True)
+    mirror.apply_delete('ai_projects', 'p1')
+    assert mirror.project_datasets('p1') == []
+
+
+def test_app_refuses_the_mirror_under_per_user_rls(tmp_path):
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, RLS_MODE='per_user', MIRROR_PATH=str(tmp_path / 'mirror.db'))
+    env.pop('SINGLEFLIGHT_SCOPE', None)
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=root, env=env, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert 'MIRROR_PATH cannot be used with RLS_MODE=per_user' in result.stderr
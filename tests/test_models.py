@@ -0,0 +1,73 @@
+import json
+
+from models import Dataset, Project, datasets_from_rows, decode_datasets, decode_projects, projects_from_rows
+
+
+def dataset_row(id, project_id='p1', size_mb=10, format='CSV'):
+    return {
+        'id': id, 'name': f"dataset {id}", 'description': None, 'size_mb': size_mb, 'format': format,
+        'source_url': None, 'ai_project_id': project_id, 'created_at': '2024-01-01',
+        'ai_projects': {'id': project_id, 'name': f"project {project_id}", 'model_type': 'NLP'},
+    }
+
+
+def test_project_round_trips_its_row():
+    row = {'id': 'p1', 'name': 'Vision', 'description': 'cats', 'model_type': 'Computer Vision',
+           'hyperparameters': {'epochs': 3}, 'created_at': '2024-01-01'}
+    assert Project.from_row(row).to_dict() == row
+
+
+def test_embedded_project_is_shared_between_rows():
+    datasets = datasets_from_rows([dataset_row('d1'), dataset_row('d2'), dataset_row('d3', project_id='p2')])
+    assert datasets[0].project is datasets[1].project
+    assert datasets[2].project is not datasets[0].project
+    assert datasets[0].project.name == 'project p1'
+
+
+def test_from_row_shares_projects_through_the_cache():
+    projects = {}
+    first = Dataset.from_row(dataset_row('d1'), projects)
+    second = Dataset.from_row(dataset_row('d2'), projects)
+    assert first.project is second.project
+    assert list(projects) == ['p1']
+
+
+def test_repeated_strings_are_interned():
+    # Built at runtime, so only interning can make them the same object
+    first, second = datasets_from_rows([dataset_row('d1', format=''.join(['CS', 'V'])),
+                                        dataset_row('d2', format=''.join(['C', 'SV']))])
+    assert first.format is second.format
+    assert first.ai_project_id is second.ai_project_id
+
+
+def test_missing_size_becomes_zero():
+    assert datasets_from_rows([dataset_row('d1', size_mb=None)])[0].size_mb == 0
+    assert Dataset.from_row(dataset_row('d1', size_mb=None)).size_mb == 0
+
+
+def test_dataset_to_dict_keeps_the_embedded_shape():
+    row = dataset_row('d1')
+    assert datasets_from_rows([row])[0].to_dict() == row
+    assert Dataset.from_row(row).to_dict()['ai_projects'] == {'id': 'p1', 'name': 'project p1', 'model_type': 'NLP'}
+
+
+def test_rows_without_embedded_project():
+    row = dict(dataset_row('d1'), ai_projects=None)
+    dataset = datasets_from_rows([row])[0]
+    assert dataset.project is None
+    assert dataset.ai_project_id == 'p1'
+    assert dataset.to_dict()['ai_projects'] is None
+
+
+def test_project_id_falls_back_to_the_embedded_project():
+    row = dataset_row('d1')
+    del row['ai_project_id']
+    assert datasets_from_rows([row])[0].ai_project_id == 'p1'
+
+
+def test_decode_from_response_bytes():
+    raw = json.dumps([dataset_row('d1'), dataset_row('d2')]).encode()
+    assert [d.id for d in decode_datasets(raw)] == ['d1', 'd2']
+    projects = decode_projects(json.dumps([{'id': 'p1', 'name': 'Vision'}]).encode())
+    assert projects[0].to_dict()['description'] is None
+    assert projects_from_rows(None) == []
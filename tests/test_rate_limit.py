@@ -0,0 +1,99 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, MemoryBucketStore, SQLiteBucketStore, parse_costs, retry_after_header
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'time', clock)
+    return clock
+
+
+@pytest.mark.parametrize('refill_rate', [0, -1])
+def test_refill_rate_must_be_positive(refill_rate):
+    with pytest.raises(ValueError, match="refill rate"):
+        RateLimiter(capacity=10, refill_rate=refill_rate)
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        RateLimiter(capacity=0)
+
+
+def test_costs_must_fit_the_capacity():
+    with pytest.raises(ValueError, match="api_get_stats"):
+        RateLimiter(capacity=4, costs={'api_get_stats': 5})
+    RateLimiter(capacity=5, costs={'api_get_stats': 5})
+
+
+def test_bucket_spends_and_refills(clock):
+    limiter = RateLimiter(capacity=3, refill_rate=1.0)
+    assert [limiter.consume('k')[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = limiter.consume('k', cost=2)
+    assert not allowed and retry_after == pytest.approx(2.0)
+    clock.now += 2
+    assert limiter.consume('k', cost=2) == (True, 0.0)
+
+
+def test_keys_are_independent(clock):
+    limiter = RateLimiter(capacity=1, refill_rate=1.0)
+    assert limiter.consume('a')[0]
+    assert limiter.consume('b')[0]
+    assert not limiter.consume('a')[0]
+
+
+def test_memory_store_forgets_oldest_half():
+    store = MemoryBucketStore(max_keys=4)
+    for i in range(5):
+        store.update(f"k{i}", lambda state, i=i: ((0.0, float(i)), None))
+    assert len(store._buckets) <= 4
+    assert 'k4' in store._buckets
+
+
+def test_sqlite_store_is_shared(tmp_path, clock):
+    path = str(tmp_path / 'buckets.db')
+    first = RateLimiter(capacity=2, refill_rate=1.0, store=SQLiteBucketStore(path))
+    second = RateLimiter(capacity=2, refill_rate=1.0, store=SQLiteBucketStore(path))
+    assert first.consume('k')[0]
+    assert second.consume('k')[0]
+    assert not first.consume('k')[0]
+
+
+def test_parse_costs_and_retry_after():
+    assert parse_costs("index=5, api_get_stats=3,bogus") == {'index': 5, 'api_get_stats': 3}
+    assert parse_costs(None) == {}
+    assert retry_after_header(0.2) == '1'
+    assert retry_after_header(2.1) == '3'
+
+
+@pytest.fixture
+def limited_app(monkeypatch):
+    import app as web
+    monkeypatch.setattr(web, 'rate_limiter', RateLimiter(capacity=1, refill_rate=0.01))
+    return web.app.test_client()
+
+
+def test_html_routes_get_an_html_429(limited_app):
+    assert limited_app.get('/login').status_code == 200
+    response = limited_app.get('/login')
+    assert response.status_code == 429
+    assert response.mimetype == 'text/html'
+    assert 'Too many requests' in response.get_data(as_text=True)
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_api_routes_get_a_json_429(limited_app):
+    limited_app.get('/api/config')
+    response = limited_app.get('/api/config')
+    assert response.status_code == 429
+    assert response.get_json()['success'] is False
@@ -0,0 +1,208 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from catalog_index import fingerprint
+from fakes import FakePostgrest
+from repository import DatasetRepository, DuplicateContentError, ProjectRepository, TTLCache
+from repository.base import chunked, response_count, send
+from resilience import TransientAPIError
+
+
+def project(id, name=None):
+    return {'id': id, 'name': name or id, 'description': None, 'model_type': 'NLP',
+            'hyperparameters': None, 'created_at': f"2024-01-0{id[-1]}"}
+
+
+def dataset(id, project_id, created_at='2024-02-01', source_url=None, size_mb=10):
+    return {'id': id, 'name': id, 'description': None, 'size_mb': size_mb, 'format': 'CSV',
+            'source_url': source_url, 'ai_project_id': project_id, 'created_at': created_at}
+
+
+@pytest.fixture
+def upstream():
+    return FakePostgrest({
+        'ai_projects': [project('p1'), project('p2'), project('p3')],
+        'datasets': [dataset(f"d{i}", 'p1', created_at=f"2024-02-{i:02d}") for i in range(1, 6)],
+        'dataset_projects': [],
+    })
+
+
+def queries(upstream, table):
+    return [r for r in upstream.requests if r.url.path == f"/{table}"]
+
+
+def test_send_returns_the_response_and_raises_api_errors(upstream):
+    assert send(upstream.table('ai_projects').select('id')).status_code == 200
+    upstream.fail = lambda request: httpx.Response(400, json={'code': '22P02', 'message': 'bad uuid'})
+    with pytest.raises(APIError) as raised:
+        send(upstream.table('ai_projects').select('id'))
+    assert raised.value.code == '22P02'
+    assert not isinstance(raised.value, TransientAPIError)
+    upstream.fail = lambda request: httpx.Response(502, text='Bad gateway')
+    with pytest.raises(TransientAPIError) as raised:
+        send(upstream.table('ai_projects').select('id'))
+    assert raised.value.code == '502'  # Non-JSON bodies keep the status as the code
+
+
+@pytest.mark.parametrize('header, expected', [('0-24/311', 311), ('*/311', 311), ('*/*', 0), ('', 0)])
+def test_response_count(header, expected):
+    assert response_count(httpx.Response(200, headers={'content-range': header})) == expected
+
+
+def test_chunked():
+    assert chunked([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
+
+def test_count_uses_a_head_request(upstream):
+    assert DatasetRepository(upstream).count() == 5
+    assert queries(upstream, 'datasets')[-1].method == 'HEAD'
+
+
+def test_iter_rows_pages_by_keyset(upstream):
+    pages = list(DatasetRepository(upstream).iter_rows('id', page_size=2))
+    assert [[row['id'] for row in page] for page in pages] == [['d1', 'd2'], ['d3', 'd4'], ['d5']]
+    filters = [r.url.params.get('id') for r in queries(upstream, 'datasets')]
+    assert filters == [None, 'gt.d2', 'gt.d4']
+    assert all('offset' not in r.url.params for r in queries(upstream, 'datasets'))
+
+
+def test_iter_rows_stops_after_a_full_last_page(upstream):
+    pages = list(DatasetRepository(upstream).iter_rows('id', page_size=5))
+    assert len(pages) == 1
+    assert len(queries(upstream, 'datasets')) == 2  # The second request finds nothing left
+
+
+def test_list_embeds_projects_newest_first(upstream):
+    datasets = DatasetRepository(upstream).list()
+    assert [d.id for d in datasets] == ['d5', 'd4', 'd3', 'd2', 'd1']
+    assert datasets[0].project is datasets[1].project
+    assert datasets[0].to_dict()['ai_projects'] == {'id': 'p1', 'name': 'p1', 'model_type': 'NLP'}
+
+
+def test_reads_are_cached_and_writes_clear_the_cache(upstream):
+    repo = ProjectRepository(upstream, cache=TTLCache(ttl=60))
+    repo.get('p1')
+    repo.get('p1')
+    assert len(queries(upstream, 'ai_projects')) == 1
+    repo.update('p1', {'name': 'renamed'})
+    assert repo.get('p1').name == 'renamed'
+
+
+def test_write_hooks_see_confirmed_writes(upstream):
+    repo = ProjectRepository(upstream)
+    seen = []
+    repo.write_hooks.append(lambda table, op, payload: seen.append((table, op)))
+    created = repo.create('new', None, 'NLP', {'epochs': 1})
+    assert repo.delete(created.id)
+    assert not repo.delete(created.id)
+    assert seen == [('ai_projects', 'upsert'), ('ai_projects', 'delete')]
+
+
+def test_batched_writes(upstream):
+    repo = DatasetRepository(upstream, batch_size=2)
+    rows = [{k: v for k, v in dataset(f"n{i}", 'p2').items() if k != 'id'} for i in range(3)]
+    created = repo.create_many(rows)
+    assert len(created) == 3
+    assert len([r for r in queries(upstream, 'datasets') if r.method == 'POST']) == 2
+    assert repo.delete_many([d.id for d in created]) == 3
+    assert repo.delete_all() == 5
+
+
+@pytest.fixture
+def linked(upstream):
+    """d1 belongs to p1 and is linked to p2; d9 belongs to p2"""
+    upstream.tables['datasets'].append(dataset('d9', 'p2', created_at='2024-03-01'))
+    upstream.tables['dataset_projects'].extend([
+        {'dataset_id': 'd1', 'ai_project_id': 'p2'},
+        {'dataset_id': 'd1', 'ai_project_id': 'p3'},
+        {'dataset_id': 'd2', 'ai_project_id': 'p3'},
+    ])
+    return upstream
+
+
+def test_by_project_includes_linked_datasets(linked):
+    repo = DatasetRepository(linked, dedupe=True, batch_size=1)
+    assert [d.id for d in repo.by_project('p2')] == ['d9', 'd1']
+    assert [d.id for d in repo.by_project('p3')] == ['d2', 'd1']
+    assert [d.id for d in DatasetRepository(linked).by_project('p2')] == ['d9']  # Links need dedupe
+
+
+def test_linked_ids_pages_through_every_link(linked):
+    repo = DatasetRepository(linked, dedupe=True, page_size=2)
+    assert sorted(repo.linked_ids()) == ['d1', 'd1', 'd2']
+    assert [r.url.params['offset'] for r in queries(linked, 'dataset_projects')] == ['0', '2']
+    assert DatasetRepository(linked).linked_ids() == []
+
+
+def test_links_of(linked):
+    assert sorted(DatasetRepository(linked, batch_size=1).links_of(['d1', 'd2'])) == [
+        ('d1', 'p2'), ('d1', 'p3'), ('d2', 'p3')]
+
+
+def test_link_projects_keeps_existing_links(linked):
+    repo = DatasetRepository(linked, dedupe=True)
+    repo.link_projects([('d1', 'p2'), ('d5', 'p2')])
+    assert sorted(repo.linked_ids()) == ['d1', 'd1', 'd2', 'd5']
+
+
+URL = 'https://example.com/data.csv'
+
+
+def test_create_or_link_links_catalogued_content(upstream):
+    repo = DatasetRepository(upstream, dedupe=True)
+    first, created = repo.create_or_link('data', None, 10, 'CSV', 'p1', URL)
+    assert created
+    assert first.id is not None
+    again, created = repo.create_or_link('copy', None, 10, 'csv', 'p2', URL + '?utm_source=x')
+    assert not created
+    assert again.id == first.id
+    assert upstream.tables['dataset_projects'] == [{'dataset_id': first.id, 'ai_project_id': 'p2'}]
+
+
+def test_create_or_link_recovers_from_a_concurrent_registration(upstream):
+    repo = DatasetRepository(upstream, dedupe=True)
+    lookups = []
+    find = repo.find_by_fingerprint
+
+    def racing_find(fp):
+        lookups.append(fp)
+        if len(lookups) == 1:
+            # Another request registers the same content between our lookup and our insert
+            upstream.tables['datasets'].append(dict(dataset('winner', 'p3', source_url=URL), fingerprint=fp))
+            return None
+        return find(fp)
+    repo.find_by_fingerprint = racing_find
+
+    linked, created = repo.create_or_link('data', None, 10, 'CSV', 'p1', URL)
+    assert not created
+    assert linked.id == 'winner'
+    assert lookups == [fingerprint(URL, 10, 'CSV')] * 2
+    assert upstream.tables['dataset_projects'] == [{'dataset_id': 'winner', 'ai_project_id': 'p1'}]
+
+
+def test_create_or_link_reraises_other_errors(upstream):
+    repo = DatasetRepository(upstream, dedupe=True)
+    upstream.fail = lambda request: (httpx.Response(400, json={'code': '23502', 'message': 'null value'})
+                                     if request.method == 'POST' else None)
+    with pytest.raises(APIError):
+        repo.create_or_link('data', None, 10, 'CSV', 'p1', URL)
+
+
+def test_update_many_goes_through_the_function(upstream):
+    def apply_dataset_updates(server, updates):
+        rows = {row['id']: row for row in server.tables['datasets']}
+        return [dict(rows[u['id']], **u) for u in updates if u['id'] in rows]
+    upstream.rpcs['apply_dataset_updates'] = apply_dataset_updates
+    updated = DatasetRepository(upstream).update_many([{'id': 'd1', 'size_mb': 7}, {'id': 'nope', 'size_mb': 1}])
+    assert [row['id'] for row in updated] == ['d1']
+
+
+def test_update_into_catalogued_content_reports_the_existing_dataset(upstream):
+    repo = DatasetRepository(upstream, dedupe=True)
+    original, _ = repo.create_or_link('data', None, 10, 'CSV', 'p1', URL)
+    other, _ = repo.create_or_link('other', None, 20, 'CSV', 'p1', URL)
+    with pytest.raises(DuplicateContentError) as raised:
+        repo.update(other.id, {'size_mb': 10})
+    assert raised.value.existing.id == original.id
+    assert repo.update(other.id, {'name': 'renamed'}).name == 'renamed'
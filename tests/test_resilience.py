@@ -0,0 +1,172 @@
+import os
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+from repository.base import send
+from resilience import (
+    CircuitBreaker, CircuitOpenError, ResiliencePolicy, TransientAPIError, backoff_delay, is_transient
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubQuery:
+    """The attributes of a postgrest request builder that send() uses"""
+
+    http_method = 'GET'
+    path = '/datasets'
+    json = None
+    params = {}
+    headers = {}
+
+    def __init__(self, status):
+        self.status = status
+
+    @property
+    def session(self):
+        return self
+
+    def request(self, method, path, **kwargs):
+        return httpx.Response(self.status, json={'message': 'error', 'code': str(self.status)})
+
+
+def test_startup_imports_neither_httpx_nor_postgrest():
+    code = "import sys, app; print(sorted({m.split('.')[0] for m in sys.modules} & {'httpx', 'postgrest'}))"
+    env = {k: v for k, v in os.environ.items() if k not in ('SUPABASE_URL', 'SUPABASE_KEY')}
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_transient_errors_are_recognized_by_class():
+    from postgrest.exceptions import APIError
+    assert issubclass(TransientAPIError, APIError)
+    assert is_transient(TransientAPIError({'message': 'unavailable', 'code': '503'}))
+    assert is_transient(httpx.ConnectTimeout("timed out"))
+    assert is_transient(httpx.ReadError("reset"))
+    assert not is_transient(APIError({'message': 'bad request', 'code': '400'}))
+    assert not is_transient(ValueError("nope"))
+
+
+@pytest.mark.parametrize('status, transient', [(503, True), (429, True), (400, False), (404, False)])
+def test_send_raises_api_errors(status, transient):
+    from postgrest.exceptions import APIError
+    with pytest.raises(APIError) as raised:
+        send(StubQuery(status))
+    assert is_transient(raised.value) is transient
+    assert raised.value.code == str(status)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('resilience.time.monotonic', clock)
+    return clock
+
+
+def transient():
+    return TransientAPIError({'message': 'unavailable', 'code': '503'})
+
+
+def failing(errors, result='ok'):
+    """fn() raising each of errors in turn, then returning result"""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()  # One trial call...
+    assert not breaker.allow()  # ...at a time
+    assert breaker.state == 'half_open'
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.stats()['times_opened'] == 1
+    assert breaker.stats()['rejected_calls'] == 2
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+
+def test_backoff_is_capped_full_jitter():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.1, 2.0) <= min(2.0, 0.1 * 2 ** attempt)
+
+
+def test_idempotent_calls_are_retried_on_transient_errors():
+    sleeps = []
+    policy = ResiliencePolicy(retries=2, sleep=sleeps.append)
+    fn = failing([transient(), transient()])
+    assert policy.call(fn) == 'ok'
+    assert len(fn.calls) == 3
+    assert len(sleeps) == 2
+    assert policy.stats()['retried_calls'] == 2
+
+
+def test_writes_and_client_errors_are_not_retried():
+    policy = ResiliencePolicy(retries=2, sleep=lambda s: None)
+    write = failing([transient()])
+    with pytest.raises(TransientAPIError):
+        policy.call(write, idempotent=False)
+    assert len(write.calls) == 1
+
+    bad = failing([ValueError("bad request")])
+    with pytest.raises(ValueError):
+        policy.call(bad)
+    assert len(bad.calls) == 1
+    assert policy.breaker.failures == 0  # The upstream answered
+
+
+def test_open_breaker_serves_the_last_good_result(clock):
+    policy = ResiliencePolicy(retries=0, breaker=CircuitBreaker(failure_threshold=1), sleep=lambda s: None)
+    assert policy.call(lambda: ['rows'], key='projects') == ['rows']
+    assert policy.call(failing([transient()]), key='projects') == ['rows']
+    assert policy.breaker.state == 'open'
+
+    upstream = failing([])
+    assert policy.call(upstream, key='projects') == ['rows']
+    assert upstream.calls == []  # Rejected without calling upstream
+    with pytest.raises(CircuitOpenError):
+        policy.call(upstream, key='datasets')
+    assert policy.stats()['stale_served'] == 2
+
+
+def test_forget_drops_remembered_results(clock):
+    policy = ResiliencePolicy(retries=0, breaker=CircuitBreaker(failure_threshold=1), sleep=lambda s: None)
+    policy.call(lambda: ['rows'], key='projects')
+    policy.forget()
+    with pytest.raises(TransientAPIError):
+        policy.call(failing([transient()]), key='projects')
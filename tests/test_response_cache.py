@@ -0,0 +1,122 @@
+import pytest
+from flask import Flask, flash, session
+
+from response_cache import ResponseCache, DataVersion, SQLiteDataVersion
+
+
+@pytest.fixture
+def setup():
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    version = DataVersion()
+    cache = ResponseCache(version, ttl=60)
+    cache.init_app(app)
+    renders = []
+
+    @app.route('/login/<user_id>')
+    def login(user_id):
+        session['user'] = {'id': user_id}
+        return 'ok'
+
+    @app.route('/page')
+    @cache.cached
+    def page():
+        renders.append(session['user']['id'])
+        return f"page for {session['user']['id']} #{len(renders)}"
+
+    @app.route('/flashing')
+    @cache.cached
+    def flashing():
+        renders.append('flash')
+        flash('saved')
+        return 'flashed'
+
+    client = app.test_client()
+    client.get('/login/alice')
+    return app, cache, version, renders, client
+
+
+def test_repeat_request_is_served_from_cache_with_an_etag(setup):
+    _, cache, _, renders, client = setup
+    first = client.get('/page')
+    second = client.get('/page')
+    assert first.status_code == second.status_code == 200
+    assert second.data == first.data
+    assert first.headers['ETag'] and second.headers['ETag'] == first.headers['ETag']
+    assert 'private' in first.headers['Cache-Control']
+    assert renders == ['alice']
+    assert cache.stats()['hits'] == 1
+
+
+def test_matching_etag_gets_a_304(setup):
+    _, cache, _, renders, client = setup
+    etag = client.get('/page').headers['ETag']
+    revalidated = client.get('/page', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert cache.stats()['not_modified'] == 1
+    assert renders == ['alice']
+
+
+def test_version_bump_invalidates_pages_and_etags(setup):
+    _, _, version, renders, client = setup
+    etag = client.get('/page').headers['ETag']
+    version.bump()
+    response = client.get('/page', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(renders) == 2
+
+
+def test_pages_are_cached_per_user(setup):
+    app, _, _, renders, client = setup
+    client.get('/page')
+    other = app.test_client()
+    other.get('/login/bob')
+    assert other.get('/page').data.startswith(b'page for bob')
+    assert renders == ['alice', 'bob']
+
+
+def test_pages_that_flash_are_not_cached(setup):
+    _, _, _, renders, client = setup
+    client.get('/flashing')
+    client.get('/flashing')
+    assert renders == ['flash', 'flash']
+
+
+def test_disabled_cache_always_renders():
+    app = Flask(__name__)
+    cache = ResponseCache(ttl=0)
+    calls = []
+
+    @app.route('/')
+    @cache.cached
+    def index():
+        calls.append(1)
+        return 'x'
+
+    client = app.test_client()
+    client.get('/')
+    client.get('/')
+    assert len(calls) == 2
+
+
+def test_sqlite_version_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'version.db')
+    one, other = SQLiteDataVersion(path), SQLiteDataVersion(path)
+    before = other.current()[0]
+    one.bump()
+    assert other.current()[0] == before + 1
+
+
+def test_caches_are_disabled_for_several_workers_without_a_shared_version():
+    import os
+    import subprocess
+    import sys
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, WEB_CONCURRENCY='3', RESPONSE_CACHE_TTL='300', FRAGMENT_CACHE_TTL='30')
+    env.pop('DATA_VERSION_STORE', None)
+    code = 'import app; print(app.response_cache.enabled, type(app.fragment_cache).__name__)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith('False NullCache')
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def run_concurrently(flights, key, fn, callers):
+    results = [None] * callers
+    errors = [None] * callers
+
+    def call(i):
+        try:
+            results[i] = flights.do(key, fn)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    upstream = []
+
+    def fn():
+        upstream.append(1)
+        release.wait(2)
+        return ['row']
+
+    threads, results, errors = run_concurrently(flights, 'stats', fn, 8)
+    wait_for(lambda: flights.stats()['requests'] == 8)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(upstream) == 1
+    assert all(result is results[0] for result in results)
+    stats = flights.stats()
+    assert stats['upstream_calls'] == 1
+    assert stats['upstream_calls_saved'] == 7
+    assert stats['in_flight'] == 0
+
+
+def test_errors_reach_every_waiting_caller():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(2)
+        raise RuntimeError("upstream down")
+
+    threads, results, errors = run_concurrently(flights, 'k', fn, 4)
+    wait_for(lambda: flights.stats()['requests'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_sequential_calls_are_not_coalesced():
+    flights = SingleFlight()
+    assert flights.do('k', lambda: 1) == 1
+    assert flights.do('k', lambda: 2) == 2
+    assert flights.stats()['upstream_calls_saved'] == 0
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    assert [flights.do(k, lambda k=k: k) for k in ('a', 'b')] == ['a', 'b']
+    assert flights.stats()['upstream_calls'] == 2
+
+
+@pytest.fixture
+def web():
+    import app as web
+    return web
+
+
+def test_reads_are_shared_across_users_by_default(web, monkeypatch):
+    monkeypatch.setattr(web, 'singleflight_scope', 'global')
+    with web.app.test_request_context():
+        web.session['user'] = {'id': 'alice'}
+        alice = web.request_scope()
+    with web.app.test_request_context():
+        web.session['user'] = {'id': 'bob'}
+        assert web.request_scope() == alice
+
+
+def test_per_user_scope(web, monkeypatch):
+    monkeypatch.setattr(web, 'singleflight_scope', 'user')
+    with web.app.test_request_context():
+        web.session['user'] = {'id': 'alice'}
+        assert web.request_scope() == 'alice'
@@ -0,0 +1,53 @@
+from flask import Flask
+
+from repository import TTLCache
+from response_cache import DataVersion
+from templating import init_templates
+
+
+def make_app(tmp_path):
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    (templates / 'page.html').write_text("{% cache 'nav', user %}{{ user }}:{{ counter() }}{% endcache %}")
+    return Flask(__name__, template_folder=str(templates))
+
+
+def test_bytecode_cache_directory_is_created(tmp_path):
+    app = make_app(tmp_path)
+    cache_dir = tmp_path / 'missing' / 'jinja'
+    assert init_templates(app, bytecode_cache_dir=str(cache_dir)) == 1
+    assert cache_dir.is_dir()
+    assert list(cache_dir.iterdir())  # Compiled bytecode was written
+
+
+def test_fragments_are_cached_per_key(tmp_path):
+    app = make_app(tmp_path)
+    init_templates(app, fragment_cache=TTLCache(ttl=60))
+    calls = []
+
+    def counter():
+        calls.append(1)
+        return len(calls)
+
+    with app.test_request_context():
+        template = app.jinja_env.get_template('page.html')
+        assert template.render(user='a', counter=counter) == 'a:1'
+        assert template.render(user='a', counter=counter) == 'a:1'
+        assert template.render(user='b', counter=counter) == 'b:2'
+
+
+def test_fragments_follow_the_data_version(tmp_path):
+    app = make_app(tmp_path)
+    version = DataVersion()
+    init_templates(app, fragment_cache=TTLCache(ttl=60), version=version)
+    calls = []
+
+    def counter():
+        calls.append(1)
+        return len(calls)
+
+    with app.test_request_context():
+        template = app.jinja_env.get_template('page.html')
+        assert template.render(user='a', counter=counter) == 'a:1'
+        version.bump()  # e.g. a write handled by another worker, sharing the version
+        assert template.render(user='a', counter=counter) == 'a:2'
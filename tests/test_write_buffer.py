@@ -0,0 +1,140 @@
+import json
+import os
+
+import pytest
+
+from resilience import TransientAPIError
+from write_buffer import WriteBehindBuffer
+
+
+class FakeDatasets:
+    """update_many/update_row of DatasetRepository, recording which client wrote what"""
+
+    def __init__(self, missing=(), batch_error=None):
+        self.missing = set(missing)
+        self.batch_error = batch_error
+        self.batches = []
+        self.rows = []
+
+    def update_many(self, updates, client=None):
+        self.batches.append((client, updates))
+        if self.batch_error is not None:
+            raise self.batch_error
+        return [update for update in updates if update['id'] not in self.missing]
+
+    def update_row(self, row_id, changes, client=None):
+        self.rows.append((client, row_id, changes))
+        return None if row_id in self.missing else dict(changes, id=row_id)
+
+
+def crash(buffer):
+    """Drop a buffer without flushing, as a killed worker would (its lock goes with it)"""
+    buffer._journal.close()
+    buffer._journal = None
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_updates_to_one_row_are_coalesced():
+    repo = FakeDatasets()
+    buffer = WriteBehindBuffer(repo)
+    buffer.submit('d1', {'size_mb': 1}, client='alice')
+    buffer.submit('d1', {'size_mb': 2}, client='alice')
+    buffer.submit('d2', {'size_mb': 3}, client='alice')
+
+    assert buffer.flush() == {'flushed': 2, 'failed': 0}
+    assert repo.batches == [('alice', [{'size_mb': 2, 'id': 'd1'}, {'size_mb': 3, 'id': 'd2'}])]
+    assert buffer.stats()['coalesced_updates'] == 1
+
+
+def test_each_client_gets_its_own_batch():
+    repo = FakeDatasets()
+    buffer = WriteBehindBuffer(repo)
+    buffer.submit('d1', {'size_mb': 1}, client='alice')
+    buffer.submit('d2', {'size_mb': 2}, client='bob')
+    buffer.flush()
+    assert sorted(client for client, _ in repo.batches) == ['alice', 'bob']
+
+
+def test_rejected_batch_falls_back_to_one_update_per_row():
+    repo = FakeDatasets(missing={'gone'}, batch_error=ValueError("batch rejected"))
+    buffer = WriteBehindBuffer(repo)
+    buffer.submit('d1', {'size_mb': 1}, client='alice')
+    buffer.submit('gone', {'size_mb': 2}, client='alice')
+
+    assert buffer.flush() == {'flushed': 1, 'failed': 1}
+    assert [row_id for _, row_id, _ in repo.rows] == ['d1', 'gone']
+    assert buffer.failures[0]['id'] == 'gone'
+
+
+def test_transient_errors_requeue_until_max_attempts():
+    repo = FakeDatasets(batch_error=TransientAPIError({'message': 'unavailable', 'code': '503'}))
+    buffer = WriteBehindBuffer(repo, max_attempts=2)
+    buffer.submit('d1', {'size_mb': 1}, client='alice')
+
+    assert buffer.flush() == {'flushed': 0, 'failed': 0}
+    assert buffer.pending('d1') == {'size_mb': 1}
+    buffer.submit('d1', {'size_mb': 5}, client='alice')
+    assert buffer.flush() == {'flushed': 0, 'failed': 1}
+    assert buffer.pending('d1') is None
+    assert buffer.failures[0]['changes'] == {'size_mb': 5}
+
+
+def test_journal_is_replayed_with_the_replay_client(tmp_path):
+    path = str(tmp_path / 'journal')
+    first = WriteBehindBuffer(FakeDatasets(), journal_path=path, client='service')
+    first.submit('d1', {'size_mb': 1}, client='alice', user='u1')
+    first.submit('d1', {'size_mb': 2}, client='alice', user='u1')
+    crash(first)
+
+    repo = FakeDatasets()
+    second = WriteBehindBuffer(repo, journal_path=path, client='service')
+    second.open_journal()
+    assert second.pending('d1') == {'size_mb': 2}
+    assert second._pending['d1'].user == 'u1'
+
+    second.flush()
+    assert repo.batches == [('service', [{'size_mb': 2, 'id': 'd1'}])]
+    assert read_lines(path) == []
+    second.close()
+
+
+def test_unwritable_rows_are_logged_durably(tmp_path):
+    path = str(tmp_path / 'journal')
+    buffer = WriteBehindBuffer(FakeDatasets(missing={'gone'}), journal_path=path, client='service')
+    buffer.submit('gone', {'size_mb': 1}, client='alice', user='u1')
+    buffer.flush()
+    buffer.close()
+
+    [failure] = read_lines(f"{path}.failed")
+    assert failure['id'] == 'gone'
+    assert failure['user'] == 'u1'
+    assert failure['changes'] == {'size_mb': 1}
+    assert buffer.stats()['failure_log'] == f"{path}.failed"
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="journal slots need flock")
+def test_orphaned_higher_slots_are_merged(tmp_path):
+    path = str(tmp_path / 'journal')
+    holder = WriteBehindBuffer(FakeDatasets(), journal_path=path, client='service')
+    holder.open_journal()
+    workers = [WriteBehindBuffer(FakeDatasets(), journal_path=path, client='service') for _ in range(2)]
+    for i, worker in enumerate(workers, start=1):
+        worker.submit(f"d{i}", {'size_mb': i}, client='alice')
+    assert [w.stats()['journal'] for w in workers] == [f"{path}.1", f"{path}.2"]
+    for worker in workers:
+        crash(worker)
+
+    survivor = WriteBehindBuffer(FakeDatasets(), journal_path=path, client='service')
+    survivor.open_journal()
+    assert survivor.stats()['journal'] == f"{path}.1"
+    assert survivor.pending('d1') == {'size_mb': 1}
+    assert survivor.pending('d2') == {'size_mb': 2}
+    assert not os.path.exists(f"{path}.2")
+    # The merged updates are durable in the survivor's own slot
+    assert sorted(entry['id'] for entry in read_lines(f"{path}.1")) == ['d1', 'd2']
+    survivor.close()
+    holder.close()
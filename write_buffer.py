@@ -0,0 +1,378 @@
+# write_buffer.py
+"""
+Write-behind buffer for high-frequency dataset updates.
+Updates to the same row within a flush window are merged, then sent as one
+batched call per flush. Accepted updates are journaled (fsync'd JSON lines)
+before they are acknowledged, so a crash loses nothing that was accepted:
+journaled updates are replayed on restart, and rows that still cannot be
+written are appended to a failure log next to the journal.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process owns the journal
+    fcntl = None
+
+from config import ANSI
+from resilience import CircuitOpenError, is_transient
+
+
+class _Pending:
+    """Merged changes for one row, the client allowed to write them and who submitted them"""
+
+    __slots__ = ('changes', 'client', 'user', 'attempts', 'since')
+
+    def __init__(self, changes, client, user=None):
+        self.changes = dict(changes)
+        self.client = client
+        self.user = user
+        self.attempts = 0
+        self.since = time.time()
+
+
+_RETRY = object()
+
+
+class WriteBehindBuffer:
+    """
+    Coalesce row updates and flush them in batches through repository.update_many.
+
+    window        seconds between background flushes
+    max_pending   flush immediately once this many rows are waiting
+    journal_path  append-only journal replayed on startup (no durability when unset);
+                  each process claims its own slot (journal_path, journal_path.1, ...)
+                  and merges the slots above it that no live process holds
+    client        client for replayed updates: their user's token is gone, so this must
+                  be able to write every row (a service-role client, chosen on purpose);
+                  callers only submit updates to rows the user's own client has written
+    max_attempts  flushes a row survives on transient errors before it is reported as failed
+
+    Rows the batch call rejects are retried one by one, so one bad row does not
+    fail the others; every row that cannot be written ends up in failures, and
+    in journal_path.failed when journaling.
+    """
+
+    def __init__(self, repository, window=2.0, max_pending=1000, journal_path=None,
+                 client=None, max_attempts=5, failure_log_size=100):
+        self.repository = repository
+        self.window = window
+        self.max_pending = max_pending
+        self.journal_path = journal_path
+        self.failure_log_path = f"{journal_path}.failed" if journal_path else None
+        self.client = client
+        self.max_attempts = max_attempts
+        self.failures = deque(maxlen=failure_log_size)
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.flushes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._journal = None
+        self._journal_file = None
+
+    # ------------------------------------------------------------------
+    # Journal
+    # ------------------------------------------------------------------
+
+    def _slot_path(self, slot):
+        return self.journal_path if slot == 0 else f"{self.journal_path}.{slot}"
+
+    @staticmethod
+    def _try_lock(path):
+        """
+        Open path and lock it without waiting. Returns the file, None when another
+        process holds it, or _RETRY when the path was replaced while locking.
+        """
+        journal = open(path, 'a', encoding='utf-8')
+        if fcntl is None:
+            return journal
+        try:
+            fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            journal.close()
+            return None
+        try:
+            same = os.fstat(journal.fileno()).st_ino == os.stat(path).st_ino
+        except FileNotFoundError:
+            same = False
+        if not same:
+            journal.close()  # Locked a file its owner had just replaced or merged away
+            return _RETRY
+        return journal
+
+    def _higher_slots(self, slot):
+        """Slot numbers above slot that have a journal file"""
+        directory, base = os.path.split(os.path.abspath(self.journal_path))
+        slots = []
+        for name in os.listdir(directory):
+            suffix = name[len(base) + 1:]
+            if name.startswith(base + '.') and suffix.isdigit() and int(suffix) > slot:
+                slots.append(int(suffix))
+        return sorted(slots)
+
+    @staticmethod
+    def _read(path):
+        entries = []
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn last line from a crash mid-write
+        return entries
+
+    def open_journal(self):
+        """
+        Claim the lowest journal slot no other live process holds and replay
+        what it contains. Slots above it that nobody holds belonged to workers
+        that are gone (e.g. after the worker count shrank): their updates are
+        merged into this slot and the files removed.
+        """
+        with self._lock:
+            if not self.journal_path or self._journal is not None:
+                return
+            slot = 0
+            while True:
+                journal = self._try_lock(self._slot_path(slot))
+                if journal is None:
+                    slot += 1
+                elif journal is not _RETRY:
+                    break
+            self._journal_file = self._slot_path(slot)
+            self._journal = journal
+
+            entries = self._read(self._journal_file)
+            swept = []
+            if fcntl is not None:
+                for higher in self._higher_slots(slot):
+                    orphan = self._try_lock(self._slot_path(higher))
+                    if orphan is None or orphan is _RETRY:
+                        continue
+                    orphaned = self._read(self._slot_path(higher))
+                    for entry in orphaned:
+                        self._write_entry(entry)  # Durable in our slot before the orphan goes away
+                    entries.extend(orphaned)
+                    os.remove(self._slot_path(higher))
+                    orphan.close()
+                    swept.append(higher)
+            self._replay(entries, swept)
+
+    def _replay(self, entries, swept=()):
+        """Requeue updates journaled but never flushed (e.g. before a crash), oldest first"""
+        entries.sort(key=lambda entry: entry.get('at', 0))
+        for entry in entries:
+            self._merge(entry['id'], entry['changes'], self.client, entry.get('user'))
+        if entries:
+            merged = f" (including slots {', '.join(map(str, swept))})" if swept else ''
+            print(f"{ANSI['Y']}Write buffer: replayed {len(entries)} journaled updates "
+                  f"for {len(self._pending)} rows{merged}{ANSI['W']}")
+
+    def _write_entry(self, entry):
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _append(self, row_id, changes, user=None):
+        self._write_entry({'id': row_id, 'changes': changes, 'user': user, 'at': time.time()})
+
+    def _compact(self):
+        """Rewrite the journal with only the rows still pending"""
+        with self._lock:
+            entries = [{'id': row_id, 'changes': p.changes, 'user': p.user, 'at': p.since}
+                       for row_id, p in self._pending.items()]
+            tmp_path = f"{self._journal_file}.tmp"
+            tmp = open(tmp_path, 'w', encoding='utf-8')
+            if fcntl is not None:
+                # Lock the new file before it replaces the slot, so the slot is never up for grabs
+                fcntl.flock(tmp.fileno(), fcntl.LOCK_EX)
+            for entry in entries:
+                tmp.write(json.dumps(entry) + '\n')
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            os.replace(tmp_path, self._journal_file)
+            self._journal.close()
+            self._journal = tmp
+
+    # ------------------------------------------------------------------
+    # Buffering
+    # ------------------------------------------------------------------
+
+    def _merge(self, row_id, changes, client, user=None):
+        pending = self._pending.get(row_id)
+        if pending is None:
+            self._pending[row_id] = _Pending(changes, client, user)
+            return False
+        pending.changes.update(changes)
+        pending.client = client or pending.client
+        pending.user = user or pending.user
+        return True
+
+    def submit(self, row_id, changes, client=None, user=None):
+        """
+        Accept an update for row_id, made by user through client. Callers check
+        the user may write the row first (replays bypass their update policies). Once this returns, the
+        update is durable (when journaled) and will be written by a later flush.
+        """
+        if self.journal_path and self._journal is None:
+            self.open_journal()
+        with self._lock:
+            if self._journal is not None:
+                self._append(row_id, changes, user)
+            if self._merge(row_id, changes, client, user):
+                self.coalesced += 1
+            self.submitted += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self.flush()
+
+    def pending(self, row_id):
+        """Changes waiting to be written for a row, or None"""
+        with self._lock:
+            pending = self._pending.get(row_id)
+            return dict(pending.changes) if pending else None
+
+    def _record_failure(self, row_id, pending, error):
+        """Report a row that will not be written, durably when journaling"""
+        self.failed_rows += 1
+        failure = {'id': row_id, 'changes': pending.changes, 'user': pending.user, 'error': str(error), 'at': time.time()}
+        self.failures.append(failure)
+        print(f"{ANSI['R']}Write buffer: update of {row_id} failed: {error}{ANSI['W']}")
+        if self.failure_log_path:
+            try:
+                with open(self.failure_log_path, 'a', encoding='utf-8') as log:
+                    log.write(json.dumps(failure) + '\n')
+                    log.flush()
+                    os.fsync(log.fileno())
+            except OSError as e:
+                print(f"{ANSI['R']}Write buffer: could not log the failure of {row_id}: {e}{ANSI['W']}")
+
+    def _requeue(self, batch, error):
+        """Put a batch back after a transient error; newer changes win over requeued ones"""
+        with self._lock:
+            for row_id, pending in batch.items():
+                pending.attempts += 1
+                if pending.attempts >= self.max_attempts:
+                    self._record_failure(row_id, pending, error)
+                    continue
+                newer = self._pending.get(row_id)
+                if newer is not None:
+                    pending.changes.update(newer.changes)
+                    pending.client = newer.client or pending.client
+                    pending.user = newer.user or pending.user
+                self._pending[row_id] = pending
+
+    def _write_batch(self, client, batch):
+        """Write one client's rows; returns how many were written"""
+        updates = [dict(pending.changes, id=row_id) for row_id, pending in batch.items()]
+        try:
+            written = {row['id'] for row in self.repository.update_many(updates, client=client)}
+        except Exception as e:
+            if is_transient(e) or isinstance(e, CircuitOpenError):
+                self._requeue(batch, e)
+                return 0
+            # The batch was rejected as a whole (or the function is not installed):
+            # fall back to one update per row, so only the offending rows fail
+            written = set()
+            for row_id, pending in batch.items():
+                try:
+                    if self.repository.update_row(row_id, pending.changes, client=client):
+                        written.add(row_id)
+                    else:
+                        self._record_failure(row_id, pending, "Dataset not found")
+                except Exception as row_error:
+                    self._record_failure(row_id, pending, row_error)
+            return len(written)
+
+        for row_id, pending in batch.items():
+            if row_id not in written:
+                self._record_failure(row_id, pending, "Dataset not found")
+        return len(written)
+
+    def flush(self, row_ids=None):
+        """
+        Write pending updates now (only row_ids when given).
+        Returns {'flushed': rows written, 'failed': rows reported as failed}.
+        """
+        with self._flush_lock:
+            with self._lock:
+                ids = list(self._pending) if row_ids is None else [i for i in row_ids if i in self._pending]
+                taken = {row_id: self._pending.pop(row_id) for row_id in ids}
+            if not taken:
+                return {'flushed': 0, 'failed': 0}
+
+            # One batched call per client, so each user's writes stay under their own RLS policies
+            by_client = {}
+            for row_id, pending in taken.items():
+                client = pending.client or self.client
+                by_client.setdefault(id(client), (client, {}))[1][row_id] = pending
+
+            failed_before = self.failed_rows
+            flushed = 0
+            for client, batch in by_client.values():
+                flushed += self._write_batch(client, batch)
+            self.flushed_rows += flushed
+            self.flushes += 1
+            if self._journal is not None:
+                self._compact()
+            return {'flushed': flushed, 'failed': self.failed_rows - failed_before}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Replay the journal and flush every window seconds from a background thread"""
+        self.open_journal()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='write-buffer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.window):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"{ANSI['R']}Write buffer flush error: {e}{ANSI['W']}")
+
+    def close(self):
+        """Stop the background thread and flush what is left (call on shutdown)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.window + 1)
+        result = self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        with self._lock:
+            left = len(self._pending)
+        if left:
+            print(f"{ANSI['Y']}Write buffer: {left} rows left unwritten"
+                  f"{' (kept in the journal)' if self.journal_path else ''}{ANSI['W']}")
+        return result
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'enabled': True,
+            'pending_rows': pending,
+            'submitted_updates': self.submitted,
+            'coalesced_updates': self.coalesced,
+            'flushes': self.flushes,
+            'flushed_rows': self.flushed_rows,
+            'failed_rows': self.failed_rows,
+            'journal': self._journal_file,
+            'failure_log': self.failure_log_path,
+            'recent_failures': list(self.failures),
+        }
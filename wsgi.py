@@ -0,0 +1,21 @@
+# wsgi.py
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py starts the per-worker background threads after forking;
+other WSGI servers should call start_background_work() once per process.
+"""
+
+import os
+
+from app import app, start_background_work, stop_background_work
+from clients import get_client
+
+# Build the shared client here, so preloaded workers inherit it instead of each
+# importing supabase on its first request (building it opens no connections)
+if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"):
+    get_client()
+
+__all__ = ['app', 'start_background_work', 'stop_background_work']